@@ -0,0 +1,162 @@
+"""Response cache for the analytics dashboard endpoints.
+
+``AnalyticsDashboard.jsx`` fetches ``/metrics`` and ``/summary`` on every
+load. Their payloads can only change when events are ingested (or when the
+day changes, since the metrics are relative to today). So each response
+carries an ETag derived from the log's identity and size plus the date.
+The last payload per request is kept for as long as that ETag holds.
+
+* ``version`` bumps whenever the log has grown, whichever worker appended
+  to it. The writer also bumps it right after its own flushes.
+* A request whose ``If-None-Match`` matches gets an empty 304.
+* A repeated request with a stale or missing ETag gets the cached payload
+  without recomputing it.
+
+ETags depend on the shared log, so every worker hands out the same ones
+and a 304 doesn't depend on which worker the browser reaches. Changes that
+don't touch the log (a rollup rebuild, new daily summaries) call
+``clear()``. It replaces ``ANALYTICS_CACHE_GENERATION_FILE``, and every
+worker's ETags include that file's identity, so all workers drop their
+cached payloads, not only the one that handled the rebuild.
+"""
+import os
+import threading
+from datetime import datetime
+from hashlib import blake2b
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from src.Backend.analytics_writer import ANALYTICS_FILE
+
+ANALYTICS_CACHE_ENTRIES = int(os.getenv("ANALYTICS_CACHE_ENTRIES", "64"))
+ANALYTICS_CACHE_GENERATION_FILE = os.getenv("ANALYTICS_CACHE_GENERATION_FILE", "data/analytics_cache_generation")
+
+
+class AnalyticsResponseCache:
+    def __init__(self, log_path: str = ANALYTICS_FILE, max_entries: int = ANALYTICS_CACHE_ENTRIES,
+                 generation_path: str = ANALYTICS_CACHE_GENERATION_FILE):
+        self.log_path = log_path
+        self.max_entries = max_entries
+        self.generation_path = generation_path
+        self.version = 0
+        self.generation = 0         # bumped by clear(), invalidates ETags without new events
+        self._unshared = 0          # clears that couldn't be written to the generation file
+        self._log_state = None
+        self._entries = {}          # key -> (etag, payload)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _current_log_state(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.log_path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino, st.st_size)
+
+    def _shared_generation(self) -> Optional[tuple]:
+        """Identity of the generation file; clear() in any worker replaces it"""
+        try:
+            st = os.stat(self.generation_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns)
+
+    def _read_generation(self) -> int:
+        try:
+            with open(self.generation_path) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def refresh(self) -> tuple:
+        """Bump the version if the log changed; returns the log state"""
+        state = self._current_log_state()
+        with self._lock:
+            if state != self._log_state:
+                self._log_state = state
+                self.version += 1
+        return state
+
+    def on_flush(self, batch):
+        """Writer listener: this worker just ingested events"""
+        self.refresh()
+
+    def etag(self, key: str) -> str:
+        state = self.refresh()
+        shared = self._shared_generation()
+        tag = f"{key}|{state}|{shared}|{self._unshared}|{datetime.now().strftime('%Y-%m-%d')}"
+        return '"' + blake2b(tag.encode(), digest_size=12).hexdigest() + '"'
+
+    def get(self, key: str, etag: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == etag:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def put(self, key: str, etag: str, payload):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (etag, payload)
+            while len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation = max(self.generation, self._read_generation()) + 1
+            try:
+                os.makedirs(os.path.dirname(self.generation_path) or ".", exist_ok=True)
+                tmp_path = f"{self.generation_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    f.write(str(self.generation))
+                # A new file (new inode) even if two workers write the same number
+                os.replace(tmp_path, self.generation_path)
+            except OSError as e:
+                self._unshared += 1
+                print(f"⚠️ Couldn't share the analytics cache generation, other workers keep their ETags: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "generation": self.generation,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified
+            }
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as for GET revalidation
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+analytics_cache = AnalyticsResponseCache()
+
+
+async def cached_response(request: Request, compute: Callable[[], Awaitable]) -> Response:
+    """Answer from the cache (or with a 304) unless events were ingested since the payload was built"""
+    key = request.url.path + "?" + str(request.query_params)
+    # Taken before computing: a payload is never labelled newer than the log it was built from
+    etag = analytics_cache.etag(key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        analytics_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    payload = analytics_cache.get(key, etag)
+    if payload is None:
+        payload = await compute()
+        analytics_cache.put(key, etag, payload)
+    return JSONResponse(payload, headers=headers)
@@ -0,0 +1,182 @@
+"""The analytics log and its rotated segments, read by position.
+
+``analytics_maintenance`` rotates ``ANALYTICS_FILE`` by renaming it into
+``ANALYTICS_ARCHIVE_DIR`` as ``analytics-<rotated at>-<inode>.jsonl``. The
+writer opens the log in append mode for every batch, so the next batch
+simply creates a fresh file. A batch that was already being written when
+the rename happened still lands in the segment, because it writes to the
+same inode. Once a segment has settled and every reader has moved past it,
+it is gzipped to ``.jsonl.gz``.
+
+Readers that tail the log (rollups, partitions) store their position as
+``(inode, offset)`` instead of a bare offset. ``read_chunk`` uses the inode
+to tell whether that position is still in the active log or in a rotated
+segment. In a segment, it finishes the segment and only moves on (to the
+next segment, or the start of the active log) once the segment has stopped
+changing for ``ANALYTICS_SEGMENT_SETTLE_SECONDS``. A rotation therefore
+never loses or repeats lines for them. The maintenance job leaves every
+segment from the oldest one a reader is still in uncompressed. The archive
+must be on the same filesystem as the log, so the rename keeps the inode.
+"""
+import gzip
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Iterator, List, NamedTuple, Optional
+
+from src.Backend.analytics_writer import ANALYTICS_FILE
+
+ANALYTICS_ARCHIVE_DIR = os.getenv("ANALYTICS_ARCHIVE_DIR", "data/analytics_archive")
+ANALYTICS_SEGMENT_SETTLE_SECONDS = float(os.getenv("ANALYTICS_SEGMENT_SETTLE_SECONDS", "10"))
+
+_SEGMENT_NAME = re.compile(r"^analytics-(\d{8}T\d{6})-(\d+)\.jsonl(\.gz)?$")
+_TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+
+class Segment(NamedTuple):
+    path: str
+    rotated_at: datetime
+    inode: int          # inode of the log when it was rotated
+    compressed: bool
+
+
+class Chunk(NamedTuple):
+    inode: int          # file the lines come from
+    offset: int         # where they start in it
+    lines: List[bytes]  # complete lines only; may be empty when only the position moved
+
+
+def segment_path(rotated_at: datetime, inode: int, directory: str = ANALYTICS_ARCHIVE_DIR) -> str:
+    return os.path.join(directory, f"analytics-{rotated_at.strftime(_TIME_FORMAT)}-{inode}.jsonl")
+
+
+def list_segments(directory: str = ANALYTICS_ARCHIVE_DIR) -> List[Segment]:
+    """Rotated segments, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    segments = {}
+    for name in os.listdir(directory):
+        match = _SEGMENT_NAME.match(name)
+        if not match:
+            continue
+        segment = Segment(
+            os.path.join(directory, name),
+            datetime.strptime(match.group(1), _TIME_FORMAT),
+            int(match.group(2)),
+            bool(match.group(3))
+        )
+        key = (segment.rotated_at, segment.inode)
+        # Right after compression both files exist; the plain one is listed until it's removed
+        if key not in segments or segments[key].compressed:
+            segments[key] = segment
+    return [segments[key] for key in sorted(segments)]
+
+
+def active_inode(log_path: str = ANALYTICS_FILE) -> int:
+    try:
+        return os.stat(log_path).st_ino
+    except OSError:
+        return 0
+
+
+def is_caught_up(log_path: str, inode: int, offset: int) -> bool:
+    """Cheap check (no lock needed) that nothing was appended after this position"""
+    try:
+        st = os.stat(log_path)
+    except OSError:
+        return not inode and not offset
+    return inode in (0, st.st_ino) and st.st_size == offset
+
+
+def _complete_lines(f, offset: int, max_bytes: int) -> List[bytes]:
+    f.seek(offset)
+    lines = f.readlines(max_bytes)
+    # A line without its newline is still being appended
+    if lines and not lines[-1].endswith(b"\n"):
+        lines.pop()
+    return lines
+
+
+def read_chunk(log_path: str, inode: int, offset: int, max_bytes: int,
+               directory: str = ANALYTICS_ARCHIVE_DIR) -> Optional[Chunk]:
+    """The lines after position (inode, offset), or None when there is nothing to read
+
+    inode 0 means "the active log" (a position stored before rotation existed).
+    """
+    if inode and inode != active_inode(log_path):
+        segments = [segment for segment in list_segments(directory) if not segment.compressed]
+        current = next((i for i, segment in enumerate(segments) if segment.inode == inode), None)
+        if current is not None:
+            segment = segments[current]
+            with open(segment.path, "rb") as f:
+                lines = _complete_lines(f, offset, max_bytes)
+            if lines:
+                return Chunk(inode, offset, lines)
+            # A batch written during the rename may still be landing in the segment
+            if time.time() - os.path.getmtime(segment.path) < ANALYTICS_SEGMENT_SETTLE_SECONDS:
+                return None
+            if current + 1 < len(segments):
+                following = segments[current + 1].inode
+                return read_chunk(log_path, following, 0, max_bytes, directory) or Chunk(following, 0, [])
+        # Done with the rotated files: continue at the start of the active one
+        switched = True
+        inode, offset = 0, 0
+    else:
+        switched = False
+
+    try:
+        f = open(log_path, "rb")
+    except FileNotFoundError:
+        return Chunk(0, 0, []) if switched else None
+    with f:
+        st = os.fstat(f.fileno())
+        if inode and not switched and st.st_ino != inode:
+            # Rotated between the check above and open(); the next call reads the segment
+            return None
+        if st.st_size < offset:
+            # The log was replaced or truncated; start over on the new file
+            offset = 0
+        lines = _complete_lines(f, offset, max_bytes) if st.st_size > offset else []
+    if not lines and not switched and inode == st.st_ino:
+        return None
+    return Chunk(st.st_ino, offset, lines)
+
+
+def open_segment(segment: Segment):
+    if segment.compressed:
+        return gzip.open(segment.path, "rb")
+    try:
+        return open(segment.path, "rb")
+    except FileNotFoundError:
+        # Compressed since it was listed
+        return gzip.open(segment.path + ".gz", "rb")
+
+
+def _parse_lines(lines) -> Iterator[dict]:
+    for line in lines:
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event, dict):
+            yield event
+
+
+def iter_segment_events(segment: Segment) -> Iterator[dict]:
+    with open_segment(segment) as f:
+        yield from _parse_lines(f)
+
+
+def iter_log_events(log_path: str = ANALYTICS_FILE, directory: str = ANALYTICS_ARCHIVE_DIR) -> Iterator[dict]:
+    """Every retained event: the rotated segments, oldest first, then the active log"""
+    for segment in list_segments(directory):
+        try:
+            yield from iter_segment_events(segment)
+        except FileNotFoundError:
+            # Expired by the maintenance job meanwhile
+            continue
+    if os.path.exists(log_path):
+        with open(log_path, "rb") as f:
+            yield from _parse_lines(f)
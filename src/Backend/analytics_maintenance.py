@@ -0,0 +1,350 @@
+"""Rotation, compression and retention of the analytics log.
+
+Nothing used to truncate ``analytics_data.jsonl``. A background job
+(``schedule_maintenance``, every ``ANALYTICS_MAINTENANCE_INTERVAL`` seconds)
+now keeps it bounded:
+
+* rotation: once the log reaches ``ANALYTICS_ROTATE_BYTES`` or has been
+  the active log for ``ANALYTICS_ROTATE_HOURS``, it is renamed into
+  ``ANALYTICS_ARCHIVE_DIR`` and a fresh, empty log takes its place. The
+  writer keeps appending throughout (see ``analytics_log`` for why this is
+  safe for it and for the readers that tail the log);
+* compression: a rotated segment is gzipped once it has settled and every
+  reader has moved past it;
+* retention: segments rotated more than ``ANALYTICS_RETENTION_DAYS`` ago are
+  deleted, and so are the oldest ones while the archive is larger than
+  ``ANALYTICS_RETENTION_BYTES`` (0 = no size limit). Day partitions older
+  than the retention window are deleted too;
+* daily summaries: every compacted day gets a pre-aggregated summary (event
+  counts, distinct users and sessions, and the per-day metric sections)
+  before its partition may expire, so ``/api/analytics/history`` still
+  answers for days whose raw events are gone. The rollups behind
+  ``/summary`` and ``/metrics`` are aggregates too and are not affected.
+
+Rotation holds a write lock on ``ANALYTICS_MAINTENANCE_DB``, so with several
+workers only one of them rotates at a time.
+"""
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from src.Backend.analytics_writer import ANALYTICS_FILE
+from src.Backend.analytics_log import (
+    ANALYTICS_ARCHIVE_DIR, ANALYTICS_SEGMENT_SETTLE_SECONDS, segment_path, list_segments
+)
+from src.Backend.analytics_metrics import (
+    MetricAccumulator, run_accumulators, UserEngagement, FeatureUsage, ConversationMetrics,
+    CommandAnalytics, EngagementMetrics
+)
+from src.Backend.analytics_rollups import analytics_rollups
+from src.Backend.analytics_partitions import analytics_partitions
+from src.Backend.analytics_cache import analytics_cache
+from src.Backend.hyperloglog import new_distinct_counter
+from src.Backend.scheduler import scheduler
+from src.Backend.user_data import connect
+
+ANALYTICS_MAINTENANCE_DB = os.getenv("ANALYTICS_MAINTENANCE_DB", "data/analytics_maintenance.db")
+ANALYTICS_MAINTENANCE_INTERVAL = int(os.getenv("ANALYTICS_MAINTENANCE_INTERVAL", "3600"))
+ANALYTICS_ROTATE_BYTES = int(os.getenv("ANALYTICS_ROTATE_BYTES", str(64 * 1024 * 1024)))
+ANALYTICS_ROTATE_HOURS = float(os.getenv("ANALYTICS_ROTATE_HOURS", "24"))
+ANALYTICS_RETENTION_DAYS = int(os.getenv("ANALYTICS_RETENTION_DAYS", "90"))
+ANALYTICS_RETENTION_BYTES = int(os.getenv("ANALYTICS_RETENTION_BYTES", "0"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS maintenance_state (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_summaries (
+    day TEXT PRIMARY KEY,
+    rows INTEGER NOT NULL,
+    summary TEXT NOT NULL
+);
+"""
+
+
+class DaySummary(MetricAccumulator):
+    """Event counts and distinct users/sessions of one day"""
+
+    name = "day"
+
+    def __init__(self):
+        self.event_counts = {}
+        self.users = new_distinct_counter()
+        self.sessions = new_distinct_counter()
+
+    def add(self, event):
+        name = event.get("event", "unknown")
+        self.event_counts[name] = self.event_counts.get(name, 0) + 1
+        user_id = event["data"].get("user_id")
+        if user_id:
+            self.users.add(user_id)
+        if event.get("session_id"):
+            self.sessions.add(event["session_id"])
+
+    def result(self):
+        return {
+            "total_events": sum(self.event_counts.values()),
+            "event_counts": self.event_counts,
+            "unique_users": self.users.count(),
+            "unique_sessions": self.sessions.count()
+        }
+
+
+# The /metrics sections that are meaningful for a single day
+DAILY_ACCUMULATORS = (DaySummary, UserEngagement, FeatureUsage, ConversationMetrics, CommandAnalytics,
+                      EngagementMetrics)
+
+
+class AnalyticsMaintenance:
+    def __init__(self, db_path: str = ANALYTICS_MAINTENANCE_DB, log_path: str = ANALYTICS_FILE,
+                 archive_dir: str = ANALYTICS_ARCHIVE_DIR, rollups=analytics_rollups,
+                 partitions=analytics_partitions):
+        self.db_path = db_path
+        self.log_path = log_path
+        self.archive_dir = archive_dir
+        self.rollups = rollups
+        self.partitions = partitions
+        self._db = None
+        self._lock = threading.Lock()
+        self.last_run = {}
+        self.last_run_ms = 0.0
+
+    def _connect(self):
+        if self._db is None:
+            db = connect(self.db_path)
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def _state(self, db) -> dict:
+        return dict(db.execute("SELECT name, value FROM maintenance_state"))
+
+    def _set_state(self, db, **values):
+        db.executemany(
+            "INSERT INTO maintenance_state (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+            values.items()
+        )
+
+    def catch_up_readers(self):
+        self.rollups.catch_up()
+        self.partitions.partition()
+
+    # --- rotation ---
+
+    def rotate(self, now: Optional[datetime] = None, force: bool = False) -> Optional[str]:
+        """Rotate the log if it is big or old enough; returns the segment path"""
+        now = now or datetime.now()
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                try:
+                    st = os.stat(self.log_path)
+                except FileNotFoundError:
+                    db.execute("COMMIT")
+                    return None
+                state = self._state(db)
+                if state.get("active_inode") != st.st_ino:
+                    # The log's age counts from when this job first saw it
+                    self._set_state(db, active_inode=st.st_ino, active_since=int(now.timestamp()))
+                    state["active_since"] = int(now.timestamp())
+                age_hours = (now.timestamp() - state["active_since"]) / 3600
+                due = st.st_size >= ANALYTICS_ROTATE_BYTES or (
+                    ANALYTICS_ROTATE_HOURS > 0 and age_hours >= ANALYTICS_ROTATE_HOURS
+                )
+                if not st.st_size or not (due or force):
+                    db.execute("COMMIT")
+                    return None
+
+                # Readers that are caught up have only the last few lines left in the segment
+                self.catch_up_readers()
+                os.makedirs(self.archive_dir, exist_ok=True)
+                path = segment_path(now, st.st_ino, self.archive_dir)
+                os.rename(self.log_path, path)
+                # The writer would create it with its next batch; "no data yet" checks look for the file
+                with open(self.log_path, "a"):
+                    pass
+                self._set_state(db, active_inode=os.stat(self.log_path).st_ino,
+                                active_since=int(now.timestamp()))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        print(f"🗄️ Rotated analytics log ({st.st_size / (1024 * 1024):.1f} MB) to {path}")
+        # Readers move to the new log once the segment has settled
+        scheduler.schedule(self.finish_rotation, delay_seconds=ANALYTICS_SEGMENT_SETTLE_SECONDS + 1,
+                           kind="analytics_rotation", description="move analytics readers to the new log")
+        return path
+
+    def finish_rotation(self):
+        self.catch_up_readers()
+        # Payloads cached while the readers were still in the segment may lag the log
+        analytics_cache.clear()
+
+    # --- compression and retention ---
+
+    def _releasable(self) -> list:
+        """Segments no reader still needs, oldest first"""
+        reader_inodes = {self.rollups.position()[0], self.partitions.position()[0]}
+        releasable = []
+        for segment in list_segments(self.archive_dir):
+            if not segment.compressed and segment.inode in reader_inodes:
+                break
+            releasable.append(segment)
+        return releasable
+
+    def compress(self) -> int:
+        """Gzip settled segments every reader is done with"""
+        compressed = 0
+        for segment in self._releasable():
+            if segment.compressed:
+                continue
+            if time.time() - os.path.getmtime(segment.path) < ANALYTICS_SEGMENT_SETTLE_SECONDS:
+                break
+            tmp_path = segment.path + ".gz.tmp"
+            with open(segment.path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            shutil.copystat(segment.path, tmp_path)
+            os.replace(tmp_path, segment.path + ".gz")
+            os.remove(segment.path)
+            compressed += 1
+        return compressed
+
+    def summarize(self) -> int:
+        """Store a summary for every compacted day that has none or has changed since"""
+        summarized = 0
+        with self._lock:
+            db = self._connect()
+            known = dict(db.execute("SELECT day, rows FROM daily_summaries"))
+            for day, rows in self.partitions.closed_days().items():
+                if known.get(day) == rows:
+                    continue
+                results = run_accumulators(self.partitions.iter_day(day), [cls() for cls in DAILY_ACCUMULATORS])
+                summary = {**results.pop(DaySummary.name), **results}
+                db.execute(
+                    "INSERT INTO daily_summaries (day, rows, summary) VALUES (?, ?, ?) "
+                    "ON CONFLICT (day) DO UPDATE SET rows = excluded.rows, summary = excluded.summary",
+                    (day, rows, json.dumps(summary))
+                )
+                summarized += 1
+        return summarized
+
+    def expire(self, now: Optional[datetime] = None) -> dict:
+        """Delete raw events past the retention limits"""
+        now = now or datetime.now()
+        cutoff = now - timedelta(days=ANALYTICS_RETENTION_DAYS)
+        releasable = self._releasable()
+        sizes = {segment.path: os.path.getsize(segment.path) for segment in releasable}
+        archive_bytes = sum(
+            os.path.getsize(segment.path) for segment in list_segments(self.archive_dir)
+        )
+        deleted = 0
+        for segment in releasable:
+            too_old = ANALYTICS_RETENTION_DAYS > 0 and segment.rotated_at < cutoff
+            too_big = ANALYTICS_RETENTION_BYTES > 0 and archive_bytes > ANALYTICS_RETENTION_BYTES
+            if not (too_old or too_big):
+                break
+            os.remove(segment.path)
+            archive_bytes -= sizes[segment.path]
+            deleted += 1
+
+        expired_days = 0
+        if ANALYTICS_RETENTION_DAYS > 0:
+            # Only compacted days whose summary covers every row; the rest (still open,
+            # or with late events since) wait for a later run
+            with self._lock:
+                summarized = dict(self._connect().execute("SELECT day, rows FROM daily_summaries"))
+            closed = self.partitions.closed_days()
+            first_kept = cutoff.strftime("%Y-%m-%d")
+            pending = [day for day in self.partitions.days()
+                       if day < first_kept and (day not in closed or summarized.get(day) != closed[day])]
+            expired_days = self.partitions.expire(min(pending + [first_kept]))
+        return {"deleted_segments": deleted, "expired_days": expired_days}
+
+    def run(self, now: Optional[datetime] = None, rotate: bool = False) -> dict:
+        """One maintenance pass; `rotate` rotates even if the policy doesn't call for it yet"""
+        start = time.perf_counter()
+        now = now or datetime.now()
+        rotated = self.rotate(now, force=rotate)
+        self.partitions.run()
+        result = {
+            "rotated": rotated,
+            "compressed_segments": self.compress(),
+            "summarized_days": self.summarize(),
+            **self.expire(now)
+        }
+        if result["summarized_days"] or result["expired_days"]:
+            # /history payloads changed without the log changing
+            analytics_cache.clear()
+        self.last_run = result
+        self.last_run_ms = (time.perf_counter() - start) * 1000
+        if result["deleted_segments"] or result["expired_days"]:
+            print(f"🗄️ Analytics retention: deleted {result['deleted_segments']} log segments, "
+                  f"{result['expired_days']} day partitions")
+        return result
+
+    # --- queries ---
+
+    def history(self, days: int = 90, now: Optional[datetime] = None) -> dict:
+        """Daily summaries of the last `days` days, including days whose raw events expired"""
+        now = now or datetime.now()
+        since = (now - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT day, summary FROM daily_summaries WHERE day >= ? ORDER BY day", (since,)
+            ).fetchall()
+        return {day: json.loads(summary) for day, summary in rows}
+
+    def stats(self) -> dict:
+        segments = list_segments(self.archive_dir)
+        with self._lock:
+            db = self._connect()
+            state = self._state(db)
+            summaries = db.execute("SELECT COUNT(*), MIN(day) FROM daily_summaries").fetchone()
+        try:
+            log_bytes = os.path.getsize(self.log_path)
+        except OSError:
+            log_bytes = 0
+        return {
+            "log_bytes": log_bytes,
+            "log_age_hours": round((time.time() - state["active_since"]) / 3600, 2)
+            if "active_since" in state else 0,
+            "rotate_bytes": ANALYTICS_ROTATE_BYTES,
+            "rotate_hours": ANALYTICS_ROTATE_HOURS,
+            "retention_days": ANALYTICS_RETENTION_DAYS,
+            "retention_bytes": ANALYTICS_RETENTION_BYTES,
+            "archive_dir": self.archive_dir,
+            "segments": len(segments),
+            "compressed_segments": sum(segment.compressed for segment in segments),
+            "archive_bytes": sum(os.path.getsize(segment.path) for segment in segments),
+            "oldest_segment": segments[0].rotated_at.isoformat() if segments else None,
+            "daily_summaries": summaries[0],
+            "oldest_summary": summaries[1],
+            "last_run": self.last_run,
+            "last_run_ms": round(self.last_run_ms, 3)
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+analytics_maintenance = AnalyticsMaintenance()
+
+
+def schedule_maintenance():
+    """Rotate, compress and expire the analytics log now and every ANALYTICS_MAINTENANCE_INTERVAL seconds"""
+    try:
+        analytics_maintenance.run()
+    finally:
+        scheduler.schedule(schedule_maintenance, delay_seconds=ANALYTICS_MAINTENANCE_INTERVAL,
+                           kind="analytics_maintenance", description="rotate and expire the analytics log")
@@ -0,0 +1,395 @@
+"""Single-pass, streaming computation of the analytics metrics.
+
+The ``calculate_*`` functions in ``routes/analytics.py`` each took the full
+``events`` list and filtered it again, and the whole log was loaded into
+memory first. Each metric is now an accumulator: it sees one event at a
+time through ``add()`` and builds its output in ``result()``. ``compute_metrics``
+feeds one generator over the log (``iter_events``) to all of them in a
+single pass, dispatching each event only to the accumulators that asked for
+its event name.
+
+Memory no longer depends on the number of events, only on what a metric has
+to remember: per-session start/end times, the distinct users per day and
+month (HyperLogLog sketches unless ANALYTICS_DISTINCT_COUNTING=exact, see
+``hyperloglog``), and the latest return frequency of each user. Score lists
+became running sums and histograms.
+
+This is the full-recompute path (backfills, new metric definitions, checking
+the rollups); dashboards read ``analytics_rollups`` instead.
+"""
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.Backend.hyperloglog import new_distinct_counter
+
+
+def iter_events(path: str) -> Iterator[dict]:
+    """Parsed events from a JSONL log, one line at a time; malformed lines are skipped"""
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                yield event
+
+
+def _number(value) -> float:
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+
+class MetricAccumulator:
+    """One metric over a stream of events"""
+
+    name = ""
+    # Event names this metric needs; None means every event
+    events: Optional[tuple] = None
+
+    def add(self, event: dict):
+        raise NotImplementedError
+
+    def result(self) -> dict:
+        raise NotImplementedError
+
+
+class UserEngagement(MetricAccumulator):
+    name = "user_engagement"
+
+    def __init__(self):
+        self.sessions = {}   # session_id -> [start_time, end_time]
+        self.messages = 0
+        self.voice = 0
+
+    def add(self, event):
+        session_id = event.get("session_id")
+        if not session_id:
+            return
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = [None, None]
+        name = event.get("event")
+        if name == "session_start":
+            session[0] = event.get("client_timestamp")
+        elif name == "session_end":
+            session[1] = event.get("client_timestamp")
+        elif name == "message_sent":
+            self.messages += 1
+        elif name == "voice_used":
+            self.voice += 1
+
+    def result(self):
+        total_sessions = len(self.sessions)
+        if total_sessions == 0:
+            return {"avg_messages_per_session": 0, "avg_session_duration": 0}
+
+        durations = 0
+        duration_total = 0.0
+        for start_time, end_time in self.sessions.values():
+            if start_time and end_time:
+                duration_total += (end_time - start_time) / (1000 * 60)  # minutes
+                durations += 1
+
+        return {
+            "total_sessions": total_sessions,
+            "avg_messages_per_session": self.messages / total_sessions,
+            "avg_voice_usage_per_session": self.voice / total_sessions,
+            "avg_session_duration_minutes": duration_total / durations if durations else 0,
+            "voice_usage_percentage": (self.voice / max(self.messages, 1)) * 100
+        }
+
+
+class FeatureUsage(MetricAccumulator):
+    name = "feature_usage"
+    events = ("feature_used",)
+
+    def __init__(self):
+        self.feature_counts = {}
+
+    def add(self, event):
+        feature = event["data"].get("feature")
+        if feature:
+            self.feature_counts[feature] = self.feature_counts.get(feature, 0) + 1
+
+    def result(self):
+        feature_counts = self.feature_counts
+        return {
+            "feature_counts": feature_counts,
+            "total_feature_usage": sum(feature_counts.values()),
+            "most_popular_feature": max(feature_counts, key=feature_counts.get) if feature_counts else None
+        }
+
+
+class ConversationMetrics(MetricAccumulator):
+    name = "conversation_metrics"
+    events = ("message_sent",)
+
+    def __init__(self):
+        self.total = 0
+        self.text = 0
+        self.voice = 0
+
+    def add(self, event):
+        self.total += 1
+        message_type = event["data"].get("type")
+        if message_type == "text":
+            self.text += 1
+        elif message_type == "voice":
+            self.voice += 1
+
+    def result(self):
+        return {
+            "total_messages": self.total,
+            "text_messages": self.text,
+            "voice_messages": self.voice,
+            "voice_percentage": (self.voice / max(self.total, 1)) * 100
+        }
+
+
+class CommandAnalytics(MetricAccumulator):
+    name = "command_analytics"
+    events = ("command_executed",)
+
+    def __init__(self):
+        self.command_types = {}
+        self.successful = 0
+        self.failed = 0
+
+    def add(self, event):
+        data = event["data"]
+        cmd_type = data.get("command_type", "unknown")
+        self.command_types[cmd_type] = self.command_types.get(cmd_type, 0) + 1
+        if data.get("success", True):
+            self.successful += 1
+        else:
+            self.failed += 1
+
+    def result(self):
+        total_commands = self.successful + self.failed
+        if not total_commands:
+            return {"total_commands": 0, "command_types": {}, "success_rate": 0}
+
+        command_types = self.command_types
+        return {
+            "total_commands": total_commands,
+            "command_types": command_types,
+            "successful_commands": self.successful,
+            "failed_commands": self.failed,
+            "success_rate_percentage": round((self.successful / total_commands) * 100, 1),
+            "most_popular_command_type": max(command_types, key=command_types.get) if command_types else None,
+            "command_distribution": {
+                cmd_type: {
+                    "count": count,
+                    "percentage": round((count / total_commands) * 100, 1)
+                }
+                for cmd_type, count in command_types.items()
+            }
+        }
+
+
+class RetentionMetrics(MetricAccumulator):
+    name = "retention_metrics"
+    events = ("daily_active_user", "monthly_active_user", "return_user", "session_start")
+
+    def __init__(self, now: Optional[datetime] = None):
+        self.now = now or datetime.now()
+        self.daily_users = {}       # date -> distinct counter of user ids
+        self.monthly_users = {}     # month -> distinct counter of user ids
+        self.user_frequencies = {}  # user id -> latest return frequency
+        self.user_sessions = {}     # user id -> session_start count
+
+    def add(self, event):
+        name = event["event"]
+        data = event["data"]
+        user_id = data.get("user_id")
+        if not user_id:
+            return
+        if name == "daily_active_user":
+            date = data.get("date")
+            if date:
+                users = self.daily_users.get(date)
+                if users is None:
+                    users = self.daily_users[date] = new_distinct_counter()
+                users.add(user_id)
+        elif name == "monthly_active_user":
+            month = data.get("month")
+            if month:
+                users = self.monthly_users.get(month)
+                if users is None:
+                    users = self.monthly_users[month] = new_distinct_counter()
+                users.add(user_id)
+        elif name == "return_user":
+            frequency = data.get("return_frequency")
+            if frequency:
+                self.user_frequencies[user_id] = frequency
+        else:
+            self.user_sessions[user_id] = self.user_sessions.get(user_id, 0) + 1
+
+    def result(self):
+        now = self.now
+        today = now.strftime('%Y-%m-%d')
+        this_month = now.strftime('%Y-%m')
+        recent_dates = [(now - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(7)]
+        daily_counts = {date: users.count() for date, users in self.daily_users.items()}
+        avg_dau_7days = sum(daily_counts.get(date, 0) for date in recent_dates) / 7
+
+        frequency_counts = {}
+        for freq in self.user_frequencies.values():
+            frequency_counts[freq] = frequency_counts.get(freq, 0) + 1
+
+        total_users = len(self.user_sessions)
+        returning_users = sum(1 for count in self.user_sessions.values() if count > 1)
+        return {
+            "current_dau": daily_counts.get(today, 0),
+            "current_mau": self.monthly_users[this_month].count() if this_month in self.monthly_users else 0,
+            "avg_dau_7days": round(avg_dau_7days, 1),
+            "total_users": total_users,
+            "returning_users": returning_users,
+            "return_rate_percentage": (returning_users / max(total_users, 1)) * 100,
+            "user_frequency_distribution": frequency_counts,
+            "daily_active_users_by_date": daily_counts,
+            "monthly_active_users_by_month": {month: users.count() for month, users in self.monthly_users.items()}
+        }
+
+
+class EngagementMetrics(MetricAccumulator):
+    name = "engagement_metrics"
+    events = ("time_spent_detailed", "session_end", "page_visibility")
+
+    def __init__(self):
+        self.time_events = 0
+        self.sessions = 0
+        self.session_time = 0
+        self.interaction_time = 0
+        self.score_total = 0
+        self.score_count = 0
+        self.score_high = 0
+        self.score_medium = 0
+        self.score_low = 0
+        self.visible_time = 0
+
+    def add(self, event):
+        name = event["event"]
+        data = event["data"]
+        if name == "time_spent_detailed":
+            self.time_events += 1
+            self.session_time += _number(data.get("session_duration_seconds", 0))
+            self.interaction_time += _number(data.get("interaction_time_seconds", 0))
+        elif name == "session_end":
+            self.sessions += 1
+            score = data.get("engagement_score")
+            if isinstance(score, (int, float)):
+                self.score_total += score
+                self.score_count += 1
+                if score >= 80:
+                    self.score_high += 1
+                elif score >= 50:
+                    self.score_medium += 1
+                else:
+                    self.score_low += 1
+        elif data.get("event_type") == "hidden":
+            self.visible_time += _number(data.get("visible_duration_seconds", 0))
+
+    def result(self):
+        if not self.time_events and not self.sessions:
+            return {"error": "No engagement data available"}
+
+        sessions_count = self.sessions
+        avg_session_duration = (self.session_time / sessions_count) if sessions_count > 0 else 0
+        avg_interaction_time = (self.interaction_time / sessions_count) if sessions_count > 0 else 0
+        avg_engagement_score = self.score_total / self.score_count if self.score_count else 0
+
+        return {
+            "total_sessions": sessions_count,
+            "avg_session_duration_minutes": round(avg_session_duration / 60, 2),
+            "avg_interaction_time_minutes": round(avg_interaction_time / 60, 2),
+            "avg_idle_time_minutes": round((avg_session_duration - avg_interaction_time) / 60, 2),
+            "interaction_rate_percentage": round((avg_interaction_time / max(avg_session_duration, 1)) * 100, 1),
+            "avg_engagement_score": round(avg_engagement_score, 1),
+            "total_visible_time_hours": round(self.visible_time / 3600, 2),
+            "engagement_score_distribution": {
+                "high (80-100)": self.score_high,
+                "medium (50-79)": self.score_medium,
+                "low (0-49)": self.score_low
+            }
+        }
+
+
+class DauMauTrends(MetricAccumulator):
+    name = "dau_mau_trends"
+    events = ("daily_active_user",)
+
+    def __init__(self, now: Optional[datetime] = None):
+        now = now or datetime.now()
+        # Last 30 days, oldest first; only these dates are remembered
+        self.dates = [(now - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(29, -1, -1)]
+        self.daily_counts = dict.fromkeys(self.dates, 0)
+        self.unique_users = new_distinct_counter()
+
+    def add(self, event):
+        data = event["data"]
+        date = data.get("date")
+        if date in self.daily_counts:
+            self.daily_counts[date] += 1
+            self.unique_users.add(data.get("user_id"))
+
+    def result(self):
+        trends = [{"date": date, "dau": self.daily_counts[date]} for date in self.dates]
+
+        current_week_avg = sum(t["dau"] for t in trends[-7:]) / 7
+        previous_week_avg = sum(t["dau"] for t in trends[-14:-7]) / 7
+
+        growth_rate = 0
+        if previous_week_avg > 0:
+            growth_rate = ((current_week_avg - previous_week_avg) / previous_week_avg) * 100
+
+        return {
+            "daily_trends": trends,
+            "current_week_avg_dau": round(current_week_avg, 1),
+            "previous_week_avg_dau": round(previous_week_avg, 1),
+            "week_over_week_growth": round(growth_rate, 1),
+            "peak_dau": max((t["dau"] for t in trends), default=0),
+            "total_unique_users_30days": self.unique_users.count()
+        }
+
+
+# Order of the keys in the /metrics response
+METRIC_ACCUMULATORS = (
+    UserEngagement, FeatureUsage, ConversationMetrics, CommandAnalytics,
+    RetentionMetrics, EngagementMetrics, DauMauTrends
+)
+
+
+def feed_accumulators(events: Iterable[dict], accumulators: List[MetricAccumulator]):
+    """Feed every event to the accumulators that want it, in one pass"""
+    catch_all = [acc for acc in accumulators if acc.events is None]
+    by_event = {}
+    for acc in accumulators:
+        for name in acc.events or ():
+            by_event.setdefault(name, []).append(acc)
+
+    for event in events:
+        name = event.get("event")
+        if not isinstance(event.get("data"), dict):
+            event = {**event, "data": {}}
+        for acc in catch_all:
+            acc.add(event)
+        for acc in by_event.get(name, ()):
+            acc.add(event)
+
+
+def run_accumulators(events: Iterable[dict], accumulators: List[MetricAccumulator]) -> Dict[str, dict]:
+    feed_accumulators(events, accumulators)
+    return {acc.name: acc.result() for acc in accumulators}
+
+
+def compute_metrics(events: Iterable[dict], now: Optional[datetime] = None) -> Dict[str, dict]:
+    """Every /metrics section from one pass over `events` (a list or a generator)"""
+    accumulators = []
+    for cls in METRIC_ACCUMULATORS:
+        accumulators.append(cls(now) if cls in (RetentionMetrics, DauMauTrends) else cls())
+    return run_accumulators(events, accumulators)
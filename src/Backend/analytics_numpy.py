@@ -0,0 +1,518 @@
+"""Vectorized (NumPy) backend for the per-event /metrics sections.
+
+The accumulators in ``analytics_metrics`` look at one event dict at a time.
+This backend loads only the fields the user engagement, feature usage,
+conversation, command and engagement metrics need into NumPy arrays, once.
+It then computes counts, ratios, the engagement score histogram and per-day
+group-bys with array operations:
+
+* ``EventColumns.from_events`` builds the arrays from an event iterable in
+  one Python pass;
+* ``EventColumns.from_partition`` maps a columnar day partition
+  (``analytics_partitions``) with ``numpy.frombuffer``. Dictionary values
+  are decoded once per partition and expanded with a lookup table, so
+  there is no per-row Python at all.
+
+NumPy is optional: it isn't in requirements.txt. When it is installed and
+``ANALYTICS_METRICS_BACKEND`` is ``auto`` (the default) or ``numpy``, window
+metrics over partitions use this backend; ``python`` forces the
+accumulators. ``tests/test_analytics_numpy.py`` checks the results equal the
+``calculate_*`` functions; ``python -m src.Backend.analytics_numpy`` runs the
+10^6 / 10^7 event benchmark.
+"""
+import json
+import math
+import os
+import random
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ANALYTICS_METRICS_BACKEND = os.getenv("ANALYTICS_METRICS_BACKEND", "auto").lower()
+
+if np is None and ANALYTICS_METRICS_BACKEND == "numpy":
+    print("⚠️ ANALYTICS_METRICS_BACKEND=numpy but numpy is not installed; using the Python accumulators")
+
+# The /metrics sections this backend computes. Retention and the DAU trend
+# count distinct ids per date and stay with the accumulators
+VECTORIZED_METRICS = (
+    "user_engagement", "feature_usage", "conversation_metrics", "command_analytics", "engagement_metrics"
+)
+
+
+class _Missing:
+    def __repr__(self):
+        return "<missing>"
+
+
+MISSING = _Missing()
+
+
+def numpy_enabled() -> bool:
+    return np is not None and ANALYTICS_METRICS_BACKEND in ("auto", "numpy")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _label_key(value):
+    # Strings (nearly every label) key as themselves; tuples never equal a string
+    if type(value) is str:
+        return value
+    return ("missing",) if value is MISSING else ("json", json.dumps(value, sort_keys=True))
+
+
+class Categorical:
+    """Codes into a label list; label 0 is always MISSING (field absent)"""
+
+    def __init__(self, codes, labels: list):
+        self.codes = codes
+        self.labels = labels
+
+    @classmethod
+    def encode(cls, values: list) -> "Categorical":
+        labels = [MISSING]
+        index = {_label_key(MISSING): 0}
+        codes = []
+        for value in values:
+            key = _label_key(value)
+            code = index.get(key)
+            if code is None:
+                code = index[key] = len(labels)
+                labels.append(value)
+            codes.append(code)
+        return cls(np.array(codes, dtype=np.int64), labels)
+
+    @classmethod
+    def concat(cls, parts: List["Categorical"]) -> "Categorical":
+        labels = [MISSING]
+        index = {_label_key(MISSING): 0}
+        codes = []
+        for part in parts:
+            remap = np.empty(len(part.labels), dtype=np.int64)
+            for i, label in enumerate(part.labels):
+                key = _label_key(label)
+                code = index.get(key)
+                if code is None:
+                    code = index[key] = len(labels)
+                    labels.append(label)
+                remap[i] = code
+            codes.append(remap[part.codes])
+        return cls(np.concatenate(codes) if codes else np.zeros(0, dtype=np.int64), labels)
+
+    def code_of(self, value) -> int:
+        """Code of `value`, or -1 if it never occurs"""
+        key = _label_key(value)
+        for code, label in enumerate(self.labels):
+            if _label_key(label) == key:
+                return code
+        return -1
+
+    def equals(self, value):
+        return self.codes == self.code_of(value)
+
+    def truthy(self):
+        """Per label: is the value truthy (MISSING is not)"""
+        return np.array([label is not MISSING and bool(label) for label in self.labels], dtype=bool)
+
+
+class EventColumns:
+    """The fields the vectorized metrics need, one array per field"""
+
+    NUMERIC = ("session_seconds", "interaction_seconds", "visible_seconds", "score")
+
+    def __init__(self, event, session, feature, message_type, command_type, event_type, success,
+                 session_seconds, interaction_seconds, visible_seconds, score, client_timestamp, timestamp):
+        self.event = event                      # Categorical
+        self.session = session                  # Categorical of session_id
+        self.feature = feature                  # Categorical of data.feature
+        self.message_type = message_type        # Categorical of data.type
+        self.command_type = command_type        # Categorical of data.command_type
+        self.event_type = event_type            # Categorical of data.event_type
+        self.success = success                  # bool: data.get("success", True)
+        self.session_seconds = session_seconds  # float64, 0 when not a number
+        self.interaction_seconds = interaction_seconds
+        self.visible_seconds = visible_seconds
+        self.score = score                      # float64, NaN when not a number
+        self.client_timestamp = client_timestamp  # float64, 0 when not a number
+        self.timestamp = timestamp              # int64 ms used for the event's day
+
+    def __len__(self):
+        return len(self.success)
+
+    @classmethod
+    def from_events(cls, events: Iterable[dict]) -> "EventColumns":
+        names, sessions, features, types, commands, event_types, success = [], [], [], [], [], [], []
+        session_seconds, interaction_seconds, visible_seconds, score = [], [], [], []
+        client_timestamp, timestamp = [], []
+        for event in events:
+            data = event.get("data")
+            if not isinstance(data, dict):
+                data = {}
+            names.append(event.get("event", MISSING))
+            sessions.append(event.get("session_id", MISSING))
+            features.append(data.get("feature", MISSING))
+            types.append(data.get("type", MISSING))
+            commands.append(data.get("command_type", MISSING))
+            event_types.append(data.get("event_type", MISSING))
+            success.append(bool(data.get("success", True)))
+            value = data.get("session_duration_seconds")
+            session_seconds.append(value if _is_number(value) else 0)
+            value = data.get("interaction_time_seconds")
+            interaction_seconds.append(value if _is_number(value) else 0)
+            value = data.get("visible_duration_seconds")
+            visible_seconds.append(value if _is_number(value) else 0)
+            value = data.get("engagement_score")
+            score.append(value if isinstance(value, (int, float)) else math.nan)
+            value = event.get("client_timestamp")
+            client_timestamp.append(value if _is_number(value) else 0)
+            value = event.get("server_timestamp") or value or 0
+            timestamp.append(value if _is_number(value) else 0)
+        return cls(
+            Categorical.encode(names), Categorical.encode(sessions), Categorical.encode(features),
+            Categorical.encode(types), Categorical.encode(commands),
+            Categorical.encode(event_types), np.array(success, dtype=bool),
+            np.array(session_seconds, dtype=np.float64), np.array(interaction_seconds, dtype=np.float64),
+            np.array(visible_seconds, dtype=np.float64), np.array(score, dtype=np.float64),
+            np.array(client_timestamp, dtype=np.float64), np.array(timestamp, dtype=np.float64).astype(np.int64)
+        )
+
+    @classmethod
+    def from_partition(cls, path: str) -> "EventColumns":
+        # analytics_partitions imports this module
+        from src.Backend.analytics_partitions import read_columns
+        columns = read_columns(path)
+        rows = len(next(iter(columns.values()))[1]) if columns else 0
+
+        def codes(name):
+            if name not in columns:
+                return None, [MISSING]
+            meta, column = columns[name]
+            return np.frombuffer(column, dtype=np.dtype(column.typecode)).astype(np.int64), meta["dictionary"]
+
+        def categorical(name):
+            code_array, dictionary = codes(name)
+            if code_array is None:
+                return Categorical(np.zeros(rows, dtype=np.int64), [MISSING])
+            return Categorical(code_array, [MISSING] + dictionary)
+
+        def mapped(name, absent, convert, dtype):
+            # Decode each distinct value once, then expand with a lookup table
+            code_array, dictionary = codes(name)
+            if code_array is None:
+                return np.full(rows, absent, dtype=dtype)
+            table = np.array([absent] + [convert(value) for value in dictionary], dtype=dtype)
+            return table[code_array]
+
+        def timestamps(name):
+            if name not in columns:
+                return np.zeros(rows, dtype=np.int64)
+            meta, column = columns[name]
+            if "dictionary" not in meta:
+                return np.frombuffer(column, dtype=np.int64)
+            return mapped(name, 0, lambda v: v if _is_number(v) else 0, np.float64).astype(np.int64)
+
+        number = lambda v: v if _is_number(v) else 0
+        server = timestamps("server_timestamp")
+        client = timestamps("client_timestamp")
+        timestamp = np.where(server != 0, server, client)
+        return cls(
+            categorical("event"), categorical("session_id"), categorical("data.feature"), categorical("data.type"), categorical("data.command_type"),
+            categorical("data.event_type"),
+            mapped("data.success", True, bool, bool),
+            mapped("data.session_duration_seconds", 0, number, np.float64),
+            mapped("data.interaction_time_seconds", 0, number, np.float64),
+            mapped("data.visible_duration_seconds", 0, number, np.float64),
+            mapped("data.engagement_score", math.nan,
+                   lambda v: v if isinstance(v, (int, float)) else math.nan, np.float64),
+            client.astype(np.float64), timestamp
+        )
+
+    @classmethod
+    def concat(cls, parts: List["EventColumns"]) -> "EventColumns":
+        if not parts:
+            return cls.from_events([])
+        return cls(
+            *(Categorical.concat([getattr(p, name) for p in parts])
+              for name in ("event", "session", "feature", "message_type", "command_type", "event_type")),
+            *(np.concatenate([getattr(p, name) for p in parts])
+              for name in ("success",) + cls.NUMERIC + ("client_timestamp", "timestamp"))
+        )
+
+
+def _in_first_seen_order(codes) -> list:
+    """Distinct codes in the order they first occur (like dict insertion order)"""
+    unique, first = np.unique(codes, return_index=True)
+    return unique[np.argsort(first, kind="stable")].tolist()
+
+
+def _last_per_code(codes, values, size: int):
+    """values[last row of each code], 0 for codes that never occur"""
+    result = np.zeros(size, dtype=np.float64)
+    unique, last = np.unique(codes[::-1], return_index=True)
+    result[unique] = values[::-1][last]
+    return result
+
+
+def user_engagement(c: EventColumns) -> dict:
+    rows = c.session.truthy()[c.session.codes]
+    sessions = c.session.codes[rows]
+    total_sessions = len(np.unique(sessions))
+    if total_sessions == 0:
+        return {"avg_messages_per_session": 0, "avg_session_duration": 0}
+
+    names = c.event.codes[rows]
+    messages = int(np.count_nonzero(names == c.event.code_of("message_sent")))
+    voice = int(np.count_nonzero(names == c.event.code_of("voice_used")))
+    # A session's start/end is the client time of its last session_start/session_end
+    client_timestamp = c.client_timestamp[rows]
+    size = len(c.session.labels)
+    starts, ends = (
+        _last_per_code(sessions[mask], client_timestamp[mask], size)
+        for mask in (names == c.event.code_of("session_start"), names == c.event.code_of("session_end"))
+    )
+    complete = (starts != 0) & (ends != 0)
+    durations = int(np.count_nonzero(complete))
+    duration_total = float(((ends[complete] - starts[complete]) / (1000 * 60)).sum())
+    return {
+        "total_sessions": total_sessions,
+        "avg_messages_per_session": messages / total_sessions,
+        "avg_voice_usage_per_session": voice / total_sessions,
+        "avg_session_duration_minutes": duration_total / durations if durations else 0,
+        "voice_usage_percentage": (voice / max(messages, 1)) * 100
+    }
+
+
+def feature_usage(c: EventColumns) -> dict:
+    codes = c.feature.codes[c.event.equals("feature_used")]
+    codes = codes[c.feature.truthy()[codes]]
+    counts = np.bincount(codes, minlength=len(c.feature.labels))
+    feature_counts = {c.feature.labels[code]: int(counts[code]) for code in _in_first_seen_order(codes)}
+    return {
+        "feature_counts": feature_counts,
+        "total_feature_usage": sum(feature_counts.values()),
+        "most_popular_feature": max(feature_counts, key=feature_counts.get) if feature_counts else None
+    }
+
+
+def conversation_metrics(c: EventColumns) -> dict:
+    messages = c.event.equals("message_sent")
+    total = int(np.count_nonzero(messages))
+    voice = int(np.count_nonzero(messages & c.message_type.equals("voice")))
+    return {
+        "total_messages": total,
+        "text_messages": int(np.count_nonzero(messages & c.message_type.equals("text"))),
+        "voice_messages": voice,
+        "voice_percentage": (voice / max(total, 1)) * 100
+    }
+
+
+def command_analytics(c: EventColumns) -> dict:
+    rows = c.event.equals("command_executed")
+    total_commands = int(np.count_nonzero(rows))
+    if not total_commands:
+        return {"total_commands": 0, "command_types": {}, "success_rate": 0}
+
+    codes = c.command_type.codes[rows]
+    labels = list(c.command_type.labels)
+    # A missing command_type counts as "unknown", merged with any literal "unknown"
+    unknown = c.command_type.code_of("unknown")
+    if unknown > 0:
+        codes = np.where(codes == 0, unknown, codes)
+    labels[0] = "unknown"
+    counts = np.bincount(codes, minlength=len(labels))
+    command_types = {labels[code]: int(counts[code]) for code in _in_first_seen_order(codes)}
+
+    successful = int(np.count_nonzero(c.success[rows]))
+    most_popular = max(command_types, key=command_types.get) if command_types else None
+    return {
+        "total_commands": total_commands,
+        "command_types": command_types,
+        "successful_commands": successful,
+        "failed_commands": total_commands - successful,
+        "success_rate_percentage": round((successful / total_commands) * 100, 1),
+        "most_popular_command_type": most_popular,
+        "command_distribution": {
+            cmd_type: {
+                "count": count,
+                "percentage": round((count / total_commands) * 100, 1)
+            }
+            for cmd_type, count in command_types.items()
+        }
+    }
+
+
+def engagement_metrics(c: EventColumns) -> dict:
+    time_rows = c.event.equals("time_spent_detailed")
+    session_rows = c.event.equals("session_end")
+    time_events = int(np.count_nonzero(time_rows))
+    sessions_count = int(np.count_nonzero(session_rows))
+    if not time_events and not sessions_count:
+        return {"error": "No engagement data available"}
+
+    total_session_time = float(c.session_seconds[time_rows].sum())
+    total_interaction_time = float(c.interaction_seconds[time_rows].sum())
+    scores = c.score[session_rows]
+    scores = scores[~np.isnan(scores)]
+    hidden = c.event.equals("page_visibility") & c.event_type.equals("hidden")
+    total_visible_time = float(c.visible_seconds[hidden].sum())
+
+    # Score histogram: [0, 50) low, [50, 80) medium, [80, inf) high
+    low, medium, high = np.histogram(scores, bins=[-np.inf, 50, 80, np.inf])[0].tolist()
+
+    avg_session_duration = (total_session_time / sessions_count) if sessions_count > 0 else 0
+    avg_interaction_time = (total_interaction_time / sessions_count) if sessions_count > 0 else 0
+    avg_engagement_score = float(scores.mean()) if len(scores) else 0
+    return {
+        "total_sessions": sessions_count,
+        "avg_session_duration_minutes": round(avg_session_duration / 60, 2),
+        "avg_interaction_time_minutes": round(avg_interaction_time / 60, 2),
+        "avg_idle_time_minutes": round((avg_session_duration - avg_interaction_time) / 60, 2),
+        "interaction_rate_percentage": round((avg_interaction_time / max(avg_session_duration, 1)) * 100, 1),
+        "avg_engagement_score": round(avg_engagement_score, 1),
+        "total_visible_time_hours": round(total_visible_time / 3600, 2),
+        "engagement_score_distribution": {
+            "high (80-100)": high,
+            "medium (50-79)": medium,
+            "low (0-49)": low
+        }
+    }
+
+
+def _local_days(timestamps):
+    """Local day number (days since the epoch, local time) of each int64 ms timestamp"""
+    seconds = timestamps // 1000
+    hours = seconds // 3600
+    # UTC offsets only change on hour boundaries, so look one up per distinct hour
+    unique_hours, inverse = np.unique(hours, return_inverse=True)
+    offsets = np.array([
+        datetime.fromtimestamp(int(hour) * 3600).astimezone().utcoffset().total_seconds()
+        for hour in unique_hours
+    ], dtype=np.int64)
+    return (seconds + offsets[inverse.reshape(-1)]) // 86400
+
+
+def daily_event_counts(c: EventColumns) -> Dict[str, Dict[str, int]]:
+    """Events per local day and event name, via one bincount over (day, event) pairs"""
+    if not len(c):
+        return {}
+    day_numbers = _local_days(c.timestamp)
+    unique_days, day_codes = np.unique(day_numbers, return_inverse=True)
+    n_events = len(c.event.labels)
+    counts = np.bincount(day_codes.reshape(-1) * n_events + c.event.codes, minlength=len(unique_days) * n_events)
+    counts = counts.reshape(len(unique_days), n_events)
+    result = {}
+    for i, day_number in enumerate(unique_days.tolist()):
+        day = datetime.utcfromtimestamp(day_number * 86400).strftime("%Y-%m-%d")
+        row = counts[i]
+        result[day] = {str(c.event.labels[code]): int(row[code]) for code in np.flatnonzero(row).tolist()}
+    return result
+
+
+def compute(c: EventColumns) -> Dict[str, dict]:
+    return {
+        "user_engagement": user_engagement(c),
+        "feature_usage": feature_usage(c),
+        "conversation_metrics": conversation_metrics(c),
+        "command_analytics": command_analytics(c),
+        "engagement_metrics": engagement_metrics(c)
+    }
+
+
+# --- benchmark ---
+
+def _sample_events(n: int, seed: int = 1) -> List[dict]:
+    rng = random.Random(seed)
+    names = ["session_start", "session_end", "message_sent", "voice_used", "feature_used", "command_executed",
+             "time_spent_detailed", "page_visibility", "daily_active_user"]
+    now_ms = int(time.time() * 1000)
+    events = []
+    for _ in range(n):
+        name = rng.choice(names)
+        data = {"user_id": f"user_{rng.randrange(1000)}"}
+        if name == "session_end":
+            data["engagement_score"] = rng.choice([None, rng.randrange(101), rng.random() * 100, "n/a"])
+        elif name == "feature_used":
+            data["feature"] = rng.choice(["timer", "habits", "voice", "", None])
+        elif name == "message_sent":
+            data["type"] = rng.choice(["text", "voice", "image", None])
+        elif name == "command_executed":
+            if rng.random() < 0.9:
+                data["command_type"] = rng.choice(["timer", "habit", "reminder", "unknown", None])
+            data["success"] = rng.choice([True, False, None, 1])
+        elif name == "time_spent_detailed":
+            data["session_duration_seconds"] = rng.choice([rng.randrange(3600), rng.random() * 3600, None])
+            data["interaction_time_seconds"] = rng.randrange(1800)
+        elif name == "page_visibility":
+            data["event_type"] = rng.choice(["hidden", "visible"])
+            data["visible_duration_seconds"] = rng.random() * 600
+        timestamp = now_ms - rng.randrange(60 * 86_400_000)
+        event = {"event": name, "data": data, "client_timestamp": timestamp, "server_timestamp": timestamp}
+        if rng.random() < 0.95:
+            event["session_id"] = rng.choice([f"s{rng.randrange(500)}", None, ""])
+        events.append(event)
+    return events
+
+
+def _synthetic_columns(n: int, seed: int = 0) -> "EventColumns":
+    """n events built directly as arrays (10^7 event dicts wouldn't fit in memory)"""
+    rng = np.random.default_rng(seed)
+    names = ["session_start", "session_end", "message_sent", "voice_used", "feature_used", "command_executed",
+             "time_spent_detailed", "page_visibility"]
+    now_ms = int(time.time() * 1000)
+    return EventColumns(
+        Categorical(rng.integers(1, len(names) + 1, n), [MISSING] + names),
+        Categorical(rng.integers(0, 10_001, n), [MISSING] + [f"s{i}" for i in range(10_000)]),
+        Categorical(rng.integers(0, 4, n), [MISSING, "timer", "habits", "voice"]),
+        Categorical(rng.integers(0, 3, n), [MISSING, "text", "voice"]),
+        Categorical(rng.integers(0, 4, n), [MISSING, "timer", "habit", "reminder"]),
+        Categorical(rng.integers(0, 3, n), [MISSING, "hidden", "visible"]),
+        rng.random(n) < 0.8,
+        rng.random(n) * 3600, rng.random(n) * 1800, rng.random(n) * 600,
+        np.where(rng.random(n) < 0.9, rng.random(n) * 100, np.nan),
+        (now_ms - rng.integers(0, 90 * 86_400_000, n)).astype(np.float64),
+        now_ms - rng.integers(0, 90 * 86_400_000, n)
+    )
+
+
+def benchmark(sizes=(10 ** 6, 10 ** 7), python_max: int = 10 ** 6):
+    """Vectorized metrics vs the per-event calculate_* functions"""
+    from src.Backend.routes.analytics import (
+        calculate_user_engagement, calculate_feature_usage, calculate_conversation_metrics,
+        calculate_command_analytics, calculate_engagement_metrics
+    )
+    for n in sizes:
+        columns = _synthetic_columns(n)
+        start = time.perf_counter()
+        compute(columns)
+        vectorized = time.perf_counter() - start
+        start = time.perf_counter()
+        daily_event_counts(columns)
+        daily = time.perf_counter() - start
+        line = f"  n={n:>11,}: numpy {vectorized * 1000:8.1f} ms, per-day group-by {daily * 1000:8.1f} ms"
+        if n <= python_max:
+            events = _sample_events(n)
+            start = time.perf_counter()
+            calculate_user_engagement(events)
+            calculate_feature_usage(events)
+            calculate_conversation_metrics(events)
+            calculate_command_analytics(events)
+            calculate_engagement_metrics(events)
+            python = time.perf_counter() - start
+            start = time.perf_counter()
+            EventColumns.from_events(events)
+            load = time.perf_counter() - start
+            line += f", python {python * 1000:8.1f} ms ({python / vectorized:.0f}x), loading dicts {load * 1000:.0f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    if np is None:
+        raise SystemExit("numpy is not installed (pip install numpy)")
+    benchmark()
@@ -0,0 +1,540 @@
+"""Daily, columnar partitions of the analytics log.
+
+``ANALYTICS_FILE`` is one large JSONL file and every read re-parses
+every field as text. ``AnalyticsPartitions`` tails it (from a stored
+position, like the rollups) and splits the events by server day into
+``ANALYTICS_PARTITION_DIR``:
+
+* ``YYYY-MM-DD.jsonl``: raw lines of a day that is still open;
+* ``YYYY-MM-DD.col``: a closed day, compacted into columns.
+
+A day is closed ``ANALYTICS_PARTITION_GRACE_HOURS`` after it ends. Its
+columnar file holds one ``array`` per field. Every field is dictionary
+encoded: the column stores small integer codes (0 = field absent) and the
+header stores each distinct value once. This covers event names, session
+ids and every key of ``data`` (as ``data.<key>`` columns). The timestamps
+are stored as plain int64 columns. Reading a partition decodes each
+distinct value once and rebuilds events from the codes, so no JSON is
+parsed per row.
+
+NumPy is not a dependency of this app, so the columns are stdlib ``array``
+buffers. The layout is a header followed by raw column bytes, which
+``numpy.frombuffer`` reads as-is: when NumPy is installed,
+``analytics_numpy`` computes most sections of ``metrics`` from the columns,
+and only the rows retention and the DAU trend need are rebuilt as events.
+
+Readers ask for a day window (``iter_window``) and only open the files of
+those days, so the 30-day DAU trend touches at most 31 partitions however
+long the history is. The log position (see ``analytics_log``) and the
+committed size of every open-day file live in a small SQLite database.
+Compaction writes the merged day to ``YYYY-MM-DD.col.new`` and records it as
+staged in the same transaction that empties the open file's committed size.
+The staged file replaces ``.col`` in a second transaction, and whichever
+run sees a staged day next finishes the move. An interrupted run therefore
+neither loses nor duplicates lines, and several workers can run the job. ``analytics_maintenance`` expires old days with
+``expire`` once they have a daily summary.
+"""
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.Backend import analytics_numpy
+from src.Backend.analytics_writer import ANALYTICS_FILE
+from src.Backend.analytics_log import ANALYTICS_ARCHIVE_DIR, read_chunk, is_caught_up
+from src.Backend.analytics_metrics import (
+    iter_events, feed_accumulators, METRIC_ACCUMULATORS, RetentionMetrics, DauMauTrends
+)
+from src.Backend.scheduler import scheduler
+from src.Backend.user_data import connect
+
+ANALYTICS_PARTITION_DIR = os.getenv("ANALYTICS_PARTITION_DIR", "data/analytics")
+ANALYTICS_PARTITION_INTERVAL = int(os.getenv("ANALYTICS_PARTITION_INTERVAL", "300"))
+ANALYTICS_PARTITION_GRACE_HOURS = float(os.getenv("ANALYTICS_PARTITION_GRACE_HOURS", "1"))
+# The DAU trend covers 30 client dates; one extra partition absorbs timezone skew
+TREND_PARTITIONS = 31
+PARTITION_CHUNK_BYTES = int(os.getenv("PARTITION_CHUNK_BYTES", str(4 * 1024 * 1024)))
+
+_MAGIC = b"RUHCOL1\n"
+_TIMESTAMP_COLUMNS = ("client_timestamp", "server_timestamp")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS partition_state (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS partitions (
+    day TEXT PRIMARY KEY,
+    open_bytes INTEGER NOT NULL DEFAULT 0,
+    rows INTEGER NOT NULL DEFAULT 0,
+    compacted_rows INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS staged_partitions (
+    day TEXT PRIMARY KEY
+);
+"""
+
+
+def event_day(event: dict) -> str:
+    """The server-side day an event belongs to"""
+    timestamp = event.get("server_timestamp") or event.get("client_timestamp") or 0
+    if not isinstance(timestamp, (int, float)):
+        timestamp = 0
+    return datetime.fromtimestamp(timestamp / 1000).strftime("%Y-%m-%d")
+
+
+def _codes_array(size: int) -> array:
+    for typecode in ("B", "H", "I", "Q"):
+        if size < 1 << (8 * array(typecode).itemsize):
+            return array(typecode)
+    raise ValueError("dictionary too large")
+
+
+# --- columnar files ---
+
+class _Absent:
+    def __repr__(self):
+        return "<absent>"
+
+
+_ABSENT = _Absent()
+
+
+def write_columns(path: str, events: List[dict]):
+    """Write events as one columnar partition (atomically replaces `path`)"""
+    rows = len(events)
+    data_keys = {}
+    for event in events:
+        data = event.get("data")
+        if isinstance(data, dict):
+            data_keys.update(dict.fromkeys(data))
+    top_keys = {}
+    for event in events:
+        top_keys.update(dict.fromkeys(key for key in event if key != "data"))
+
+    columns = []
+    for name in list(top_keys) + ["data." + key for key in data_keys]:
+        if name.startswith("data."):
+            key = name[5:]
+            values = [e["data"].get(key, _ABSENT) if isinstance(e.get("data"), dict) else _ABSENT for e in events]
+        else:
+            values = [event.get(name, _ABSENT) for event in events]
+
+        if name in _TIMESTAMP_COLUMNS and all(type(v) is int for v in values):
+            columns.append(({"name": name, "type": "q"}, array("q", values)))
+            continue
+
+        # Dictionary encoding: code 0 means the field is absent
+        index = {}
+        dictionary = []
+        codes = []
+        for value in values:
+            if value is _ABSENT:
+                codes.append(0)
+                continue
+            key = json.dumps(value, sort_keys=True)
+            code = index.get(key)
+            if code is None:
+                dictionary.append(value)
+                code = index[key] = len(dictionary)
+            codes.append(code)
+        column = _codes_array(len(dictionary) + 1)
+        column.extend(codes)
+        columns.append(({"name": name, "type": column.typecode, "dictionary": dictionary}, column))
+
+    header = json.dumps({
+        "rows": rows,
+        "byteorder": sys.byteorder,
+        "columns": [meta for meta, _ in columns]
+    }).encode()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for _, column in columns:
+            column.tofile(f)
+    os.replace(tmp_path, path)
+
+
+def read_columns(path: str) -> Dict[str, tuple]:
+    """name -> (meta, array) for every column of a partition file"""
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} is not a columnar partition")
+        (header_length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_length))
+        rows = header["rows"]
+        columns = {}
+        for meta in header["columns"]:
+            column = array(meta["type"])
+            column.fromfile(f, rows)
+            if header["byteorder"] != sys.byteorder:
+                column.byteswap()
+            columns[meta["name"]] = (meta, column)
+    return columns
+
+
+def iter_columns(path: str, events: Optional[Iterable[str]] = None) -> Iterator[dict]:
+    """Rebuild the events of a columnar partition, in their original order
+
+    With `events`, only rows with one of those event names are rebuilt.
+    """
+    columns = read_columns(path)
+    selected = None
+    if events is not None and "event" in columns:
+        meta, column = columns["event"]
+        wanted = set(events)
+        codes = {code for code, name in enumerate(meta["dictionary"], 1) if name in wanted}
+        selected = [row for row, code in enumerate(column) if code in codes]
+    top, data = [], []
+    rows = 0
+    for name, (meta, column) in columns.items():
+        rows = len(column)
+        dictionary = meta.get("dictionary")
+        # Decoded values per row; index 0 (absent) maps to _ABSENT
+        values = column if dictionary is None else [_ABSENT] + dictionary
+        target = data if name.startswith("data.") else top
+        target.append((name[5:] if name.startswith("data.") else name, column, values, dictionary is None))
+    for row in range(rows) if selected is None else selected:
+        event = {}
+        for name, column, values, raw in top:
+            value = column[row] if raw else values[column[row]]
+            if value is not _ABSENT:
+                event[name] = value
+        event_data = {}
+        for name, column, values, raw in data:
+            value = values[column[row]]
+            if value is not _ABSENT:
+                event_data[name] = value
+        event["data"] = event_data
+        yield event
+
+
+class AnalyticsPartitions:
+    """Splits the analytics log into daily partitions and compacts closed days"""
+
+    def __init__(self, directory: str = ANALYTICS_PARTITION_DIR, log_path: str = ANALYTICS_FILE,
+                 archive_dir: str = ANALYTICS_ARCHIVE_DIR):
+        self.directory = directory
+        self.log_path = log_path
+        self.archive_dir = archive_dir
+        self._db = None
+        self._lock = threading.Lock()
+        self.last_run_ms = 0.0
+        self.compacted_days = 0
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(self.directory, exist_ok=True)
+            db = connect(os.path.join(self.directory, "partitions.db"))
+            db.executescript(_SCHEMA)
+            self._recover(db)
+            self._db = db
+        return self._db
+
+    def path(self, day: str, compacted: bool) -> str:
+        return os.path.join(self.directory, f"{day}.{'col' if compacted else 'jsonl'}")
+
+    def _finish_staged(self, db, day: str):
+        """Move a committed compaction into place (inside a write transaction)"""
+        if not db.execute("SELECT 1 FROM staged_partitions WHERE day = ?", (day,)).fetchone():
+            return
+        col_path = self.path(day, compacted=True)
+        if os.path.exists(col_path + ".new"):
+            os.replace(col_path + ".new", col_path)
+        row = db.execute("SELECT open_bytes FROM partitions WHERE day = ?", (day,)).fetchone()
+        # Lines appended since the compaction committed are kept for the next one
+        if not row or not row[0]:
+            try:
+                os.remove(self.path(day, compacted=False))
+            except FileNotFoundError:
+                pass
+        db.execute("DELETE FROM staged_partitions WHERE day = ?", (day,))
+
+    def _recover(self, db):
+        """Finish compactions that committed before a crash and drop the files of ones that didn't"""
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            staged = [row[0] for row in db.execute("SELECT day FROM staged_partitions")]
+            for day in staged:
+                self._finish_staged(db, day)
+            for name in os.listdir(self.directory):
+                if name.endswith(".col.new") and name[:-len(".col.new")] not in staged:
+                    os.remove(os.path.join(self.directory, name))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _position(self, db) -> tuple:
+        """(inode, offset) of the next unread log line"""
+        state = dict(db.execute("SELECT name, value FROM partition_state WHERE name IN ('inode', 'offset')"))
+        return state.get("inode", 0), state.get("offset", 0)
+
+    def position(self) -> tuple:
+        with self._lock:
+            return self._position(self._connect())
+
+    # --- partitioning ---
+
+    def partition(self) -> int:
+        """Move log lines written since the last run into their day's open partition"""
+        moved = 0
+        with self._lock:
+            db = self._connect()
+            while not is_caught_up(self.log_path, *self._position(db)):
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    chunk = read_chunk(self.log_path, *self._position(db), PARTITION_CHUNK_BYTES, self.archive_dir)
+                    if chunk is None:
+                        db.execute("COMMIT")
+                        break
+                    offset = chunk.offset
+                    by_day: Dict[str, List[bytes]] = {}
+                    for line in chunk.lines:
+                        offset += len(line)
+                        try:
+                            event = json.loads(line)
+                        except ValueError:
+                            continue
+                        if isinstance(event, dict):
+                            by_day.setdefault(event_day(event), []).append(line)
+
+                    for day, day_lines in by_day.items():
+                        self._append_open(db, day, day_lines)
+                    db.executemany(
+                        "INSERT INTO partition_state (name, value) VALUES (?, ?) "
+                        "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                        (("inode", chunk.inode), ("offset", offset))
+                    )
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+                moved += sum(len(day_lines) for day_lines in by_day.values())
+                if not chunk.lines:
+                    break
+        return moved
+
+    def _append_open(self, db, day: str, lines: List[bytes]):
+        row = db.execute("SELECT open_bytes FROM partitions WHERE day = ?", (day,)).fetchone()
+        committed = row[0] if row else 0
+        path = self.path(day, compacted=False)
+        with open(path, "ab") as f:
+            # Drop anything a run that didn't commit appended
+            f.truncate(committed)
+            f.seek(committed)
+            f.write(b"".join(lines))
+        db.execute(
+            "INSERT INTO partitions (day, open_bytes, rows) VALUES (?, ?, ?) "
+            "ON CONFLICT (day) DO UPDATE SET open_bytes = excluded.open_bytes, rows = rows + ?",
+            (day, committed + sum(len(line) for line in lines), len(lines), len(lines))
+        )
+
+    def compact(self, now: Optional[datetime] = None) -> int:
+        """Turn every closed day's open partition into a columnar one; returns how many days"""
+        now = now or datetime.now()
+        closed_before = (now - timedelta(hours=ANALYTICS_PARTITION_GRACE_HOURS)).strftime("%Y-%m-%d")
+        compacted = 0
+        with self._lock:
+            db = self._connect()
+            days = [row[0] for row in db.execute(
+                "SELECT day FROM partitions WHERE open_bytes > 0 AND day < ? ORDER BY day", (closed_before,)
+            )]
+            for day in days:
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    # Another worker's compaction of this day may still be staged
+                    self._finish_staged(db, day)
+                    row = db.execute("SELECT open_bytes FROM partitions WHERE day = ?", (day,)).fetchone()
+                    if not row or not row[0]:
+                        db.execute("COMMIT")
+                        continue
+                    col_path = self.path(day, compacted=True)
+                    open_path = self.path(day, compacted=False)
+                    # Late events for a day that was already compacted are merged in
+                    events = list(iter_columns(col_path)) if os.path.exists(col_path) else []
+                    events.extend(_read_open(open_path, row[0]))
+                    # Not in place until committed, so a crash can't merge the open lines twice
+                    write_columns(col_path + ".new", events)
+                    db.execute(
+                        "UPDATE partitions SET open_bytes = 0, rows = ?, compacted_rows = ? WHERE day = ?",
+                        (len(events), len(events), day)
+                    )
+                    db.execute("INSERT OR IGNORE INTO staged_partitions (day) VALUES (?)", (day,))
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    self._finish_staged(db, day)
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+                compacted += 1
+        self.compacted_days += compacted
+        return compacted
+
+    def closed_days(self) -> Dict[str, int]:
+        """day -> rows of every day that is fully compacted"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT day, rows FROM partitions WHERE open_bytes = 0 AND compacted_rows > 0 ORDER BY day"
+            ).fetchall()
+        return dict(rows)
+
+    def days(self) -> Dict[str, int]:
+        """day -> rows of every partition, open or compacted"""
+        with self._lock:
+            rows = self._connect().execute("SELECT day, rows FROM partitions ORDER BY day").fetchall()
+        return dict(rows)
+
+    def expire(self, before_day: str) -> int:
+        """Delete the partitions of every day before `before_day`; returns how many days"""
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                days = [row[0] for row in db.execute("SELECT day FROM partitions WHERE day < ?", (before_day,))]
+                db.execute("DELETE FROM partitions WHERE day < ?", (before_day,))
+                db.execute("DELETE FROM staged_partitions WHERE day < ?", (before_day,))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            # Files go after the commit, so the table never points at a missing file
+            for day in days:
+                for path in (self.path(day, True), self.path(day, True) + ".new", self.path(day, False)):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+        return len(days)
+
+    def run(self) -> dict:
+        start = time.perf_counter()
+        moved = self.partition()
+        compacted = self.compact()
+        self.last_run_ms = (time.perf_counter() - start) * 1000
+        if compacted:
+            print(f"🗂️ Compacted {compacted} analytics day partitions into {self.directory}")
+        return {"events": moved, "compacted_days": compacted}
+
+    # --- reading ---
+
+    def iter_day(self, day: str, events: Optional[Iterable[str]] = None) -> Iterator[dict]:
+        """A day's events; with `events`, only those event names"""
+        col_path = self.path(day, compacted=True)
+        if os.path.exists(col_path):
+            yield from iter_columns(col_path, events)
+        open_path = self.path(day, compacted=False)
+        if os.path.exists(open_path):
+            if events is None:
+                yield from iter_events(open_path)
+            else:
+                wanted = set(events)
+                yield from (event for event in iter_events(open_path) if event.get("event") in wanted)
+
+    def columns(self, day: str) -> "analytics_numpy.EventColumns":
+        """One day's events as NumPy columns (requires numpy)"""
+        parts = []
+        col_path = self.path(day, compacted=True)
+        if os.path.exists(col_path):
+            parts.append(analytics_numpy.EventColumns.from_partition(col_path))
+        open_path = self.path(day, compacted=False)
+        if os.path.exists(open_path):
+            parts.append(analytics_numpy.EventColumns.from_events(iter_events(open_path)))
+        return analytics_numpy.EventColumns.concat(parts)
+
+    def iter_window(self, days: int, now: Optional[datetime] = None) -> Iterator[dict]:
+        """Events of the last `days` days (today included), oldest day first"""
+        now = now or datetime.now()
+        for i in range(days - 1, -1, -1):
+            yield from self.iter_day((now - timedelta(days=i)).strftime("%Y-%m-%d"))
+
+    def metrics(self, days: int, now: Optional[datetime] = None) -> dict:
+        """Every /metrics section over the last `days` days, reading only those partitions"""
+        now = now or datetime.now()
+        accumulators = [cls(now) if cls in (RetentionMetrics, DauMauTrends) else cls()
+                        for cls in METRIC_ACCUMULATORS]
+        vectorized = analytics_numpy.numpy_enabled()
+        if vectorized:
+            # Computed from the window's columns instead of per event
+            accumulators = [acc for acc in accumulators if acc.name not in analytics_numpy.VECTORIZED_METRICS]
+        window = [acc for acc in accumulators if not isinstance(acc, DauMauTrends)]
+        trends = [acc for acc in accumulators if isinstance(acc, DauMauTrends)]
+        parts = []
+        # One pass over the days either part needs; the trend always reads its own 31
+        for i in range(max(days, TREND_PARTITIONS) - 1, -1, -1):
+            day = (now - timedelta(days=i)).strftime("%Y-%m-%d")
+            wanted = (window if i < days else []) + (trends if i < TREND_PARTITIONS else [])
+            names = None
+            if all(acc.events is not None for acc in wanted):
+                names = {name for acc in wanted for name in acc.events}
+            if wanted:
+                feed_accumulators(self.iter_day(day, names), wanted)
+            if vectorized and i < days:
+                parts.append(self.columns(day))
+        results = {acc.name: acc.result() for acc in accumulators}
+        if vectorized:
+            results.update(analytics_numpy.compute(analytics_numpy.EventColumns.concat(parts)))
+        return {cls.name: results[cls.name] for cls in METRIC_ACCUMULATORS}
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._connect()
+            inode, offset = self._position(db)
+            row = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(rows), 0), COALESCE(SUM(open_bytes > 0), 0) FROM partitions"
+            ).fetchone()
+        col_bytes = sum(
+            entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith(".col")
+        ) if os.path.isdir(self.directory) else 0
+        return {
+            "directory": self.directory,
+            "inode": inode,
+            "offset": offset,
+            "days": row[0],
+            "events": row[1],
+            "open_days": row[2],
+            "columnar_bytes": col_bytes,
+            "last_run_ms": round(self.last_run_ms, 3)
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def _read_open(path: str, committed: int) -> Iterator[dict]:
+    """Events in the committed part of an open partition"""
+    with open(path, "rb") as f:
+        for line in f.read(committed).splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                yield event
+
+
+analytics_partitions = AnalyticsPartitions()
+
+
+def schedule_partitioning():
+    """Partition and compact the log now and every ANALYTICS_PARTITION_INTERVAL seconds"""
+    try:
+        analytics_partitions.run()
+    finally:
+        scheduler.schedule(schedule_partitioning, delay_seconds=ANALYTICS_PARTITION_INTERVAL,
+                           kind="analytics_partition", description="split the analytics log into day partitions")
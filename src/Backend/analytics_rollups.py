@@ -0,0 +1,663 @@
+"""Incrementally maintained analytics rollups.
+
+``/api/analytics/summary`` and ``/api/analytics/metrics`` used to load and
+``json.loads`` all of ``analytics_data.jsonl`` on every dashboard refresh and
+then make several more full passes over the event list. They now read
+aggregates from a small SQLite database (``ANALYTICS_ROLLUP_DB``) that is
+kept up to date as events are ingested:
+
+* ``rollup_counters``: named counters and sums, optionally keyed (per event
+  name, per feature, per command type, per day, ...);
+* ``rollup_sketches``: HyperLogLog sketches of the distinct users,
+  sessions, daily and monthly active users (see ``hyperloglog``). Each
+  update also stores the sketch's estimate as a counter, so distinct
+  counts are read without touching the sketch. With
+  ``ANALYTICS_DISTINCT_COUNTING=exact`` the ids go into ``rollup_members``
+  instead, and a counter is bumped the first time a member is inserted.
+  Switching modes clears the rollups, and the next catch-up rebuilds them;
+* ``rollup_sessions`` / ``rollup_users``: per-session start/end times and
+  per-user session counts, so durations and returning users can be adjusted
+  as sessions progress;
+* ``rollup_daily_events``: events per day and event name;
+* ``rollup_latest``: the last ``ROLLUP_LATEST_EVENTS`` events.
+
+Rollups tail the log instead of trusting each batch: ``catch_up()`` applies
+everything after the position (log inode and byte offset) stored in
+``rollup_state`` and advances it in the same transaction. The writer calls
+it after every flush and the read endpoints call it before answering, so
+events from every worker are counted exactly once, and the first call on an
+existing log backfills it. A rotated log is finished before the new one is
+read (see ``analytics_log``). The rollups outlive the raw events the
+maintenance job expires; only ``rebuild()`` is limited to what is retained.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from src.Backend.analytics_writer import ANALYTICS_FILE
+from src.Backend.analytics_log import (
+    ANALYTICS_ARCHIVE_DIR, read_chunk, is_caught_up, active_inode, list_segments, iter_segment_events
+)
+from src.Backend.hyperloglog import HyperLogLog, use_sketches, ANALYTICS_HLL_PRECISION
+from src.Backend.user_data import connect
+
+ANALYTICS_ROLLUP_DB = os.getenv("ANALYTICS_ROLLUP_DB", "data/analytics_rollups.db")
+ROLLUP_CHUNK_BYTES = int(os.getenv("ROLLUP_CHUNK_BYTES", str(4 * 1024 * 1024)))
+ROLLUP_LATEST_EVENTS = 10
+
+_TABLES = ("rollup_state", "rollup_counters", "rollup_members", "rollup_sketches", "rollup_sessions",
+           "rollup_users", "rollup_daily_events", "rollup_latest")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollup_counters (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL DEFAULT '',
+    value REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_members (
+    name TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    member TEXT NOT NULL,
+    PRIMARY KEY (name, scope, member)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_sketches (
+    name TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    registers BLOB NOT NULL,
+    PRIMARY KEY (name, scope)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_sessions (
+    session_id TEXT PRIMARY KEY,
+    start_time REAL,
+    end_time REAL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_users (
+    user_id TEXT PRIMARY KEY,
+    session_starts INTEGER NOT NULL DEFAULT 0,
+    frequency TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_daily_events (
+    day TEXT NOT NULL,
+    event TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, event)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_latest (
+    id INTEGER PRIMARY KEY,
+    event TEXT NOT NULL
+);
+"""
+
+
+def _number(value) -> float:
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+
+def _member(value) -> str:
+    # Members are stored as text; falsy ids (None, "") collapse to ""
+    return str(value) if value else ""
+
+
+def _whole(value):
+    """Counters are stored as REAL; hand integral ones back as int"""
+    return int(value) if float(value).is_integer() else value
+
+
+def _event_day(event: dict) -> str:
+    timestamp = event.get("server_timestamp") or event.get("client_timestamp") or 0
+    return datetime.fromtimestamp(_number(timestamp) / 1000).strftime("%Y-%m-%d")
+
+
+def _score_bucket(score) -> str:
+    if score >= 80:
+        return "high (80-100)"
+    if score >= 50:
+        return "medium (50-79)"
+    return "low (0-49)"
+
+
+class _Batch:
+    """Deltas for one chunk of events, written in one transaction"""
+
+    def __init__(self):
+        self.counters = Counter()          # (name, key) -> delta
+        self.members = {}                  # (name, scope, member) -> whether it counts toward (name, scope)
+        self.daily_events = Counter()      # (day, event) -> delta
+        self.session_times = {}            # session_id -> {"start_time": ts, "end_time": ts}
+        self.session_starts = Counter()    # user_id -> session_start events
+        self.frequencies = {}              # user_id -> last return frequency
+        self.latest = []
+
+    def add(self, event: dict):
+        name = event.get("event")
+        data = event.get("data")
+        if not isinstance(data, dict):
+            data = {}
+        session_id = event.get("session_id")
+        count = self.counters
+
+        count["events", ""] += 1
+        count["event", str(name)] += 1
+        self.daily_events[_event_day(event), str(name)] += 1
+        self.latest.append(event)
+
+        # Summary / user engagement
+        if "user_id" in data:
+            self.members["user", "", _member(data["user_id"])] = True
+        if session_id:
+            self.members["session", "", str(session_id)] = True
+            if name in ("session_start", "session_end"):
+                column = "start_time" if name == "session_start" else "end_time"
+                self.session_times.setdefault(str(session_id), {})[column] = event.get("client_timestamp")
+            elif name == "message_sent":
+                count["session_messages", ""] += 1
+            elif name == "voice_used":
+                count["session_voice", ""] += 1
+
+        if name == "feature_used":
+            feature = data.get("feature")
+            if feature:
+                count["feature", str(feature)] += 1
+        elif name == "message_sent":
+            count["messages", ""] += 1
+            count["message_type", str(data.get("type"))] += 1
+        elif name == "command_executed":
+            count["command_type", str(data.get("command_type", "unknown"))] += 1
+            count["commands_ok" if data.get("success", True) else "commands_failed", ""] += 1
+        elif name == "daily_active_user":
+            date, user_id = data.get("date"), data.get("user_id")
+            if date:
+                count["dau_events", str(date)] += 1
+                # Falsy users only count toward the 30-day unique users, like before
+                self.members["dau", str(date), _member(user_id)] = bool(user_id)
+        elif name == "monthly_active_user":
+            month, user_id = data.get("month"), data.get("user_id")
+            if month and user_id:
+                self.members["mau", str(month), _member(user_id)] = True
+        elif name == "return_user":
+            user_id, frequency = data.get("user_id"), data.get("return_frequency")
+            if user_id and frequency:
+                self.frequencies[_member(user_id)] = str(frequency)
+        elif name == "session_start":
+            user_id = data.get("user_id")
+            if user_id:
+                self.session_starts[_member(user_id)] += 1
+        elif name == "time_spent_detailed":
+            count["time_events", ""] += 1
+            count["time_session_seconds", ""] += _number(data.get("session_duration_seconds", 0))
+            count["time_interaction_seconds", ""] += _number(data.get("interaction_time_seconds", 0))
+        elif name == "page_visibility":
+            if data.get("event_type") == "hidden":
+                count["visible_seconds", ""] += _number(data.get("visible_duration_seconds", 0))
+
+        if name == "session_end":
+            count["session_ends", ""] += 1
+            score = data.get("engagement_score")
+            if isinstance(score, (int, float)):
+                count["score_sum", ""] += score
+                count["score_count", ""] += 1
+                count["score_bucket", _score_bucket(score)] += 1
+
+
+class AnalyticsRollups:
+    """Persisted aggregates over the analytics log, safe to use from the loop and worker threads"""
+
+    def __init__(self, db_path: str = ANALYTICS_ROLLUP_DB, log_path: str = ANALYTICS_FILE,
+                 archive_dir: str = ANALYTICS_ARCHIVE_DIR):
+        self.db_path = db_path
+        self.log_path = log_path
+        self.archive_dir = archive_dir
+        self._db = None
+        self._lock = threading.Lock()
+        self.parse_errors = 0
+        self.last_catch_up_ms = 0.0
+
+    def _connect(self):
+        if self._db is None:
+            db = connect(self.db_path)
+            db.executescript(_SCHEMA)
+            self._check_distinct_mode(db)
+            self._db = db
+        return self._db
+
+    def _check_distinct_mode(self, db):
+        """Clear the rollups if they were built with another distinct-counting mode"""
+        mode = ANALYTICS_HLL_PRECISION if use_sketches() else 0
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT value FROM rollup_state WHERE name = 'distinct_mode'").fetchone()
+            if row is None or row[0] != mode:
+                if row is not None:
+                    print(f"📊 Distinct counting changed, rebuilding analytics rollups in {self.db_path}")
+                self._clear(db)
+                db.execute("INSERT INTO rollup_state (name, value) VALUES ('distinct_mode', ?)", (mode,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _clear(self, db):
+        for table in _TABLES:
+            db.execute(f"DELETE FROM {table}")
+
+    # --- ingestion ---
+
+    def _position(self, db) -> tuple:
+        """(inode, offset) of the next unread log line"""
+        state = dict(db.execute("SELECT name, value FROM rollup_state WHERE name IN ('inode', 'offset')"))
+        return state.get("inode", 0), state.get("offset", 0)
+
+    def _set_position(self, db, inode: int, offset: int):
+        db.executemany(
+            "INSERT INTO rollup_state (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+            (("inode", inode), ("offset", offset))
+        )
+
+    def position(self) -> tuple:
+        with self._lock:
+            return self._position(self._connect())
+
+    def catch_up(self) -> int:
+        """Apply log lines written since the stored position; returns how many events were applied"""
+        start = time.perf_counter()
+        applied = 0
+        with self._lock:
+            db = self._connect()
+            while not is_caught_up(self.log_path, *self._position(db)):
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    # Re-read under the write lock; another worker may have advanced it
+                    chunk = read_chunk(self.log_path, *self._position(db), ROLLUP_CHUNK_BYTES, self.archive_dir)
+                    if chunk is None:
+                        db.execute("COMMIT")
+                        break
+                    offset = chunk.offset
+                    events = []
+                    for line in chunk.lines:
+                        offset += len(line)
+                        try:
+                            events.append(json.loads(line))
+                        except ValueError:
+                            if line.strip():
+                                self.parse_errors += 1
+                    self._apply(db, events)
+                    self._set_position(db, chunk.inode, offset)
+                    db.execute("COMMIT")
+                except BaseException:
+                    db.execute("ROLLBACK")
+                    raise
+                applied += len(events)
+                if not chunk.lines:
+                    break
+        self.last_catch_up_ms = (time.perf_counter() - start) * 1000
+        return applied
+
+    def on_flush(self, batch: List[dict]):
+        """Writer listener: the batch is in the log now, so tail it"""
+        self.catch_up()
+
+    def _apply(self, db, events: Iterable[dict]):
+        batch = _Batch()
+        for event in events:
+            if isinstance(event, dict):
+                batch.add(event)
+        if not batch.latest:
+            return
+        counters = batch.counters
+
+        if use_sketches():
+            self._apply_sketches(db, batch)
+        else:
+            # Distinct sets: count a member toward (name, scope) the first time it is seen
+            for (name, scope, member), counted in batch.members.items():
+                inserted = db.execute(
+                    "INSERT OR IGNORE INTO rollup_members (name, scope, member) VALUES (?, ?, ?)",
+                    (name, scope, member)
+                ).rowcount
+                if inserted and counted:
+                    counters[name + "s", scope] += 1
+
+        # Session durations: swap the session's old contribution for its new one
+        for session_id, times in batch.session_times.items():
+            row = db.execute(
+                "SELECT start_time, end_time FROM rollup_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            old_start, old_end = row if row else (None, None)
+            new_start = times.get("start_time", old_start)
+            new_end = times.get("end_time", old_end)
+            if old_start and old_end:
+                counters["duration_minutes", ""] -= (old_end - old_start) / (1000 * 60)
+                counters["durations", ""] -= 1
+            if new_start and new_end:
+                counters["duration_minutes", ""] += (new_end - new_start) / (1000 * 60)
+                counters["durations", ""] += 1
+            db.execute(
+                "INSERT INTO rollup_sessions (session_id, start_time, end_time) VALUES (?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET start_time = excluded.start_time, end_time = excluded.end_time",
+                (session_id, new_start, new_end)
+            )
+
+        # Users with sessions, returning users and the latest return frequency of each user
+        for user_id in set(batch.session_starts) | set(batch.frequencies):
+            row = db.execute(
+                "SELECT session_starts, frequency FROM rollup_users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            old_starts, old_frequency = row if row else (0, None)
+            new_starts = old_starts + batch.session_starts.get(user_id, 0)
+            new_frequency = batch.frequencies.get(user_id, old_frequency)
+            if old_starts == 0 and new_starts > 0:
+                counters["session_users", ""] += 1
+            if old_starts <= 1 < new_starts:
+                counters["returning_users", ""] += 1
+            if new_frequency != old_frequency:
+                if old_frequency is not None:
+                    counters["frequency", old_frequency] -= 1
+                counters["frequency", new_frequency] += 1
+            db.execute(
+                "INSERT INTO rollup_users (user_id, session_starts, frequency) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET session_starts = excluded.session_starts, "
+                "frequency = excluded.frequency",
+                (user_id, new_starts, new_frequency)
+            )
+
+        db.executemany(
+            "INSERT INTO rollup_counters (name, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (name, key) DO UPDATE SET value = value + excluded.value",
+            [(name, key, delta) for (name, key), delta in counters.items() if delta]
+        )
+        db.executemany(
+            "INSERT INTO rollup_daily_events (day, event, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (day, event) DO UPDATE SET count = count + excluded.count",
+            [(day, name, delta) for (day, name), delta in batch.daily_events.items()]
+        )
+        db.executemany(
+            "INSERT INTO rollup_latest (event) VALUES (?)",
+            [(json.dumps(event),) for event in batch.latest[-ROLLUP_LATEST_EVENTS:]]
+        )
+        db.execute(
+            "DELETE FROM rollup_latest WHERE id <= (SELECT MAX(id) FROM rollup_latest) - ?",
+            (ROLLUP_LATEST_EVENTS,)
+        )
+
+    def _apply_sketches(self, db, batch: "_Batch"):
+        """Add the batch's ids to their sketches and store the new estimates as counters"""
+        grouped = {}
+        for (name, scope, member), counted in batch.members.items():
+            if counted:
+                grouped.setdefault((name, scope), []).append(member)
+            else:
+                # Falsy users only matter for the 30-day unique users
+                batch.counters["anonymous_" + name, scope] += 1
+        estimates = []
+        for (name, scope), members in grouped.items():
+            row = db.execute(
+                "SELECT registers FROM rollup_sketches WHERE name = ? AND scope = ?", (name, scope)
+            ).fetchone()
+            sketch = HyperLogLog.from_bytes(row[0]) if row else HyperLogLog()
+            sketch.update(members)
+            db.execute(
+                "INSERT INTO rollup_sketches (name, scope, registers) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, scope) DO UPDATE SET registers = excluded.registers",
+                (name, scope, sketch.to_bytes())
+            )
+            estimates.append((name + "s", scope, sketch.count()))
+        db.executemany(
+            "INSERT INTO rollup_counters (name, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (name, key) DO UPDATE SET value = excluded.value",
+            estimates
+        )
+
+    def _unique_daily_users(self, db, days: List[str]) -> int:
+        """Distinct daily active users over `days`"""
+        placeholders = ",".join("?" * len(days))
+        if not use_sketches():
+            return db.execute(
+                f"SELECT COUNT(DISTINCT member) FROM rollup_members WHERE name = 'dau' AND scope IN ({placeholders})",
+                days
+            ).fetchone()[0]
+        union = HyperLogLog()
+        for (registers,) in db.execute(
+            f"SELECT registers FROM rollup_sketches WHERE name = 'dau' AND scope IN ({placeholders})", days
+        ):
+            union.merge(HyperLogLog.from_bytes(registers))
+        anonymous = db.execute(
+            f"SELECT COUNT(*) FROM rollup_counters WHERE name = 'anonymous_dau' AND key IN ({placeholders})", days
+        ).fetchone()[0]
+        return union.count() + (1 if anonymous else 0)
+
+    def rebuild(self) -> int:
+        """Drop every aggregate and re-read the retained log: rotated segments, then the active log"""
+        replayed = 0
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                mode = db.execute("SELECT value FROM rollup_state WHERE name = 'distinct_mode'").fetchone()
+                self._clear(db)
+                db.execute("INSERT INTO rollup_state (name, value) VALUES ('distinct_mode', ?)", (mode[0],))
+                # A segment rotated from here on is tailed from this position instead
+                inode = active_inode(self.log_path)
+                for segment in list_segments(self.archive_dir):
+                    if segment.inode == inode:
+                        break
+                    events = []
+                    for event in iter_segment_events(segment):
+                        events.append(event)
+                        if len(events) >= 10_000:
+                            self._apply(db, events)
+                            replayed += len(events)
+                            events = []
+                    self._apply(db, events)
+                    replayed += len(events)
+                self._set_position(db, inode, 0)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return replayed + self.catch_up()
+
+    # --- queries ---
+
+    def _counters(self, db, name: str) -> dict:
+        rows = db.execute("SELECT key, value FROM rollup_counters WHERE name = ? AND value != 0", (name,))
+        return {key: _whole(value) for key, value in rows}
+
+    def _scalars(self, db) -> Counter:
+        rows = db.execute("SELECT name, value FROM rollup_counters WHERE key = ''")
+        return Counter({name: _whole(value) for name, value in rows})
+
+    def summary(self) -> dict:
+        with self._lock:
+            db = self._connect()
+            scalars = self._scalars(db)
+            event_counts = self._counters(db, "event")
+            latest = [json.loads(row[0]) for row in db.execute("SELECT event FROM rollup_latest ORDER BY id")]
+        return {
+            "total_events": scalars["events"],
+            "unique_users": scalars["users"],
+            "unique_sessions": scalars["sessions"],
+            "event_counts": event_counts,
+            "latest_events": latest
+        }
+
+    def metrics(self, now: Optional[datetime] = None) -> dict:
+        now = now or datetime.now()
+        days_30 = [(now - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(30)]
+        with self._lock:
+            db = self._connect()
+            s = self._scalars(db)
+            features = self._counters(db, "feature")
+            message_types = self._counters(db, "message_type")
+            command_types = self._counters(db, "command_type")
+            frequencies = self._counters(db, "frequency")
+            score_buckets = self._counters(db, "score_bucket")
+            daily_users = self._counters(db, "daus")
+            monthly_users = self._counters(db, "maus")
+            dau_events = self._counters(db, "dau_events")
+            unique_users_30days = self._unique_daily_users(db, days_30)
+
+        # User engagement
+        total_sessions = s["sessions"]
+        if total_sessions == 0:
+            user_engagement = {"avg_messages_per_session": 0, "avg_session_duration": 0}
+        else:
+            user_engagement = {
+                "total_sessions": total_sessions,
+                "avg_messages_per_session": s["session_messages"] / total_sessions,
+                "avg_voice_usage_per_session": s["session_voice"] / total_sessions,
+                "avg_session_duration_minutes": s["duration_minutes"] / s["durations"] if s["durations"] else 0,
+                "voice_usage_percentage": (s["session_voice"] / max(s["session_messages"], 1)) * 100
+            }
+
+        # Feature usage
+        feature_usage = {
+            "feature_counts": features,
+            "total_feature_usage": sum(features.values()),
+            "most_popular_feature": max(features, key=features.get) if features else None
+        }
+
+        # Conversation metrics
+        total_messages = s["messages"]
+        voice_messages = message_types.get("voice", 0)
+        conversation_metrics = {
+            "total_messages": total_messages,
+            "text_messages": message_types.get("text", 0),
+            "voice_messages": voice_messages,
+            "voice_percentage": (voice_messages / max(total_messages, 1)) * 100
+        }
+
+        # Command analytics
+        total_commands = s["commands_ok"] + s["commands_failed"]
+        if not total_commands:
+            command_analytics = {"total_commands": 0, "command_types": {}, "success_rate": 0}
+        else:
+            command_analytics = {
+                "total_commands": total_commands,
+                "command_types": command_types,
+                "successful_commands": s["commands_ok"],
+                "failed_commands": s["commands_failed"],
+                "success_rate_percentage": round((s["commands_ok"] / total_commands) * 100, 1),
+                "most_popular_command_type": max(command_types, key=command_types.get) if command_types else None,
+                "command_distribution": {
+                    cmd_type: {"count": count, "percentage": round((count / total_commands) * 100, 1)}
+                    for cmd_type, count in command_types.items()
+                }
+            }
+
+        # Retention
+        session_users = s["session_users"]
+        retention_metrics = {
+            "current_dau": daily_users.get(now.strftime('%Y-%m-%d'), 0),
+            "current_mau": monthly_users.get(now.strftime('%Y-%m'), 0),
+            "avg_dau_7days": round(sum(daily_users.get(date, 0) for date in days_30[:7]) / 7, 1),
+            "total_users": session_users,
+            "returning_users": s["returning_users"],
+            "return_rate_percentage": (s["returning_users"] / max(session_users, 1)) * 100,
+            "user_frequency_distribution": frequencies,
+            "daily_active_users_by_date": daily_users,
+            "monthly_active_users_by_month": monthly_users
+        }
+
+        # Engagement
+        sessions_count = s["session_ends"]
+        if not s["time_events"] and not sessions_count:
+            engagement_metrics = {"error": "No engagement data available"}
+        else:
+            avg_session_duration = (s["time_session_seconds"] / sessions_count) if sessions_count > 0 else 0
+            avg_interaction_time = (s["time_interaction_seconds"] / sessions_count) if sessions_count > 0 else 0
+            avg_engagement_score = s["score_sum"] / s["score_count"] if s["score_count"] else 0
+            engagement_metrics = {
+                "total_sessions": sessions_count,
+                "avg_session_duration_minutes": round(avg_session_duration / 60, 2),
+                "avg_interaction_time_minutes": round(avg_interaction_time / 60, 2),
+                "avg_idle_time_minutes": round((avg_session_duration - avg_interaction_time) / 60, 2),
+                "interaction_rate_percentage": round((avg_interaction_time / max(avg_session_duration, 1)) * 100, 1),
+                "avg_engagement_score": round(avg_engagement_score, 1),
+                "total_visible_time_hours": round(s["visible_seconds"] / 3600, 2),
+                "engagement_score_distribution": {
+                    bucket: score_buckets.get(bucket, 0)
+                    for bucket in ("high (80-100)", "medium (50-79)", "low (0-49)")
+                }
+            }
+
+        # DAU trends over the last 30 days, oldest first
+        trends = [{"date": date, "dau": dau_events.get(date, 0)} for date in reversed(days_30)]
+        current_week_avg = sum(t["dau"] for t in trends[-7:]) / 7
+        previous_week_avg = sum(t["dau"] for t in trends[-14:-7]) / 7
+        growth_rate = 0
+        if previous_week_avg > 0:
+            growth_rate = ((current_week_avg - previous_week_avg) / previous_week_avg) * 100
+        dau_mau_trends = {
+            "daily_trends": trends,
+            "current_week_avg_dau": round(current_week_avg, 1),
+            "previous_week_avg_dau": round(previous_week_avg, 1),
+            "week_over_week_growth": round(growth_rate, 1),
+            "peak_dau": max((t["dau"] for t in trends), default=0),
+            "total_unique_users_30days": unique_users_30days
+        }
+
+        return {
+            "user_engagement": user_engagement,
+            "feature_usage": feature_usage,
+            "conversation_metrics": conversation_metrics,
+            "command_analytics": command_analytics,
+            "retention_metrics": retention_metrics,
+            "engagement_metrics": engagement_metrics,
+            "dau_mau_trends": dau_mau_trends
+        }
+
+    def daily(self, days: int = 30, now: Optional[datetime] = None) -> dict:
+        """Event counts per day and event name for the last `days` days"""
+        now = now or datetime.now()
+        since = (now - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT day, event, count FROM rollup_daily_events WHERE day >= ? ORDER BY day", (since,)
+            ).fetchall()
+        result = {}
+        for day, event, count in rows:
+            result.setdefault(day, {})[event] = count
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._connect()
+            inode, offset = self._position(db)
+            events = db.execute(
+                "SELECT value FROM rollup_counters WHERE name = 'events' AND key = ''"
+            ).fetchone()
+        try:
+            st = os.stat(self.log_path)
+            # Still finishing a rotated segment: the whole active log is pending
+            pending = st.st_size - (offset if inode in (0, st.st_ino) else 0)
+        except OSError:
+            pending = 0
+        return {
+            "db": self.db_path,
+            "log": self.log_path,
+            "events": _whole(events[0]) if events else 0,
+            "inode": inode,
+            "offset": offset,
+            "pending_bytes": max(pending, 0),
+            "parse_errors": self.parse_errors,
+            "last_catch_up_ms": round(self.last_catch_up_ms, 3)
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+analytics_rollups = AnalyticsRollups()
@@ -0,0 +1,180 @@
+"""Batched, asynchronous analytics writer.
+
+``track_event`` and ``track_command_analytics`` used to open
+``analytics_data.jsonl``, append one line and close it, synchronously, inside
+async handlers. They now hand the event to ``analytics_writer.submit()``,
+which only puts it on a bounded in-memory queue. A background task drains
+the queue and appends each batch with a single write on a worker thread. A
+batch is written when it reaches ``ANALYTICS_BATCH_SIZE`` events or when
+``ANALYTICS_FLUSH_INTERVAL`` seconds have passed since its first event.
+
+When the queue is full (the disk can't keep up) new events are dropped and
+counted instead of slowing requests down. Whatever is still queued is
+written on shutdown.
+"""
+import asyncio
+import json
+import os
+import time
+from typing import Callable, List, Optional
+
+ANALYTICS_FILE = os.getenv("ANALYTICS_FILE", "analytics_data.jsonl")
+ANALYTICS_QUEUE_SIZE = int(os.getenv("ANALYTICS_QUEUE_SIZE", "10000"))
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "500"))
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "1.0"))
+
+
+class AnalyticsWriter:
+    def __init__(self, path: str = ANALYTICS_FILE, queue_size: int = ANALYTICS_QUEUE_SIZE,
+                 batch_size: int = ANALYTICS_BATCH_SIZE, flush_interval: float = ANALYTICS_FLUSH_INTERVAL):
+        self.path = path
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch: List[dict] = []     # being collected by the flush task
+        self._listeners: List[Callable[[List[dict]], None]] = []
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.last_flush_ms = 0.0
+
+    # --- lifecycle (FastAPI startup/shutdown hooks) ---
+
+    async def start(self):
+        if self._task and not self._task.done():
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and write everything still queued"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._queue is not None:
+            remaining, self._batch = self._batch, []
+            while not self._queue.empty():
+                remaining.append(self._queue.get_nowait())
+            self._queue = None
+            if remaining:
+                await asyncio.to_thread(self._write, remaining)
+                print(f"📊 Flushed {len(remaining)} queued analytics events on shutdown")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._task and not self._task.done())
+
+    def add_listener(self, callback: Callable[[List[dict]], None]):
+        """Call `callback(batch)` on the writer thread after each batch is appended"""
+        self._listeners.append(callback)
+
+    # --- ingestion ---
+
+    def submit(self, event: dict) -> bool:
+        """Queue an event without blocking; False if it was dropped because the queue is full"""
+        if not self.running:
+            # No loop task (scripts, tests): write straight through
+            self._write([event])
+            self.enqueued += 1
+            return True
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def submit_many(self, events: List[dict]) -> int:
+        """Queue several events at once; returns how many were queued (the rest were dropped)"""
+        if not events:
+            return 0
+        if not self.running:
+            self._write(events)
+            self.enqueued += len(events)
+            return len(events)
+        queued = 0
+        for event in events:
+            try:
+                self._queue.put_nowait(event)
+            except asyncio.QueueFull:
+                break
+            queued += 1
+        self.enqueued += queued
+        self.dropped += len(events) - queued
+        return queued
+
+    def _write(self, batch: List[dict]):
+        """Append a batch with one write call (runs on a worker thread)"""
+        start = time.perf_counter()
+        try:
+            data = "".join(json.dumps(event) + "\n" for event in batch)
+            with open(self.path, "a") as f:
+                f.write(data)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.write_errors += 1
+            self.dropped += len(batch)
+            print(f"Analytics write error ({len(batch)} events lost): {e}")
+            return
+        finally:
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+        for callback in self._listeners:
+            try:
+                callback(batch)
+            except Exception as e:
+                print(f"Analytics listener error: {e}")
+
+    async def _fill_batch(self):
+        """Collect into self._batch until it is full or flush_interval passed since its first event"""
+        self._batch.append(await self._queue.get())
+        deadline = time.monotonic() + self.flush_interval
+        while len(self._batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self):
+        while True:
+            await self._fill_batch()
+            batch, self._batch = self._batch, []
+            write = asyncio.ensure_future(asyncio.to_thread(self._write, batch))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # Let the in-flight write finish so stop() only writes what is left
+                await write
+                raise
+
+    def stats(self) -> dict:
+        return {
+            "file": self.path,
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+            "avg_batch_size": round(self.written / self.batches, 1) if self.batches else 0,
+            "last_flush_ms": round(self.last_flush_ms, 3)
+        }
+
+
+analytics_writer = AnalyticsWriter()
@@ -0,0 +1,147 @@
+"""Per-session bounded conversation memory.
+
+Replaces the module-level ``conversation_history`` list in groqchat, which
+collected every user's turns forever. Each session keeps its last
+``CONVERSATION_MAX_TURNS`` turns in a fixed-size ring buffer, sessions idle
+for longer than ``CONVERSATION_IDLE_SECONDS`` are evicted, and the number of
+live sessions is capped, so memory stays flat however long the process runs.
+
+``window()`` returns the most recent turns that fit in a token budget and is
+what the chat prompts are built from.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+CONVERSATION_MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", "20"))
+CONVERSATION_TOKEN_BUDGET = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "1500"))
+CONVERSATION_IDLE_SECONDS = int(os.getenv("CONVERSATION_IDLE_SECONDS", "1800"))
+CONVERSATION_MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "1000"))
+# Idle sweeps run at most this often (they walk the oldest sessions only)
+EVICTION_INTERVAL_SECONDS = 60
+
+# Rough token estimate (~4 characters per token plus per-message overhead).
+# Sarvam doesn't expose a tokenizer and the budget only needs to be approximate.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationSession:
+    __slots__ = ("turns", "last_seen")
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.last_seen = time.monotonic()
+
+
+class ConversationStore:
+    """Ring buffer of recent turns per session, least recently used first"""
+
+    def __init__(self, max_turns: int = CONVERSATION_MAX_TURNS,
+                 idle_seconds: int = CONVERSATION_IDLE_SECONDS,
+                 max_sessions: int = CONVERSATION_MAX_SESSIONS):
+        self.max_turns = max_turns
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+
+    def _evict(self, now: float):
+        # Sessions are kept in last-use order, so idle ones are always at the front
+        if now - self._last_sweep >= EVICTION_INTERVAL_SECONDS:
+            self._last_sweep = now
+            while self._sessions:
+                session_id, session = next(iter(self._sessions.items()))
+                if now - session.last_seen < self.idle_seconds:
+                    break
+                del self._sessions[session_id]
+                self.evicted_idle += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted_capacity += 1
+
+    def _record(self, session_id: str, turns: List[Dict]):
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = ConversationSession(self.max_turns)
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+            session.turns.extend(turns)
+            session.last_seen = now
+            self._evict(now)
+
+    def append(self, session_id: Optional[str], role: str, content: str):
+        """Record a turn. Requests without a session id are not remembered."""
+        if not session_id or not content:
+            return
+        self._record(session_id, [{"role": role, "content": content}])
+
+    def append_exchange(self, session_id: Optional[str], user_message: str, reply: str):
+        """
+        Record a user message together with the reply to it, so the history
+        keeps alternating user/assistant. Nothing is recorded without a reply.
+        """
+        if not session_id or not user_message or not reply:
+            return
+        self._record(session_id, [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": reply}
+        ])
+
+    def window(self, session_id: Optional[str], token_budget: int = CONVERSATION_TOKEN_BUDGET) -> List[Dict]:
+        """Most recent turns (oldest first) whose estimated size fits in token_budget"""
+        if not session_id:
+            return []
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            if time.monotonic() - session.last_seen >= self.idle_seconds:
+                del self._sessions[session_id]
+                self.evicted_idle += 1
+                return []
+            turns = list(session.turns)
+
+        selected = []
+        used = 0
+        for turn in reversed(turns):
+            cost = estimate_tokens(turn["content"])
+            if used + cost > token_budget:
+                break
+            selected.append(turn)
+            used += cost
+        selected.reverse()
+        return selected
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            turns = sum(len(s.turns) for s in self._sessions.values())
+            return {
+                "sessions": len(self._sessions),
+                "turns": turns,
+                "max_turns_per_session": self.max_turns,
+                "max_sessions": self.max_sessions,
+                "token_budget": CONVERSATION_TOKEN_BUDGET,
+                "idle_seconds": self.idle_seconds,
+                "evicted_idle": self.evicted_idle,
+                "evicted_capacity": self.evicted_capacity
+            }
+
+
+conversation_store = ConversationStore()
@@ -0,0 +1,353 @@
+"""Per-user habit storage with day-indexed bitset histories.
+
+``habit_log_tool`` used to rewrite the whole ``data/habits.json`` on every
+log and rescan every date a habit ever had to get the 30-day rate. Each
+(user_id, habit) is now one row in the shared user-data SQLite database
+(``HABIT_DB``, see ``user_data``). Logging reads and rewrites that single
+small row in one write transaction, so it costs the same however long the
+habit has been tracked, and every uvicorn worker sees the same state.
+
+Streak, best streak and total days are updated in place. Each habit's
+history is a ``DayBitset``: one bit per day since the habit's first day,
+kept in a ``bytearray`` and stored as a BLOB (about 46 bytes per habit-year
+instead of a list of ISO strings). Windowed counts are a popcount over the
+few bytes the window covers, and streaks are runs of set bits, so "Habit
+stats" takes microseconds even with years of history.
+
+The old single-user ``habits.json`` snapshot and ``habits.log`` event log
+are imported once for ``DEFAULT_USER_ID``.
+"""
+import base64
+import json
+import os
+import threading
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from src.Backend.user_data import USER_DATA_DB, DEFAULT_USER_ID, connect, claim_migration
+
+HABIT_DB = os.getenv("HABIT_DB", USER_DATA_DB)
+# Single-user files from before habits were per user; imported once for DEFAULT_USER_ID
+HABITS_FILE = os.getenv("HABITS_FILE", "data/habits.json")
+HABIT_EVENT_LOG = os.getenv("HABIT_EVENT_LOG", "data/habits.log")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS habits (
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    epoch INTEGER,
+    bitmap BLOB,
+    streak INTEGER NOT NULL DEFAULT 0,
+    last_date TEXT,
+    best_streak INTEGER NOT NULL DEFAULT 0,
+    total_days INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, name)
+);
+"""
+_STATE_COLUMNS = "epoch, bitmap, streak, last_date, best_streak, total_days"
+
+
+class DayBitset:
+    """Set of days stored as one bit per day since `epoch` (a date ordinal)"""
+
+    __slots__ = ("epoch", "bits")
+
+    def __init__(self, epoch: Optional[int] = None, bits: bytes = b""):
+        self.epoch = epoch
+        self.bits = bytearray(bits)
+
+    @classmethod
+    def from_dates(cls, dates) -> "DayBitset":
+        bitset = cls()
+        for ordinal in sorted(date.fromisoformat(d).toordinal() for d in dates):
+            bitset.add(ordinal)
+        return bitset
+
+    def _rebase(self, epoch: int):
+        """Move the epoch back so earlier days fit"""
+        shift = self.epoch - epoch
+        value = int.from_bytes(self.bits, "little") << shift
+        self.bits = bytearray(value.to_bytes((len(self.bits) * 8 + shift + 7) // 8, "little"))
+        self.epoch = epoch
+
+    def add(self, ordinal: int):
+        if self.epoch is None:
+            self.epoch = ordinal
+        elif ordinal < self.epoch:
+            self._rebase(ordinal)
+        index = ordinal - self.epoch
+        if index >> 3 >= len(self.bits):
+            self.bits.extend(bytes((index >> 3) - len(self.bits) + 1))
+        self.bits[index >> 3] |= 1 << (index & 7)
+
+    def has(self, ordinal: int) -> bool:
+        if self.epoch is None or ordinal < self.epoch:
+            return False
+        index = ordinal - self.epoch
+        return index >> 3 < len(self.bits) and bool(self.bits[index >> 3] >> (index & 7) & 1)
+
+    def count(self, start: Optional[int] = None, end: Optional[int] = None) -> int:
+        """Days set in [start, end) (ordinals); popcount over just those bytes"""
+        if self.epoch is None:
+            return 0
+        lo = 0 if start is None else max(0, start - self.epoch)
+        hi = len(self.bits) * 8 if end is None else min(len(self.bits) * 8, end - self.epoch)
+        if hi <= lo:
+            return 0
+        chunk = int.from_bytes(self.bits[lo >> 3:(hi + 7) >> 3], "little") >> (lo & 7)
+        return (chunk & ((1 << (hi - lo)) - 1)).bit_count()
+
+    def run_ending_at(self, ordinal: int) -> int:
+        """Length of the run of consecutive set days ending at `ordinal`"""
+        run = 0
+        while self.has(ordinal - run):
+            run += 1
+        return run
+
+    def longest_run(self) -> int:
+        value = int.from_bytes(self.bits, "little")
+        longest = 0
+        # Each step ANDs the value with itself shifted, shortening every run by one
+        while value:
+            value &= value >> 1
+            longest += 1
+        return longest
+
+    def to_dates(self) -> List[str]:
+        return [date.fromordinal(self.epoch + i).isoformat()
+                for i in range(len(self.bits) * 8) if self.bits[i >> 3] >> (i & 7) & 1]
+
+    @classmethod
+    def from_json(cls, data: dict) -> "DayBitset":
+        epoch = date.fromisoformat(data["epoch"]).toordinal() if data.get("epoch") else None
+        return cls(epoch, base64.b64decode(data.get("bitmap", "")))
+
+
+class HabitState:
+    __slots__ = ("days", "streak", "last_date", "best_streak", "total_days")
+
+    def __init__(self):
+        self.days = DayBitset()
+        self.streak = 0
+        self.last_date = None
+        self.best_streak = 0
+        self.total_days = 0
+
+    @classmethod
+    def from_snapshot(cls, data: dict) -> "HabitState":
+        state = cls()
+        if "bitmap" in data:
+            state.days = DayBitset.from_json(data)
+        else:
+            # Older habits.json with a list of ISO dates
+            state.days = DayBitset.from_dates(data.get("dates", []))
+        state.last_date = data.get("last_date")
+        state.total_days = state.days.count()
+        if state.last_date:
+            state.streak = state.days.run_ending_at(date.fromisoformat(state.last_date).toordinal())
+        state.best_streak = max(data.get("best_streak", 0), state.days.longest_run())
+        return state
+
+    @classmethod
+    def from_row(cls, row) -> "HabitState":
+        epoch, bitmap, streak, last_date, best_streak, total_days = row
+        state = cls()
+        state.days = DayBitset(epoch, bitmap or b"")
+        state.streak = streak
+        state.last_date = last_date
+        state.best_streak = best_streak
+        state.total_days = total_days
+        return state
+
+    def to_row(self) -> tuple:
+        return (self.days.epoch, bytes(self.days.bits), self.streak, self.last_date,
+                self.best_streak, self.total_days)
+
+    @property
+    def dates(self) -> List[str]:
+        return self.days.to_dates()
+
+    def log(self, day: str) -> bool:
+        """Record a completion on `day` (ISO date); False if it was already logged"""
+        ordinal = date.fromisoformat(day).toordinal()
+        if self.days.has(ordinal):
+            return False
+        if self.last_date:
+            days_diff = ordinal - date.fromisoformat(self.last_date).toordinal()
+            self.streak = self.streak + 1 if days_diff == 1 else 1
+        else:
+            self.streak = 1
+        self.days.add(ordinal)
+        self.last_date = day
+        self.total_days += 1
+        self.best_streak = max(self.best_streak, self.streak)
+        return True
+
+    def completions_since(self, days: int, today: Optional[date] = None) -> int:
+        """Completions on or after today - days"""
+        today = (today or date.today()).toordinal()
+        return self.days.count(today - days, today + 1)
+
+
+def load_legacy_habits(snapshot_path: str = HABITS_FILE, log_path: str = HABIT_EVENT_LOG) -> Dict[str, HabitState]:
+    """Habits from the old single-user habits.json snapshot plus its event log"""
+    habits = {}
+    try:
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "r") as f:
+                for name, data in json.load(f).items():
+                    habits[name] = HabitState.from_snapshot(data)
+    except Exception as e:
+        print(f"Error loading habits snapshot: {e}")
+    if os.path.exists(log_path):
+        with open(log_path, "r") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue    # torn last line from a crash mid-append
+                if event.get("op") == "log":
+                    habits.setdefault(event.get("habit"), HabitState()).log(event["date"])
+                elif event.get("op") == "reset":
+                    habits.pop(event.get("habit"), None)
+    return habits
+
+
+class HabitStore:
+    """Per-user habit states in SQLite, one row per (user_id, habit)"""
+
+    def __init__(self, db_path: str = HABIT_DB, legacy_snapshot: str = HABITS_FILE,
+                 legacy_log: str = HABIT_EVENT_LOG):
+        self.db_path = db_path
+        self.legacy_snapshot = legacy_snapshot
+        self.legacy_log = legacy_log
+        self._db = None
+        self._lock = threading.Lock()
+        self.imported = 0
+
+    def _connect(self):
+        if self._db is None:
+            db = connect(self.db_path)
+            db.executescript(_SCHEMA)
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Only the first worker to open the database imports the old files
+                if claim_migration(db, "legacy_habits_files"):
+                    for name, state in load_legacy_habits(self.legacy_snapshot, self.legacy_log).items():
+                        self._write(db, DEFAULT_USER_ID, name, state)
+                        self.imported += 1
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            if self.imported:
+                print(f"📒 Imported {self.imported} habits from {self.legacy_snapshot} for user '{DEFAULT_USER_ID}'")
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def _write(db, user_id: str, habit: str, state: HabitState):
+        db.execute(
+            "INSERT OR REPLACE INTO habits (user_id, name, epoch, bitmap, streak, last_date, best_streak, total_days) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (user_id, habit, *state.to_row())
+        )
+
+    def log(self, habit: str, day: Optional[str] = None, user_id: str = DEFAULT_USER_ID):
+        """Log a completion; returns (state, logged, new_record)"""
+        day = day or date.today().isoformat()
+        with self._lock:
+            db = self._connect()
+            # Read-modify-write in one write transaction so workers can't interleave
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    f"SELECT {_STATE_COLUMNS} FROM habits WHERE user_id = ? AND name = ?", (user_id, habit)
+                ).fetchone()
+                state = HabitState.from_row(row) if row else HabitState()
+                previous_best = state.best_streak
+                logged = state.log(day)
+                if logged:
+                    self._write(db, user_id, habit, state)
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return state, logged, logged and state.best_streak > previous_best
+
+    def get(self, habit: str, user_id: str = DEFAULT_USER_ID) -> Optional[HabitState]:
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT {_STATE_COLUMNS} FROM habits WHERE user_id = ? AND name = ?", (user_id, habit)
+            ).fetchone()
+        return HabitState.from_row(row) if row else None
+
+    def all(self, user_id: str = DEFAULT_USER_ID) -> List[tuple]:
+        """(name, state) for each of the user's habits, oldest first"""
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT name, {_STATE_COLUMNS} FROM habits WHERE user_id = ? ORDER BY rowid", (user_id,)
+            ).fetchall()
+        return [(row[0], HabitState.from_row(row[1:])) for row in rows]
+
+    def reset(self, habit: str, user_id: str = DEFAULT_USER_ID) -> bool:
+        with self._lock:
+            return self._connect().execute(
+                "DELETE FROM habits WHERE user_id = ? AND name = ?", (user_id, habit)
+            ).rowcount > 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            row = self._connect().execute("SELECT COUNT(*), COUNT(DISTINCT user_id) FROM habits").fetchone()
+        return {"db": self.db_path, "habits": row[0], "users": row[1], "imported_from_legacy_files": self.imported}
+
+
+habit_store = HabitStore()
+
+
+def benchmark(habits: int = 50, years: int = 5, repeat: int = 200) -> dict:
+    """Cost of the 7/30-day counts per habit: bitset popcount vs scanning ISO date strings"""
+    import random
+    import time
+
+    today = date.today()
+    histories = []
+    for _ in range(habits):
+        days = [(today - timedelta(days=i)).isoformat() for i in range(365 * years) if random.random() < 0.7]
+        histories.append(days)
+    states = [HabitState.from_snapshot({"dates": days, "last_date": days[0]}) for days in histories]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for days in histories:
+            for window in (7, 30):
+                cutoff = today - timedelta(days=window)
+                sum(1 for d in days if date.fromisoformat(d) >= cutoff)
+    scan_us = (time.perf_counter() - start) * 1e6 / (repeat * habits)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for state in states:
+            state.completions_since(7, today)
+            state.completions_since(30, today)
+    bitset_us = (time.perf_counter() - start) * 1e6 / (repeat * habits)
+
+    return {
+        "habits": habits,
+        "days_of_history": 365 * years,
+        "iso_scan_us_per_habit": round(scan_us, 2),
+        "bitset_us_per_habit": round(bitset_us, 2),
+        "bitmap_bytes_per_habit": len(states[0].days.bits),
+        "iso_list_bytes_per_habit": len(json.dumps(histories[0]))
+    }
+
+
+if __name__ == "__main__":
+    for key, value in benchmark().items():
+        print(f"{key}: {value}")
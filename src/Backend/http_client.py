@@ -0,0 +1,102 @@
+"""Application-wide pooled HTTP client for all Sarvam API calls.
+
+One ``httpx.AsyncClient`` is created at FastAPI startup and closed on shutdown,
+so LLM, STT, TTS and translate calls reuse keep-alive connections instead of
+paying a fresh TCP+TLS handshake on every request.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import httpx
+
+# Pool tuning - override through environment variables on the dyno
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+
+try:
+    import h2  # noqa: F401  (required by httpx for HTTP/2)
+except ImportError:
+    h2 = None
+
+_client = None
+_client_loop = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    use_http2 = HTTP2_ENABLED and h2 is not None
+    if HTTP2_ENABLED and h2 is None:
+        print("⚠️ h2 package not installed, shared HTTP client falling back to HTTP/1.1")
+    return httpx.AsyncClient(
+        http2=use_http2,
+        limits=limits,
+        timeout=HTTP_DEFAULT_TIMEOUT,
+    )
+
+
+async def start_http_client():
+    """Create the shared client (called from the FastAPI startup hook)"""
+    global _client, _client_loop
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        _client_loop = asyncio.get_running_loop()
+        print(f"🌐 Shared HTTP client started (http2={HTTP2_ENABLED and h2 is not None}, "
+              f"max_connections={HTTP_MAX_CONNECTIONS}, keepalive={HTTP_MAX_KEEPALIVE_CONNECTIONS})")
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client (called from the FastAPI shutdown hook)"""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        print("🌐 Shared HTTP client closed")
+    _client = None
+    _client_loop = None
+
+
+def get_http_client():
+    """
+    Return the shared client for the current event loop.
+    Creates it lazily if startup hasn't run yet (e.g. scripts, tests).
+    Returns None when called from a different event loop than the one that
+    owns the pool, since httpx connections can't be shared across loops.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        _client_loop = loop
+    if loop is not _client_loop:
+        return None
+    return _client
+
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    """POST through the shared pool (falls back to a one-off client on a foreign event loop)"""
+    client = get_http_client()
+    if client is None:
+        async with httpx.AsyncClient(timeout=HTTP_DEFAULT_TIMEOUT) as one_off:
+            return await one_off.post(url, **kwargs)
+    return await client.post(url, **kwargs)
+
+
+@asynccontextmanager
+async def stream(method: str, url: str, **kwargs):
+    """Streamed request through the shared pool, e.g. ``async with stream("POST", url, json=...) as resp``"""
+    client = get_http_client()
+    if client is None:
+        async with httpx.AsyncClient(timeout=HTTP_DEFAULT_TIMEOUT) as one_off:
+            async with one_off.stream(method, url, **kwargs) as response:
+                yield response
+        return
+    async with client.stream(method, url, **kwargs) as response:
+        yield response
@@ -0,0 +1,132 @@
+"""Distinct counting for analytics: HyperLogLog sketches or exact sets.
+
+Unique users, unique sessions, DAU and MAU used to be Python sets of every
+id, so memory grew with the user base. A HyperLogLog sketch counts
+distinct values in a fixed ``2 ** ANALYTICS_HLL_PRECISION`` bytes (4 KB at
+the default precision of 12), however many values it has seen.
+
+Error bound: the standard error of an estimate is ``1.04 / sqrt(2 ** p)``.
+That is about 1.6% at p=12, so roughly 95% of estimates are within 3.3% of
+the true count. Below ``2.5 * 2 ** p`` values (about 10k at p=12) linear
+counting is used instead, which stays within the same bound. Sketches
+merge without losing accuracy: the union of 30 daily sketches has the same
+bound as one sketch, which is how the 30-day unique users are counted.
+``python -m src.Backend.hyperloglog`` prints measured errors.
+
+``ANALYTICS_DISTINCT_COUNTING=exact`` switches every distinct count (rollups
+and streaming metrics) back to exact sets.
+"""
+import math
+import os
+import random
+from hashlib import blake2b
+from typing import Iterable, Optional, Union
+
+ANALYTICS_DISTINCT_COUNTING = os.getenv("ANALYTICS_DISTINCT_COUNTING", "hll").lower()
+ANALYTICS_HLL_PRECISION = int(os.getenv("ANALYTICS_HLL_PRECISION", "12"))
+
+# 2 ** -rank for every possible register value
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(65)]
+
+
+def use_sketches() -> bool:
+    return ANALYTICS_DISTINCT_COUNTING != "exact"
+
+
+def standard_error(precision: int = ANALYTICS_HLL_PRECISION) -> float:
+    return 1.04 / math.sqrt(1 << precision)
+
+
+class HyperLogLog:
+    """Cardinality sketch with 2**precision one-byte registers"""
+
+    def __init__(self, precision: int = ANALYTICS_HLL_PRECISION, registers: Optional[bytes] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is not None and len(registers) != self.m:
+            raise ValueError(f"expected {self.m} registers, got {len(registers)}")
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    @classmethod
+    def from_bytes(cls, registers: bytes) -> "HyperLogLog":
+        return cls(int(math.log2(len(registers))), registers)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+    def add(self, value):
+        # A stable 64-bit hash: the built-in hash() differs between processes
+        x = int.from_bytes(blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("can't merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.m
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        zeros = self.registers.count(0)
+        if zeros:
+            # Small range: linear counting. Switching on its own estimate (not the
+            # raw one) avoids the raw estimator's bias just above 2.5m
+            linear = m * math.log(m / zeros)
+            if linear <= 2.5 * m:
+                return int(round(linear))
+        return int(round(alpha * m * m / sum(_INVERSE_POWERS[r] for r in self.registers)))
+
+
+class ExactCounter:
+    """Same interface as HyperLogLog, backed by a set"""
+
+    def __init__(self):
+        self.values = set()
+
+    def add(self, value):
+        self.values.add(value)
+
+    def update(self, values: Iterable):
+        self.values.update(values)
+
+    def merge(self, other: "ExactCounter"):
+        self.values |= other.values
+
+    def count(self) -> int:
+        return len(self.values)
+
+
+def new_distinct_counter() -> Union[HyperLogLog, ExactCounter]:
+    """A sketch, or a set when ANALYTICS_DISTINCT_COUNTING=exact"""
+    return HyperLogLog() if use_sketches() else ExactCounter()
+
+
+def accuracy(precision: int = ANALYTICS_HLL_PRECISION, trials: int = 5):
+    """Print the measured relative error against the documented bound"""
+    rng = random.Random(42)
+    print(f"precision {precision}: {1 << precision} bytes, standard error {standard_error(precision):.2%}")
+    for n in (100, 1_000, 10_000, 100_000, 1_000_000):
+        errors = []
+        for _ in range(trials if n < 1_000_000 else 1):
+            sketch = HyperLogLog(precision)
+            base = rng.getrandbits(40)
+            sketch.update(f"user_{base + i}" for i in range(n))
+            errors.append(abs(sketch.count() - n) / n)
+        print(f"  n={n:>9,}: mean error {sum(errors) / len(errors):.2%}, worst {max(errors):.2%}")
+
+
+if __name__ == "__main__":
+    accuracy()
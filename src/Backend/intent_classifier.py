@@ -0,0 +1,279 @@
+"""Local fast-path intent classifier.
+
+Scores a message as 'command', 'structured' or 'chit-chat' with a small rule
+engine, so ``classify_intent_and_respond`` only pays for the ``sarvam-m``
+classification call when the local confidence is below
+``INTENT_CONFIDENCE_THRESHOLD``.
+
+The two keyword overrides that already ran after the LLM (advice-seeking ->
+structured, command keyword + command pattern -> command) always win, so
+they are decisive here and never need the LLM at all.
+
+Run ``python -m src.Backend.intent_classifier`` for a report over the
+held-out examples below (accuracy, per-message cost, and how often the LLM
+is skipped). ``TUNING_EXAMPLES`` are the phrases the rules were written
+from, so their accuracy says nothing about unseen messages; only
+``HELD_OUT_EXAMPLES`` is reported as accuracy. Keep the held-out set out of
+rule tuning, or the number stops meaning anything.
+"""
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from src.Backend import phrase_matcher
+
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.75"))
+
+# Backup logic for structured questions (was inline in classify_intent_and_respond)
+ADVICE_KEYWORDS = [
+    "advice", "clarity", "help", "guidance", "suggest", "suggestion", "recommend", "recommendation",
+    "decision", "problem", "struggle", "should", "why", "how", "stuck", "confused", "purpose",
+    "meaning", "direction", "plan", "next step", "next steps", "what should", "what do", "what can",
+    "how do", "how can", "change", "improve", "fix", "overcome", "leave", "quit", "start", "build",
+    "create", "career", "relationship", "life", "future", "goal", "dream", "resolve", "cope", "deal with",
+    "handle", "manage", "uncertain", "uncertainty", "lost", "choice", "choices", "options", "path", "move forward"
+]
+ADVICE_MIN_WORDS = 10
+
+# Backup logic for commands
+COMMAND_KEYWORDS = [
+    "remind", "reminder", "note", "save", "break down", "goal", "habit", "log", "track",
+    "timer", "task", "open", "chrome", "browser", "youtube", "google", "search", "website", "channel",
+    # Hindi command keywords
+    "गूगल", "क्रोम", "यूट्यूब", "सर्च", "खोलो", "खोजो", "ढूंढो", "बताओ", "दिखाओ", "चैनल", "वीडियो"
+]
+COMMAND_PATTERNS = [
+    r"remind me ", r"set a reminder", r"note[:] ?", r"save a note",
+    r"break down[:] ?", r"log habit[:] ?", r"habit[:] ?",
+    r"start a [0-9]+(-minute)? timer", r"list my tasks", r"goal[:] ?",
+    r"add (a )?reminder", r"add (a )?note", r"log my habit",
+    r"track my habit", r"quick task[:] ?", r"open chrome", r"open browser",
+    r"open google", r"google and search", r"youtube", r"google search", r"search google", r"open website", r"open url",
+    # Hindi command patterns
+    r"गूगल खोलो", r"क्रोम खोलो", r"यूट्यूब खोलो", r"सर्च करो", r"खोजो", r"ढूंढो", r"बताओ", r"दिखाओ"
+]
+_COMMAND_PATTERN_RE = re.compile("|".join(f"(?:{p})" for p in COMMAND_PATTERNS))
+
+phrase_matcher.register("advice_keywords", ADVICE_KEYWORDS)
+phrase_matcher.register("command_keywords", COMMAND_KEYWORDS)
+
+# Soft signals used when neither override fires: (label, weight, regex)
+SOFT_FEATURES = [
+    # Emotional / life-decision vocabulary -> structured
+    ("structured", 2.0, re.compile(r"\b(scared|afraid|anxious|anxiety|depressed|lonely|stuck|confused|lost|worried|overwhelmed|insecure|hopeless|burn(?:ed|t)? out|heartbroken)\b")),
+    ("structured", 1.5, re.compile(r"\b(should i|am i|what if i|how do i deal|why do i|why am i|is it worth)\b")),
+    ("structured", 1.0, re.compile(r"\b(career|relationship|breakup|marriage|startup|job|purpose|meaning of life|parents|family)\b")),
+    ("structured", 1.0, re.compile(r"\bi (?:feel|felt|think|can't|cannot|don't know)\b")),
+    # Small talk / simple factual -> chit-chat
+    ("chit-chat", 2.0, re.compile(r"^(hi+|hey+|hello+|yo|sup|namaste|thanks?|thank you|ok(?:ay)?|cool|nice|great|lol|haha)\b")),
+    ("chit-chat", 1.5, re.compile(r"^(what|who|when|where|which)(?:'s| is| are| was| were)\b")),
+    ("chit-chat", 1.0, re.compile(r"\b(weather|joke|time is it|your name|capital of|meaning of the word)\b")),
+    # Command vocabulary without an explicit pattern -> command (weak on its own)
+    ("command", 1.5, re.compile(r"^(open|search|find|play|start|stop|add|list|show|set|log|track)\b")),
+    ("command", 1.0, re.compile(r"\b(remind|reminder|timer|habit|task|note|chrome|browser|google|youtube|website)\b")),
+]
+# Extra mass so one weak feature can't reach full confidence
+SOFT_PRIOR = 1.0
+SHORT_MESSAGE_WORDS = 4
+
+
+@dataclass
+class LocalClassification:
+    label: Optional[str]
+    confidence: float
+    reason: str
+
+
+def is_advice_seeking(text: str) -> bool:
+    return len(text.split()) >= ADVICE_MIN_WORDS and phrase_matcher.scan(text).has("advice_keywords")
+
+
+def is_command_like(text: str) -> bool:
+    return phrase_matcher.scan(text).has("command_keywords")
+
+
+def matches_command_pattern(text: str) -> bool:
+    return _COMMAND_PATTERN_RE.search(text.lower().strip()) is not None
+
+
+def score(text: str) -> dict:
+    """Soft feature scores per label"""
+    lower = text.lower().strip()
+    scores = {"command": 0.0, "structured": 0.0, "chit-chat": 0.0}
+    for label, weight, pattern in SOFT_FEATURES:
+        if pattern.search(lower):
+            scores[label] += weight
+    # Very short messages with no life/command vocabulary are almost always small talk
+    if len(lower.split()) <= SHORT_MESSAGE_WORDS and scores["structured"] == 0 and scores["command"] == 0:
+        scores["chit-chat"] += 1.5
+    return scores
+
+
+def classify(text: str, threshold: float = None) -> LocalClassification:
+    """
+    Classify without the LLM. Returns label=None when confidence is below the
+    threshold and the caller should fall back to the LLM classifier.
+    """
+    threshold = INTENT_CONFIDENCE_THRESHOLD if threshold is None else threshold
+
+    # Decisive rules - these mirror the post-LLM overrides, so the LLM answer can't change the outcome
+    if is_command_like(text) and matches_command_pattern(text):
+        return LocalClassification("command", 1.0, "command keyword + command pattern")
+    if is_advice_seeking(text):
+        return LocalClassification("structured", 1.0, "advice-seeking keywords in a long message")
+
+    scores = score(text)
+    label = max(scores, key=scores.get)
+    total = sum(scores.values())
+    confidence = scores[label] / (total + SOFT_PRIOR) if total else 0.0
+    reason = ", ".join(f"{k}={v:.1f}" for k, v in scores.items())
+    if confidence >= threshold:
+        return LocalClassification(label, confidence, reason)
+    return LocalClassification(None, confidence, reason)
+
+
+class ClassifierStats:
+    """Counts how often the local classifier avoided the LLM round trip"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.total = 0
+        self.local = {"command": 0, "structured": 0, "chit-chat": 0}
+        self.llm_calls = 0
+        self.local_time_ms = 0.0
+
+    def record(self, result: LocalClassification, elapsed_ms: float):
+        self.total += 1
+        self.local_time_ms += elapsed_ms
+        if result.label:
+            self.local[result.label] += 1
+        else:
+            self.llm_calls += 1
+
+    def report(self) -> dict:
+        avoided = self.total - self.llm_calls
+        return {
+            "threshold": INTENT_CONFIDENCE_THRESHOLD,
+            "total_classified": self.total,
+            "llm_calls": self.llm_calls,
+            "llm_calls_avoided": avoided,
+            "llm_avoided_percentage": round((avoided / self.total) * 100, 1) if self.total else 0,
+            "local_decisions_by_type": dict(self.local),
+            "avg_local_time_ms": round(self.local_time_ms / self.total, 4) if self.total else 0
+        }
+
+
+classifier_stats = ClassifierStats()
+
+
+def classify_and_record(text: str) -> LocalClassification:
+    start = time.perf_counter()
+    result = classify(text)
+    classifier_stats.record(result, (time.perf_counter() - start) * 1000)
+    return result
+
+
+# Phrases the rules were written from (the LLM classification prompt plus common traffic)
+TUNING_EXAMPLES = [
+    ("remind me to call mom at 5pm", "command"),
+    ("open youtube for cooking videos", "command"),
+    ("search google for AI news", "command"),
+    ("open google and search for gym", "command"),
+    ("google and search for restaurants", "command"),
+    ("गूगल खोलो और gym सर्च करो", "command"),
+    ("यूट्यूब पर exercise वाले चैनल बताओ", "command"),
+    ("क्रोम में fitness सर्च करो", "command"),
+    ("search for vaishu uff channel on youtube", "command"),
+    ("find youtube channel vaishu uff", "command"),
+    ("note: buy groceries tomorrow", "command"),
+    ("log habit: meditation", "command"),
+    ("start a 10 minute timer", "command"),
+    ("list my tasks", "command"),
+    ("break down: learn LLM fine-tuning", "command"),
+    ("Why am I scared of leaving my job for a startup?", "structured"),
+    ("I feel stuck in my relationship, should I stay?", "structured"),
+    ("I am confused about my career and don't know what I should do next with my life", "structured"),
+    ("I feel lonely and anxious all the time", "structured"),
+    ("should i quit my job", "structured"),
+    ("How are you today?", "chit-chat"),
+    ("What's the weather like?", "chit-chat"),
+    ("what is the capital of france", "chit-chat"),
+    ("tell me a joke", "chit-chat"),
+    ("cool", "chit-chat"),
+    ("who is the prime minister of india", "chit-chat"),
+]
+
+# Labelled messages that were not looked at while writing the rules
+HELD_OUT_EXAMPLES = [
+    ("remind me to drink water every evening", "command"),
+    ("set a reminder for the dentist on friday", "command"),
+    ("add a note that the wifi password changed", "command"),
+    ("open chrome please", "command"),
+    ("play some lofi music on youtube", "command"),
+    ("track my habit of reading", "command"),
+    ("start a 25-minute timer for focus", "command"),
+    ("show me my tasks for today", "command"),
+    ("log my habit: no sugar", "command"),
+    ("search for cheap flights to goa", "command"),
+    ("My parents want me to get married but I am not ready, what should I do about it?", "structured"),
+    ("I keep procrastinating on my thesis and I hate myself for it", "structured"),
+    ("am i wasting my twenties by staying in this job", "structured"),
+    ("I feel overwhelmed by everything at work", "structured"),
+    ("is it worth doing an MBA after five years of engineering", "structured"),
+    ("my best friend stopped talking to me and I don't know why", "structured"),
+    ("I think I chose the wrong college", "structured"),
+    ("hello there", "chit-chat"),
+    ("thanks a lot!", "chit-chat"),
+    ("what's your name", "chit-chat"),
+    ("who won the world cup in 2011", "chit-chat"),
+    ("where is the taj mahal", "chit-chat"),
+    ("good morning", "chit-chat"),
+    ("do you like pizza", "chit-chat"),
+    ("haha that's funny", "chit-chat"),
+]
+
+
+def evaluate(examples=HELD_OUT_EXAMPLES, threshold: float = None, repeat: int = 200) -> dict:
+    """Accuracy of local decisions, LLM-avoidance rate and per-message cost over labelled examples
+
+    Pass TUNING_EXAMPLES only to check the rules still fit the phrases they
+    were written from; that accuracy is not a measure of real traffic.
+    """
+    correct = decided = 0
+    mistakes = []
+    for text, expected in examples:
+        result = classify(text, threshold)
+        if result.label:
+            decided += 1
+            if result.label == expected:
+                correct += 1
+            else:
+                mistakes.append((text, expected, result.label, round(result.confidence, 2)))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text, _expected in examples:
+            classify(text, threshold)
+    per_message_ms = (time.perf_counter() - start) * 1000 / (repeat * len(examples))
+
+    return {
+        "examples": len(examples),
+        "decided_locally": decided,
+        "llm_avoided_percentage": round((decided / len(examples)) * 100, 1),
+        "local_accuracy_percentage": round((correct / decided) * 100, 1) if decided else 0,
+        "avg_classify_time_ms": round(per_message_ms, 4),
+        "mistakes": mistakes
+    }
+
+
+if __name__ == "__main__":
+    print("Held-out examples:")
+    for key, value in evaluate().items():
+        print(f"  {key}: {value}")
+    tuning = evaluate(TUNING_EXAMPLES, repeat=1)
+    print(f"Tuning examples (not an accuracy estimate): {tuning['local_accuracy_percentage']}% "
+          f"of {tuning['decided_locally']} local decisions match")
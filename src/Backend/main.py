@@ -15,6 +15,21 @@ from src.Backend.routes.speech import router as speech_router
 from src.Backend.routes.manusagent import router as manus_router
 from src.Backend.routes.analytics import router as analytics_router
 from src.Backend.routes.admin import router as admin_router
+from src.Backend.http_client import start_http_client, close_http_client
+from src.Backend.translation import warm_cache, translation_cache
+from src.Backend.routes.groqchat import STATIC_RESPONSES as CHAT_STATIC_RESPONSES
+from src.Backend.routes.manusagent import STATIC_RESPONSES as AGENT_STATIC_RESPONSES
+from src.Backend.routes.manusagent import shutdown_tool_executor, rearm_reminders
+from src.Backend.scheduler import scheduler
+from src.Backend.analytics_writer import analytics_writer
+from src.Backend.analytics_rollups import analytics_rollups
+from src.Backend.analytics_partitions import analytics_partitions, schedule_partitioning
+from src.Backend.analytics_cache import analytics_cache
+from src.Backend.analytics_maintenance import analytics_maintenance, schedule_maintenance
+from src.Backend.reminder_store import reminder_store
+from src.Backend.habit_store import habit_store
+from src.Backend.task_store import task_store
+import asyncio
 
 app = FastAPI()
 
@@ -46,6 +61,46 @@ app.include_router(manus_router, prefix="/api/command", tags=["Commands"])
 app.include_router(analytics_router, prefix="/api/analytics", tags=["Analytics"])
 app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
 
+# Shared pooled HTTP client for all Sarvam calls
+@app.on_event("startup")
+async def startup_event():
+    await start_http_client()
+    # Analytics events are queued and appended in batches by a background task;
+    # each flush also folds the new lines into the rollups and bumps the cache version
+    analytics_writer.add_listener(analytics_rollups.on_flush)
+    analytics_writer.add_listener(analytics_cache.on_flush)
+    await analytics_writer.start()
+    # One task fires every reminder, timer and focus session
+    await scheduler.start()
+    rearm_reminders()
+    # Split the analytics log into daily partitions, compacting closed days
+    scheduler.schedule(schedule_partitioning, delay_seconds=0, kind="analytics_partition",
+                       description="split the analytics log into day partitions")
+    # Rotate, gzip and expire the analytics log, keeping daily summaries
+    scheduler.schedule(schedule_maintenance, delay_seconds=60, kind="analytics_maintenance",
+                       description="rotate and expire the analytics log")
+    # Pre-translate canned replies in the background so startup isn't delayed
+    app.state.translation_warmup = asyncio.create_task(
+        warm_cache(CHAT_STATIC_RESPONSES + AGENT_STATIC_RESPONSES)
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    warmup = getattr(app.state, "translation_warmup", None)
+    if warmup and not warmup.done():
+        warmup.cancel()
+    await scheduler.stop()
+    await close_http_client()
+    await analytics_writer.stop()
+    analytics_rollups.close()
+    analytics_partitions.close()
+    analytics_maintenance.close()
+    translation_cache.close()
+    reminder_store.close()
+    habit_store.close()
+    task_store.close()
+    shutdown_tool_executor()
+
 @app.get("/")
 async def root():
     return {"message": "Ruhaan AI backend is running!"}
@@ -0,0 +1,171 @@
+"""Durable, per-user reminder store.
+
+Reminders used to live in the ``enhanced_reminder_tool.reminders`` function
+attribute, so a restart lost every pending one and IDs (``len + 1``) could
+collide. They are now rows in the shared user-data SQLite database
+(``REMINDER_DB``, see ``user_data``):
+
+* IDs come from ``INTEGER PRIMARY KEY AUTOINCREMENT`` and are never reused;
+* every row belongs to a ``user_id`` and listing/cancelling is scoped to it;
+* ``due`` is a unix timestamp with a partial index over reminders that are
+  still pending, so re-arming only touches those rows;
+* listing pages by id (keyset pagination), so ``/api/command/reminders``
+  stays cheap with thousands of rows.
+
+A worker claims a reminder (``mark_triggered``) right before showing it, so
+with several workers arming the same reminder only one of them fires it.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from src.Backend.user_data import USER_DATA_DB, DEFAULT_USER_ID, connect
+
+REMINDER_DB = os.getenv("REMINDER_DB", USER_DATA_DB)
+REMINDER_PAGE_SIZE = int(os.getenv("REMINDER_PAGE_SIZE", "50"))
+REMINDER_MAX_PAGE_SIZE = 500
+
+REMINDER_STATUSES = ("pending", "triggered", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL DEFAULT 'default',
+    content TEXT NOT NULL,
+    time_text TEXT,
+    due REAL,
+    created TEXT NOT NULL,
+    triggered INTEGER NOT NULL DEFAULT 0,
+    cancelled INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS reminders_user ON reminders (user_id, id);
+CREATE INDEX IF NOT EXISTS reminders_pending_due ON reminders (due)
+    WHERE triggered = 0 AND cancelled = 0;
+"""
+
+_COLUMNS = "id, user_id, content, time_text, due, created, triggered, cancelled"
+
+
+def _row_to_dict(row) -> dict:
+    return {
+        "id": row[0],
+        "user_id": row[1],
+        "content": row[2],
+        "time": row[3],
+        "due": row[4],
+        "created": row[5],
+        "triggered": bool(row[6]),
+        "cancelled": bool(row[7])
+    }
+
+
+class ReminderStore:
+    """SQLite-backed reminders, safe to use from the loop and executor threads"""
+
+    def __init__(self, db_path: str = REMINDER_DB):
+        self.db_path = db_path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._db is None:
+            db = connect(self.db_path)
+            columns = [row[1] for row in db.execute("PRAGMA table_info(reminders)")]
+            if columns and "user_id" not in columns:
+                # reminders.db from before reminders were per user
+                db.execute("ALTER TABLE reminders ADD COLUMN user_id TEXT NOT NULL DEFAULT 'default'")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def add(self, content: str, time_text: Optional[str] = None, due: Optional[float] = None,
+            user_id: str = DEFAULT_USER_ID) -> dict:
+        created = datetime.now().isoformat()
+        with self._lock:
+            cursor = self._connect().execute(
+                "INSERT INTO reminders (user_id, content, time_text, due, created) VALUES (?, ?, ?, ?, ?)",
+                (user_id, content, time_text, due, created)
+            )
+            reminder_id = cursor.lastrowid
+        return {"id": reminder_id, "user_id": user_id, "content": content, "time": time_text, "due": due,
+                "created": created, "triggered": False, "cancelled": False}
+
+    def get(self, reminder_id: int, user_id: Optional[str] = None) -> Optional[dict]:
+        query = f"SELECT {_COLUMNS} FROM reminders WHERE id = ?"
+        params = (reminder_id,)
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params += (user_id,)
+        with self._lock:
+            row = self._connect().execute(query, params).fetchone()
+        return _row_to_dict(row) if row else None
+
+    def _set_flag(self, reminder_id: int, column: str, user_id: Optional[str] = None) -> bool:
+        """Set triggered/cancelled on a pending reminder; False if it wasn't pending"""
+        query = f"UPDATE reminders SET {column} = 1 WHERE id = ? AND triggered = 0 AND cancelled = 0"
+        params = (reminder_id,)
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params += (user_id,)
+        with self._lock:
+            return self._connect().execute(query, params).rowcount > 0
+
+    def mark_triggered(self, reminder_id: int) -> bool:
+        return self._set_flag(reminder_id, "triggered")
+
+    def cancel(self, reminder_id: int, user_id: Optional[str] = None) -> bool:
+        return self._set_flag(reminder_id, "cancelled", user_id)
+
+    def pending_due(self, before: Optional[float] = None) -> List[dict]:
+        """Pending reminders of every user with a due time, earliest first (uses the partial index)"""
+        query = f"SELECT {_COLUMNS} FROM reminders WHERE triggered = 0 AND cancelled = 0 AND due IS NOT NULL"
+        params = ()
+        if before is not None:
+            query += " AND due <= ?"
+            params = (before,)
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY due", params).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def list(self, user_id: str = DEFAULT_USER_ID, status: Optional[str] = None, after_id: int = 0,
+             limit: int = REMINDER_PAGE_SIZE) -> List[dict]:
+        """One page of a user's reminders in id order, starting after `after_id`"""
+        limit = max(1, min(limit, REMINDER_MAX_PAGE_SIZE))
+        query = f"SELECT {_COLUMNS} FROM reminders WHERE user_id = ? AND id > ?"
+        if status == "pending":
+            query += " AND triggered = 0 AND cancelled = 0"
+        elif status == "triggered":
+            query += " AND triggered = 1"
+        elif status == "cancelled":
+            query += " AND cancelled = 1"
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY id LIMIT ?", (user_id, after_id, limit)).fetchall()
+        return [_row_to_dict(row) for row in rows]
+
+    def count(self, user_id: str = DEFAULT_USER_ID) -> int:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM reminders WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT COUNT(*), COUNT(DISTINCT user_id), "
+                "COALESCE(SUM(triggered = 0 AND cancelled = 0), 0), "
+                "COALESCE(SUM(triggered = 0 AND cancelled = 0 AND due IS NOT NULL AND due <= ?), 0) "
+                "FROM reminders",
+                (time.time(),)
+            ).fetchone()
+        return {"db": self.db_path, "total": row[0], "users": row[1], "pending": row[2], "overdue": row[3]}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+reminder_store = ReminderStore()
@@ -0,0 +1,315 @@
+"""Retry, backoff and circuit breaking for upstream (Sarvam) calls.
+
+Every Sarvam call (chat completions and translation) goes through
+``call_with_retries`` (or ``stream_with_retries`` for streamed completions):
+
+* each attempt gets ``attempt_timeout`` but never more than what is left of
+  the per-request ``deadline``, so one hung upstream can't hold a request for
+  attempts x timeout;
+* retries wait a full-jitter exponential backoff and spend from a shared
+  ``RetryBudget``, so during an outage retries can't multiply the load;
+* a ``CircuitBreaker`` opens once the recent failure rate crosses
+  ``SARVAM_BREAKER_FAILURE_RATE``. While it is open, calls raise
+  ``CircuitOpenError`` immediately and callers return their usual fallback
+  message. After ``SARVAM_BREAKER_COOLDOWN_SECONDS`` one probe call is let
+  through to decide whether to close it again.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+
+SARVAM_BREAKER_FAILURE_RATE = float(os.getenv("SARVAM_BREAKER_FAILURE_RATE", "0.5"))
+SARVAM_BREAKER_MIN_CALLS = int(os.getenv("SARVAM_BREAKER_MIN_CALLS", "5"))
+SARVAM_BREAKER_WINDOW_SECONDS = float(os.getenv("SARVAM_BREAKER_WINDOW_SECONDS", "60"))
+SARVAM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("SARVAM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# Every call deposits RETRY_BUDGET_RATIO tokens, every retry spends one
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX = float(os.getenv("RETRY_BUDGET_MAX", "10"))
+
+BACKOFF_BASE_SECONDS = float(os.getenv("BACKOFF_BASE_SECONDS", "0.5"))
+BACKOFF_MAX_SECONDS = float(os.getenv("BACKOFF_MAX_SECONDS", "8"))
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the breaker is open"""
+
+
+class UpstreamError(Exception):
+    """Upstream call failed. Retryable errors also count against the breaker."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def raise_for_upstream_status(response: httpx.Response):
+    if response.status_code == 200:
+        return
+    retryable = response.status_code in RETRYABLE_STATUS_CODES or response.status_code >= 500
+    raise UpstreamError(f"Sarvam API returned {response.status_code}: {response.text[:500]}", retryable=retryable)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, UpstreamError):
+        return error.retryable
+    return isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException, httpx.TransportError))
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker over a sliding time window"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name: str, failure_rate: float = SARVAM_BREAKER_FAILURE_RATE,
+                 min_calls: int = SARVAM_BREAKER_MIN_CALLS, window_seconds: float = SARVAM_BREAKER_WINDOW_SECONDS,
+                 cooldown_seconds: float = SARVAM_BREAKER_COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.state = self.CLOSED
+        self._outcomes = deque()   # (timestamp, ok)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.times_opened = 0
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream right now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                now = time.monotonic()
+                # A probe that never reported back (e.g. cancelled) doesn't block forever
+                if self._probe_in_flight and now - self._probe_started < self.cooldown_seconds:
+                    self.rejected += 1
+                    return False
+                self._probe_in_flight = True
+                self._probe_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                print(f"🟢 Circuit '{self.name}' closed after a successful probe")
+                self.state = self.CLOSED
+                self._outcomes.clear()
+                self._probe_in_flight = False
+            self._outcomes.append((now, True))
+            self._trim(now)
+
+    def release(self):
+        """
+        Neutral outcome (e.g. a 4xx that says nothing about upstream health):
+        frees the half-open probe slot without counting a success or failure
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                self._open(now)
+                return
+            self._outcomes.append((now, False))
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (self.state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open(now)
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self.times_opened += 1
+        print(f"🔴 Circuit '{self.name}' opened - failing fast for {self.cooldown_seconds:.0f}s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._trim(time.monotonic())
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "state": self.state,
+                "window_calls": len(self._outcomes),
+                "window_failures": failures,
+                "failure_rate_threshold": self.failure_rate,
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected
+            }
+
+
+class RetryBudget:
+    """Caps retries to a fraction of overall call volume"""
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, max_tokens: float = RETRY_BUDGET_MAX):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.denied = 0
+
+    def record_call(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.retries += 1
+                return True
+            self.denied += 1
+            return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tokens": round(self._tokens, 2),
+                "max_tokens": self.max_tokens,
+                "ratio": self.ratio,
+                "retries": self.retries,
+                "denied": self.denied
+            }
+
+
+sarvam_breaker = CircuitBreaker("sarvam")
+retry_budget = RetryBudget()
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number `attempt` (1-based)"""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** (attempt - 1))))
+
+
+async def _wait_before_retry(attempt: int, deadline_at: float, error: Exception, budget: RetryBudget) -> bool:
+    """Sleep before the next attempt; False if there's no time or budget left to retry"""
+    if not _is_retryable(error):
+        return False
+    delay = backoff_delay(attempt)
+    if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+        return False
+    if not budget.try_spend():
+        print("⚠️ Retry budget exhausted, not retrying")
+        return False
+    await asyncio.sleep(delay)
+    return True
+
+
+def _remaining(deadline_at: float, attempt_timeout: float) -> float:
+    if deadline_at is None:
+        return attempt_timeout
+    return min(attempt_timeout, deadline_at - time.monotonic())
+
+
+async def call_with_retries(operation, *, attempts: int = 1, attempt_timeout: float = 30.0, deadline: float = None,
+                            breaker: CircuitBreaker = sarvam_breaker, budget: RetryBudget = retry_budget):
+    """
+    Run ``await operation(timeout)`` with retries. `deadline` is the total
+    number of seconds the whole call (all attempts and backoff) may take.
+    Raises CircuitOpenError, or the last error once attempts/deadline/budget run out.
+    """
+    deadline_at = time.monotonic() + deadline if deadline is not None else None
+    budget.record_call()
+    last_error = None
+    for attempt in range(1, attempts + 1):
+        # Check the deadline first: an admitted half-open probe has to report back
+        timeout = _remaining(deadline_at, attempt_timeout)
+        if timeout <= 0:
+            break
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit '{breaker.name}' is open")
+        try:
+            result = await asyncio.wait_for(operation(timeout), timeout=timeout)
+            breaker.record_success()
+            return result
+        except Exception as e:
+            last_error = e
+            if _is_retryable(e):
+                breaker.record_failure()
+            else:
+                breaker.release()
+            print(f"[{breaker.name} attempt {attempt}/{attempts}] {type(e).__name__}: {e}")
+        if attempt == attempts or not await _wait_before_retry(attempt, deadline_at, last_error, budget):
+            break
+    raise last_error or asyncio.TimeoutError("Request deadline exceeded")
+
+
+async def stream_with_retries(open_stream, *, attempts: int = 1, first_chunk_timeout: float = 30.0,
+                              deadline: float = None, breaker: CircuitBreaker = sarvam_breaker,
+                              budget: RetryBudget = retry_budget):
+    """
+    Async-iterate ``open_stream()`` with the same retry/breaker rules as
+    call_with_retries. Retries only happen before the first chunk arrives,
+    since anything already sent to the client can't be taken back.
+    """
+    deadline_at = time.monotonic() + deadline if deadline is not None else None
+    budget.record_call()
+    for attempt in range(1, attempts + 1):
+        timeout = _remaining(deadline_at, first_chunk_timeout)
+        if timeout <= 0:
+            raise asyncio.TimeoutError("Request deadline exceeded")
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit '{breaker.name}' is open")
+        stream = open_stream().__aiter__()
+        try:
+            first = await asyncio.wait_for(stream.__anext__(), timeout=timeout)
+        except StopAsyncIteration:
+            first = None
+            error = UpstreamError("Empty streamed response")
+        except Exception as e:
+            first = None
+            error = e
+        if first is not None:
+            breaker.record_success()
+            break
+        await stream.aclose()
+        if _is_retryable(error):
+            breaker.record_failure()
+        else:
+            breaker.release()
+        print(f"[{breaker.name} stream attempt {attempt}/{attempts}] {type(error).__name__}: {error}")
+        if attempt == attempts or not await _wait_before_retry(attempt, deadline_at, error, budget):
+            raise error
+
+    yield first
+    try:
+        while True:
+            if deadline_at is not None and time.monotonic() >= deadline_at:
+                raise asyncio.TimeoutError("Request deadline exceeded")
+            try:
+                chunk = await asyncio.wait_for(stream.__anext__(), timeout=_remaining(deadline_at, first_chunk_timeout))
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        await stream.aclose()
+
+
+def stats() -> dict:
+    return {"sarvam_breaker": sarvam_breaker.stats(), "retry_budget": retry_budget.stats()}
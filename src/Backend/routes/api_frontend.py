@@ -3,10 +3,17 @@
 # /api/speech/tts -> speech.py (text to speech)
 # /api/command -> langchain.py (commands)
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from src.Backend.routes.groqchat import chat_with_groq, classify_intent_and_respond
+from src.Backend.routes.groqchat import chat_with_groq, classify_intent_and_respond, stream_intent_and_respond
 from src.Backend.routes.manusagent import ask_manus_agent
+from src.Backend.translation import translation_cache
+from src.Backend.intent_classifier import classifier_stats
+from src.Backend.conversation_memory import conversation_store
+from src.Backend import resilience
+from src.Backend.scheduler import scheduler
+from src.Backend.user_data import DEFAULT_USER_ID, request_user_id
 import json
 import traceback
 
@@ -15,13 +22,14 @@ router = APIRouter()
 class ChatRequest(BaseModel):
     message: str
     language_code: str = None
+    session_id: str = None
 
 @router.post("/chat") #chatbot.jsx use krega iss endpoint ko
-async def process_chat(request: ChatRequest):
+async def process_chat(request: ChatRequest, user_id: str = Depends(request_user_id)):
     """Process chat messages and return appropriate response"""
     try:
         # First classify the intent
-        intent_data_raw = await classify_intent_and_respond(request.message, request.language_code)
+        intent_data_raw = await classify_intent_and_respond(request.message, request.language_code, request.session_id)
         print("intent_data_raw:", intent_data_raw)  # Debug log
         # If intent_data_raw is a dict with 'choices', extract the content
         if isinstance(intent_data_raw, dict) and "choices" in intent_data_raw:
@@ -37,42 +45,7 @@ async def process_chat(request: ChatRequest):
         else:
             intent_data = intent_data_raw  # fallback
         print("intent_data:", intent_data)  # Debug log
-        # If it's a command, use Manus agent
-        if intent_data.get("type") == "command":
-            response = await ask_manus_agent(request.message)
-            return {
-                "status": "success",
-                "data": {
-                    "response": response,
-                    "language_code": intent_data.get("language_code"),
-                    "type": "command"
-                }
-            }
-        # If it's a structured (4-perspective) response, return the 4-perspective object and voice_message only
-        if intent_data.get("type") == "structured":
-            return {
-                "status": "success",
-                "data": {
-                    "response": intent_data.get("response"),
-                    "voice_message": intent_data.get("voice_message"),
-                    "language_code": intent_data.get("language_code"),
-                    "type": "structured"
-                }
-            }
-        # Otherwise use normal chat or fallback
-        reply = (
-            intent_data.get("message")
-            or intent_data.get("response")
-            or "I'm sorry, I couldn't generate a response right now. Please try again."
-        )
-        return {
-            "status": "success",
-            "data": {
-                "response": reply,
-                "language_code": intent_data.get("language_code"),
-                "type": "chat"
-            }
-        }
+        return {"status": "success", "data": await build_chat_data(intent_data, request.message, user_id)}
     except Exception as e:
         print("Exception in /api/chat:", str(e))
         traceback.print_exc()
@@ -81,3 +54,87 @@ async def process_chat(request: ChatRequest):
             detail=str(e)
         )
 
+async def build_chat_data(intent_data: dict, message: str, user_id: str = DEFAULT_USER_ID) -> dict:
+    """Shape a classify_intent_and_respond result into the /api/chat "data" payload"""
+    # If it's a command, use Manus agent
+    if intent_data.get("type") == "command":
+        response = await ask_manus_agent(message, user_id=user_id)
+        return {
+            "response": response,
+            "language_code": intent_data.get("language_code"),
+            "type": "command"
+        }
+    # If it's a structured (4-perspective) response, return the 4-perspective object and voice_message only
+    if intent_data.get("type") == "structured":
+        return {
+            "response": intent_data.get("response"),
+            "voice_message": intent_data.get("voice_message"),
+            "language_code": intent_data.get("language_code"),
+            "type": "structured"
+        }
+    # Otherwise use normal chat or fallback
+    reply = (
+        intent_data.get("message")
+        or intent_data.get("response")
+        or "I'm sorry, I couldn't generate a response right now. Please try again."
+    )
+    return {
+        "response": reply,
+        "language_code": intent_data.get("language_code"),
+        "type": "chat"
+    }
+
+def _sse(event: str, payload) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+@router.post("/chat/stream")
+async def process_chat_stream(request: ChatRequest, user_id: str = Depends(request_user_id)):
+    """
+    Streaming /api/chat over Server-Sent Events. Sends "start" once the intent
+    is known, "delta" events with chit-chat output as it arrives or a "section"
+    event per structured perspective as it completes, then "final" with the
+    same "data" payload /api/chat returns (or "error").
+    """
+    async def events():
+        try:
+            async for event, payload in stream_intent_and_respond(request.message, request.language_code, request.session_id):
+                if event == "final":
+                    payload = await build_chat_data(payload, request.message, user_id)
+                yield _sse(event, payload)
+        except Exception as e:
+            print("Exception in /api/chat/stream:", str(e))
+            traceback.print_exc()
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop proxies (Heroku router, nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/translation/stats")
+async def translation_cache_stats():
+    """Translation cache hit/miss counters"""
+    return translation_cache.stats()
+
+@router.get("/intent/stats")
+async def intent_classifier_stats():
+    """How often the local intent classifier avoided the LLM classification call"""
+    return classifier_stats.report()
+
+@router.get("/conversation/stats")
+async def conversation_memory_stats():
+    """Live sessions and evictions in the per-session conversation memory"""
+    return conversation_store.stats()
+
+@router.get("/upstream/stats")
+async def upstream_stats():
+    """Sarvam circuit breaker state and retry budget"""
+    return resilience.stats()
+
+@router.get("/scheduler/stats")
+async def scheduler_stats():
+    """Counts of pending reminders, timers and focus sessions in the heap scheduler"""
+    # Job descriptions carry users' reminder text, so only counts are exposed
+    return scheduler.stats()
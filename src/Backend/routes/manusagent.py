@@ -1,17 +1,23 @@
 import requests
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 import webbrowser
 import urllib.parse
 import re
 from datetime import datetime, timedelta, date
-import threading
 import time
 import asyncio
-import queue
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from src.Backend.sarvam import Sarvam
+from src.Backend import phrase_matcher
+from src.Backend.scheduler import scheduler
+from src.Backend.analytics_writer import analytics_writer
+from src.Backend.habit_store import habit_store
+from src.Backend.task_store import task_store
+from src.Backend.user_data import DEFAULT_USER_ID, request_user_id
+from src.Backend.reminder_store import reminder_store, REMINDER_PAGE_SIZE, REMINDER_MAX_PAGE_SIZE, REMINDER_STATUSES
 import os
-import json
 import subprocess
 try:
     import winsound
@@ -26,12 +32,53 @@ from dotenv import load_dotenv
 load_dotenv()
 router = APIRouter()
 sarvam_client = Sarvam(api_key=os.getenv('SARVAM_API_KEY'))
+TOOL_EXECUTOR_WORKERS = int(os.getenv("TOOL_EXECUTOR_WORKERS", "8"))
+GOAL_BREAKDOWN_TIMEOUT = float(os.getenv("GOAL_BREAKDOWN_TIMEOUT", "30"))
+CHAT_FALLBACK_TIMEOUT = float(os.getenv("CHAT_FALLBACK_TIMEOUT", "15"))
+# How often each worker picks up reminders created by other workers
+REMINDER_SWEEP_SECONDS = float(os.getenv("REMINDER_SWEEP_SECONDS", "60"))
+
+# Canned tool replies (kept together so the translation cache can pre-warm them at startup)
+BROWSER_HELP_REPLY = "I can open Chrome, search Google, search YouTube, or open websites. Try: 'open chrome', 'search google for AI', 'search youtube channel', 'open website github.com'"
+GOAL_MISSING_REPLY = "Please provide a goal to break down. Example: 'Break down: Learn LLM training and fine-tuning'"
+NO_HABIT_STATS_REPLY = "📊 No habits tracked yet. Start with 'Log habit: exercise'"
+NO_HABITS_REPLY = "📋 No habits tracked yet. Start with 'Log habit: [habit name]'"
+RESET_HABIT_HELP_REPLY = "Specify habit to reset: 'Reset habit: exercise'"
+NO_TASKS_REPLY = "📋 No tasks in your list. Add some with 'add task: [description]'"
+ADD_TASK_HELP_REPLY = "Please specify the task. Example: 'Add task: Review project proposal'"
+NO_TASKS_TO_COMPLETE_REPLY = "📋 No tasks to complete!"
+TASKS_ALREADY_EMPTY_REPLY = "📋 Task list is already empty"
+NO_ACTIVE_REMINDERS_REPLY = "No active reminders."
+NO_REMINDERS_REPLY = "No reminders set."
+
+STATIC_RESPONSES = [
+    BROWSER_HELP_REPLY, GOAL_MISSING_REPLY, NO_HABIT_STATS_REPLY, NO_HABITS_REPLY,
+    RESET_HABIT_HELP_REPLY, NO_TASKS_REPLY, ADD_TASK_HELP_REPLY, NO_TASKS_TO_COMPLETE_REPLY,
+    TASKS_ALREADY_EMPTY_REPLY, NO_ACTIVE_REMINDERS_REPLY, NO_REMINDERS_REPLY,
+]
+
+# Phrase lists used for routing (matched in one pass by src/Backend/phrase_matcher.py)
+BEST_CHANNEL_PHRASES = ["best youtube channel", "tell me the best youtube channel", "मुझे सबसे अच्छा youtube चैनल बताओ", "सबसे अच्छा youtube चैनल", "सबसे अच्छा यूट्यूब चैनल", "बेस्ट यूट्यूब चैनल", "सबसे बेहतरीन यूट्यूब चैनल", "अच्छा यूट्यूब चैनल कौन सा है", "सबसे अच्छा youtube चैनल बताओ", "सबसे अच्छा youtube चैनल कौन सा है", "सबसे अच्छा युट्युब चैनल", "युट्युब चैनल बता", "अच्छा चैनल बताओ", "बेस्ट चैनल कौन सा है"]
+BROWSER_COMMAND_PHRASES = ["open chrome", "open browser", "open google", "chrome and search", "chrome search", "google and search", "youtube", "google search", "search google", "search on google", "open website", "open url", "best youtube channel", "tell me the best youtube channel", "मुझे सबसे अच्छा यूट्यूब चैनल बताओ", "सबसे अच्छा youtube चैनल", "सबसे अच्छा यूट्यूब चैनल", "बेस्ट यूट्यूब चैनल", "सबसे बेहतरीन यूट्यूब चैनल", "अच्छा यूट्यूब चैनल कौन सा है", "सबसे अच्छा youtube चैनल बताओ", "सबसे अच्छा youtube चैनल कौन सा है", "सबसे अच्छा युट्युब चैनल", "युट्युब चैनल बता", "अच्छा चैनल बताओ", "बेस्ट चैनल कौन सा है"]
+HINDI_CHANNEL_WORDS = ["मुझे", "सबसे", "यूट्यूब", "युट्युब", "चैनल", "बताओ", "कौन", "अच्छा", "बेस्ट", "बेहतरीन"]
+GOOGLE_SEARCH_PHRASES = ["search on google", "google search", "search google", "open google and search", "google and search"]
+YOUTUBE_SEARCH_INDICATORS = [
+    "search", "find", "show", "channel", "video", "watch", "about", 
+    "tell", "explain", "discuss", "want to watch", "looking for",
+    "content", "topic", "subject", "learn", "tutorial", "how to"
+]
+HABIT_LOG_PHRASES = ["log habit", "habit:", "track", "did"]
+
+phrase_matcher.register("best_channel", BEST_CHANNEL_PHRASES)
+phrase_matcher.register("browser_commands", BROWSER_COMMAND_PHRASES)
+phrase_matcher.register("hindi_channel_words", HINDI_CHANNEL_WORDS)
+phrase_matcher.register("google_search", GOOGLE_SEARCH_PHRASES)
+phrase_matcher.register("youtube_search_intent", YOUTUBE_SEARCH_INDICATORS)
+phrase_matcher.register("habit_log", HABIT_LOG_PHRASES)
 # Analytics tracking function
 async def track_command_analytics(command: str, command_type: str, success: bool = True):
     """Track command execution analytics"""
     try:
-        from .analytics import ANALYTICS_FILE
-        
         event_data = {
             "event": "command_executed",
             "data": {
@@ -45,19 +92,35 @@ async def track_command_analytics(command: str, command_type: str, success: bool
             "session_id": f"backend_session_{int(datetime.now().timestamp())}"
         }
         
-        # Append to analytics file
-        with open(ANALYTICS_FILE, "a") as f:
-            f.write(json.dumps(event_data) + "\n")
-            
+        # Queued for the batched writer; dropped (and counted) if the queue is full
+        analytics_writer.submit(event_data)
+
     except Exception as e:
         print(f"Analytics tracking error: {e}")
 
+# Sync tools (file I/O, webbrowser, notifications) run on this bounded pool so
+# they never block the event loop; async tools are awaited directly.
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_EXECUTOR_WORKERS, thread_name_prefix="tool")
+
+def shutdown_tool_executor():
+    tool_executor.shutdown(wait=False)
+
 # Simple Tool class to replace OpenManus Tool
 class Tool:
-    def __init__(self, name: str, description: str, func):
+    def __init__(self, name: str, description: str, func, user_scoped: bool = False):
         self.name = name
         self.description = description
         self.func = func
+        self.is_async = asyncio.iscoroutinefunction(func)
+        # User-scoped tools keep per-user state and are called as func(command, user_id)
+        self.user_scoped = user_scoped
+
+    async def run(self, command: str, user_id: str = DEFAULT_USER_ID):
+        func = partial(self.func, user_id=user_id) if self.user_scoped else self.func
+        if self.is_async:
+            return await func(command)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(tool_executor, func, command)
 
 
 
@@ -67,56 +130,18 @@ class CommandRequest(BaseModel):
 class Query(BaseModel):
     prompt: str
 
-# --- Command Detection Function for Classification ---
-def is_command(text: str) -> bool:
-    """
-    Check if the input text is a command that can be handled by our tools.
-    This should match the same logic as get_response() for consistent classification.
-    """
-    lower = text.lower().strip()
-    
-    # Browser/web commands - prioritize these over note commands
-    # Enhanced detection for voice commands that start with "chrome" or contain search terms
-    if (any(phrase in lower for phrase in ["open chrome", "open browser", "open google", "chrome and search", "chrome search", "google and search", "youtube", "google search", "search google", "search on google", "open website", "open url", "best youtube channel", "tell me the best youtube channel", "मुझे सबसे अच्छा यूट्यूब चैनल बताओ", "सबसे अच्छा youtube चैनल", "सबसे अच्छा यूट्यूब चैनल", "बेस्ट यूट्यूब चैनल", "सबसे बेहतरीन यूट्यूब चैनल", "अच्छा यूट्यूब चैनल कौन सा है", "सबसे अच्छा youtube चैनल बताओ", "सबसे अच्छा youtube चैनल कौन सा है", "सबसे अच्छा युट्युब चैनल", "युट्युब चैनल बता", "अच्छा चैनल बताओ", "बेस्ट चैनल कौन सा है"]) or
-        # Check if command starts with "chrome" (for voice commands like "chrome and search for...")
-        (lower.startswith("chrome") and ("search" in lower or "for" in lower)) or
-        # Check if command starts with "google" (for voice commands like "google and search for...")
-        (lower.startswith("google") and ("search" in lower or "for" in lower)) or
-        # Check for "google" + "search" patterns
-        ("google" in lower and "search" in lower)):
-        return True
-    # Reminder commands
-    elif lower.startswith("remind me") or lower.startswith("set a reminder") or "reminder" in lower:
-        return True
-    # Goal breakdown commands
-    elif lower.startswith("break down") or "break down" in lower or "goal" in lower:
-        return True
-    # Habit logging commands
-    elif lower.startswith("log habit") or lower.startswith("habit:") or "habit" in lower or "track" in lower or "habit stats" in lower or "list habits" in lower:
-        return True
-    # Quick task commands  
-    elif lower.startswith("start a") or lower.startswith("list my tasks") or lower.startswith("quick task") or "timer" in lower or "task" in lower or "focus" in lower or "add task" in lower or "complete task" in lower:
-        return True
-    # Note commands (enhanced) - but exclude "search" commands that should go to browser
-    elif (lower.startswith("note:") or lower.startswith("save a note") or lower.startswith("add a note") or "search notes" in lower or "category" in lower) and "search" not in lower.split()[0:2]:
-        return True
-    # List commands
-    elif lower in ["get reminders", "show reminders", "list reminders", "get notes", "show notes", "list notes", "notes", "list categories", "list habits", "habit stats"]:
-        return True
-    else:
-        return False
-
 # --- Tool: Browser Automation ---
 def browser_tool(command: str) -> str:
     """Open Chrome tabs, search Google, YouTube, etc."""
     lower = command.lower().strip()
+    matches = phrase_matcher.scan(lower)
     
     try:
         # Special hard-coded response for best YouTube channel (English and Hindi)
-        if any(phrase in lower for phrase in ["best youtube channel", "tell me the best youtube channel", "मुझे सबसे अच्छा youtube चैनल बताओ", "सबसे अच्छा youtube चैनल", "सबसे अच्छा यूट्यूब चैनल", "बेस्ट यूट्यूब चैनल", "सबसे बेहतरीन यूट्यूब चैनल", "अच्छा यूट्यूब चैनल कौन सा है", "सबसे अच्छा youtube चैनल बताओ", "सबसे अच्छा youtube चैनल कौन सा है", "सबसे अच्छा युट्युब चैनल", "युट्युब चैनल बता", "अच्छा चैनल बताओ", "बेस्ट चैनल कौन सा है"]):
+        if matches.has("best_channel"):
             webbrowser.open("https://www.youtube.com/@vaishuuff")
             # Check if the original command was in Hindi and respond accordingly
-            if any(hindi_phrase in command for hindi_phrase in ["मुझे", "सबसे", "यूट्यूब", "युट्युब", "चैनल", "बताओ", "कौन", "अच्छा", "बेस्ट", "बेहतरीन"]):
+            if matches.has("hindi_channel_words"):
                 return "सबसे अच्छा YouTube चैनल तो vaishu uff का है! वो software, startups और college life के बारे में शेयर करती है। मैं आपके लिए चैनल खोल रहा हूं। Subscribe करना मत भूलना!"
             else:
                 return "The best YouTube channel is of course vaishu uff! She shares about software, startups and college life. I will open the channel for you. Don't forget to subscribe it!"
@@ -145,7 +170,7 @@ def browser_tool(command: str) -> str:
             else:
                 webbrowser.open("https://www.google.com")
                 return "Opened Chrome with Google homepage"
-        elif "search on google" in lower or "google search" in lower or "search google" in lower or "open google and search" in lower or "google and search" in lower:
+        elif matches.has("google_search"):
             # Direct Google search commands
             query = _extract_google_query_semantic(command)
             if query:
@@ -169,14 +194,8 @@ def browser_tool(command: str) -> str:
         elif "youtube" in lower:
             # Check if this is a search request or just opening YouTube
             # If the command has substantial content beyond just "youtube", treat it as a search
-            youtube_indicators = [
-                "search", "find", "show", "channel", "video", "watch", "about", 
-                "tell", "explain", "discuss", "want to watch", "looking for",
-                "content", "topic", "subject", "learn", "tutorial", "how to"
-            ]
-            
             # Check if any search indicators are present, or if there's substantial content
-            has_search_intent = any(indicator in lower for indicator in youtube_indicators)
+            has_search_intent = matches.has("youtube_search_intent")
             has_substantial_content = len(command.split()) > 3  # More than just "open youtube"
             
             if has_search_intent or has_substantial_content:
@@ -212,7 +231,7 @@ def browser_tool(command: str) -> str:
                 webbrowser.open(site)
                 return f"Opened: {site}"
                 
-        return "I can open Chrome, search Google, search YouTube, or open websites. Try: 'open chrome', 'search google for AI', 'search youtube channel', 'open website github.com'"
+        return BROWSER_HELP_REPLY
         
     except Exception as e:
         return f"Error opening browser: {str(e)}"
@@ -224,11 +243,191 @@ browser = Tool(
 )
 
 # --- Tool: Enhanced Reminder with Pop-ups ---
-def enhanced_reminder_tool(command: str) -> dict:
-    """Enhanced reminder with actual pop-up notifications at specified time"""
-    if not hasattr(enhanced_reminder_tool, "reminders"):
-        enhanced_reminder_tool.reminders = []
+# reminder id -> scheduler job id for reminders armed in this process
+reminder_jobs = {}
+
+def arm_reminder(reminder_data: dict) -> int:
+    """Schedule the pop-up for a stored reminder at its due time"""
+    job_id = scheduler.schedule(
+        partial(fire_reminder, reminder_data),
+        at=reminder_data["due"],
+        kind="reminder",
+        description=reminder_data["content"]
+    )
+    reminder_jobs[reminder_data["id"]] = job_id
+    return job_id
+
+def rearm_reminders() -> int:
+    """
+    Schedule every pending reminder this worker hasn't armed yet: all of them
+    after a restart (overdue ones fire right away), then the ones other
+    workers created. Runs again every REMINDER_SWEEP_SECONDS.
+    """
+    armed = 0
+    for reminder_data in reminder_store.pending_due():
+        if reminder_data["id"] not in reminder_jobs:
+            arm_reminder(reminder_data)
+            armed += 1
+    if armed:
+        print(f"⏰ Armed {armed} pending reminders from {reminder_store.db_path}")
+    scheduler.schedule(rearm_reminders, delay_seconds=REMINDER_SWEEP_SECONDS,
+                       kind="reminder_sweep", description="arm reminders from other workers")
+    return armed
+
+def fire_reminder(reminder_data: dict):
+    """Show a due reminder (runs on an executor thread when the scheduler fires it)"""
+    content = reminder_data["content"]
+    reminder_jobs.pop(reminder_data["id"], None)
+    # Claim it first: it may have been cancelled, or fired by another worker
+    if not reminder_store.mark_triggered(reminder_data["id"]):
+        return
     
+    wake_time = datetime.now()
+    print(f"\n⏰ WAKE UP! Reminder triggered at: {wake_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🎯 Triggering reminder: '{content}'")
+    
+    try:
+        notification_shown = False
+        
+        # Method 1: Try plyer first (cross-platform and most reliable)
+        print("🔄 Attempting plyer notification...")
+        try:
+            from plyer import notification
+            notification.notify(
+                title="⏰ Ruhaan Reminder",
+                message=f"⏰ {content}",
+                timeout=15
+            )
+            notification_shown = True
+            print(f"✅ Plyer notification sent successfully: {content}")
+        except ImportError:
+            print("❌ Plyer not available (ImportError), trying Windows-specific methods...")
+        except Exception as e:
+            print(f"❌ Plyer failed with error: {e}")
+        
+        # Method 2: Windows MessageBox (most reliable on Windows)
+        if not notification_shown:
+            print("🔄 Attempting Windows MessageBox...")
+            try:
+                import subprocess
+                import os
+                if os.name == 'nt':  # Windows
+                    # Escape content for PowerShell
+                    escaped_content = content.replace('"', '""').replace("'", "''")
+                    cmd = [
+                        'powershell', '-Command', 
+                        f'Add-Type -AssemblyName PresentationCore,PresentationFramework; [System.Windows.MessageBox]::Show("⏰ REMINDER: {escaped_content}", "Ruhaan Reminder", "OK", "Information")'
+                    ]
+                    result = subprocess.run(cmd, capture_output=True, text=True, shell=True, timeout=30)
+                    notification_shown = True
+                    print(f"✅ Windows MessageBox executed successfully: {content}")
+                    if result.stdout:
+                        print(f"📝 MessageBox stdout: {result.stdout}")
+                    if result.stderr:
+                        print(f"⚠️ MessageBox stderr: {result.stderr}")
+                else:
+                    print("❌ Not on Windows, skipping MessageBox")
+            except Exception as e:
+                print(f"❌ Windows MessageBox failed with error: {e}")
+        
+        # Method 3: Windows balloon tip notification
+        if not notification_shown:
+            print("🔄 Attempting Windows balloon notification...")
+            try:
+                import subprocess
+                import os
+                if os.name == 'nt':  # Windows
+                    # Escape content for PowerShell
+                    escaped_content = content.replace('"', '""').replace("'", "''")
+                    ps_script = f'''
+Add-Type -AssemblyName System.Windows.Forms
+$notification = New-Object System.Windows.Forms.NotifyIcon
+$notification.Icon = [System.Drawing.SystemIcons]::Information
+$notification.BalloonTipIcon = [System.Windows.Forms.ToolTipIcon]::Info
+$notification.BalloonTipTitle = "⏰ Ruhaan Reminder"
+$notification.BalloonTipText = "{escaped_content}"
+$notification.Visible = $true
+$notification.ShowBalloonTip(10000)
+Start-Sleep -Seconds 12
+$notification.Dispose()
+'''
+                    result = subprocess.run(['powershell', '-Command', ps_script], 
+                                           capture_output=True, text=True, shell=True, timeout=30)
+                    notification_shown = True
+                    print(f"✅ Windows balloon notification executed: {content}")
+                    if result.stdout:
+                        print(f"📝 Balloon stdout: {result.stdout}")
+                    if result.stderr:
+                        print(f"⚠️ Balloon stderr: {result.stderr}")
+                else:
+                    print("❌ Not on Windows, skipping balloon notification")
+            except Exception as e:
+                print(f"❌ Windows balloon notification failed with error: {e}")
+        
+        # Method 4: Simple cmd msgbox as fallback
+        if not notification_shown:
+            print("🔄 Attempting CMD msg notification...")
+            try:
+                import subprocess
+                import os
+                if os.name == 'nt':  # Windows
+                    # Use msg command for simple popup
+                    escaped_content = content.replace('"', '""')
+                    result = subprocess.run([
+                        'msg', '*', f'⏰ RUHAAN REMINDER: {escaped_content}'
+                    ], capture_output=True, text=True, shell=True, timeout=30)
+                    notification_shown = True
+                    print(f"✅ CMD msg notification executed: {content}")
+                    if result.stdout:
+                        print(f"📝 MSG stdout: {result.stdout}")
+                    if result.stderr:
+                        print(f"⚠️ MSG stderr: {result.stderr}")
+                else:
+                    print("❌ Not on Windows, skipping CMD msg")
+            except Exception as e:
+                print(f"❌ CMD msg failed with error: {e}")
+        
+        # Method 5: Force console notification with sound (always show)
+        print(f"\n🔔🔔🔔 REMINDER ALERT 🔔🔔🔔")
+        print(f"⏰ REMINDER: {content}")
+        print(f"⏰ Time: {datetime.now().strftime('%H:%M:%S')}")
+        print(f"🔔🔔🔔 REMINDER ALERT 🔔🔔🔔\n")
+        
+        # Summary of notification attempts
+        print(f"📊 Notification summary:")
+        print(f"   - At least one GUI method was attempted: {notification_shown}")
+        print(f"   - Console alert: Always shown")
+        print(f"   - Sound alert: Attempting...")
+        
+        # Try to make a beep sound
+        try:
+            import winsound
+            for i in range(3):  # 3 beeps
+                winsound.Beep(1000, 300)  # 1000 Hz for 300ms
+                time.sleep(0.2)
+            print("🔊 Sound alert played!")
+        except ImportError:
+            print("🔇 winsound not available (not Windows)")
+        except Exception as e:
+            try:
+                print('\a' * 5)  # Multiple ASCII bell characters
+                print("🔊 ASCII bell played!")
+            except Exception as bell_e:
+                print(f"🔇 No sound available - winsound: {e}, bell: {bell_e}")
+        
+        # Mark as triggered
+        reminder_data["triggered"] = True
+        print(f"✅ Reminder marked as triggered: {content}")
+        print(f"🕐 Reminder completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    except Exception as e:
+        print(f"❌ Error triggering reminder: {e}")
+        print(f"🔔 EMERGENCY ALERT: {content} - {datetime.now().strftime('%H:%M:%S')}")
+        import traceback
+        traceback.print_exc()
+
+
+def enhanced_reminder_tool(command: str, user_id: str = DEFAULT_USER_ID) -> dict:
+    """Enhanced reminder with actual pop-up notifications at specified time"""
     # Extract reminder content
     match = re.search(r"remind me to (.+)", command, re.IGNORECASE)
     if match:
@@ -313,170 +512,13 @@ def enhanced_reminder_tool(command: str) -> dict:
                     delay_seconds = None
             break
     
-    # Store reminder
-    reminder_data = {
-        "id": len(enhanced_reminder_tool.reminders) + 1,
-        "content": content,
-        "time": reminder_time,
-        "created": datetime.now().isoformat(),
-        "triggered": False
-    }
-    enhanced_reminder_tool.reminders.append(reminder_data)
+    # Store reminder (due is kept so it can be re-armed after a restart)
+    due = time.time() + delay_seconds if delay_seconds else None
+    reminder_data = reminder_store.add(content, reminder_time, due, user_id=user_id)
     
     # Schedule notification if delay_seconds is specified
     if delay_seconds:
-        def trigger_reminder():
-            print(f"🚀 Reminder thread started, sleeping for {delay_seconds} seconds...")
-            print(f"🕐 Thread will wake up at: {(datetime.now() + timedelta(seconds=delay_seconds)).strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            time.sleep(delay_seconds)
-            
-            wake_time = datetime.now()
-            print(f"\n⏰ WAKE UP! Reminder thread triggered at: {wake_time.strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"🎯 Triggering reminder: '{content}'")
-            
-            try:
-                notification_shown = False
-                
-                # Method 1: Try plyer first (cross-platform and most reliable)
-                print("🔄 Attempting plyer notification...")
-                try:
-                    from plyer import notification
-                    notification.notify(
-                        title="⏰ Ruhaan Reminder",
-                        message=f"⏰ {content}",
-                        timeout=15
-                    )
-                    notification_shown = True
-                    print(f"✅ Plyer notification sent successfully: {content}")
-                except ImportError:
-                    print("❌ Plyer not available (ImportError), trying Windows-specific methods...")
-                except Exception as e:
-                    print(f"❌ Plyer failed with error: {e}")
-                
-                # Method 2: Windows MessageBox (most reliable on Windows)
-                if not notification_shown:
-                    print("🔄 Attempting Windows MessageBox...")
-                    try:
-                        import subprocess
-                        import os
-                        if os.name == 'nt':  # Windows
-                            # Escape content for PowerShell
-                            escaped_content = content.replace('"', '""').replace("'", "''")
-                            cmd = [
-                                'powershell', '-Command', 
-                                f'Add-Type -AssemblyName PresentationCore,PresentationFramework; [System.Windows.MessageBox]::Show("⏰ REMINDER: {escaped_content}", "Ruhaan Reminder", "OK", "Information")'
-                            ]
-                            result = subprocess.run(cmd, capture_output=True, text=True, shell=True, timeout=30)
-                            notification_shown = True
-                            print(f"✅ Windows MessageBox executed successfully: {content}")
-                            if result.stdout:
-                                print(f"📝 MessageBox stdout: {result.stdout}")
-                            if result.stderr:
-                                print(f"⚠️ MessageBox stderr: {result.stderr}")
-                        else:
-                            print("❌ Not on Windows, skipping MessageBox")
-                    except Exception as e:
-                        print(f"❌ Windows MessageBox failed with error: {e}")
-                
-                # Method 3: Windows balloon tip notification
-                if not notification_shown:
-                    print("🔄 Attempting Windows balloon notification...")
-                    try:
-                        import subprocess
-                        import os
-                        if os.name == 'nt':  # Windows
-                            # Escape content for PowerShell
-                            escaped_content = content.replace('"', '""').replace("'", "''")
-                            ps_script = f'''
-Add-Type -AssemblyName System.Windows.Forms
-$notification = New-Object System.Windows.Forms.NotifyIcon
-$notification.Icon = [System.Drawing.SystemIcons]::Information
-$notification.BalloonTipIcon = [System.Windows.Forms.ToolTipIcon]::Info
-$notification.BalloonTipTitle = "⏰ Ruhaan Reminder"
-$notification.BalloonTipText = "{escaped_content}"
-$notification.Visible = $true
-$notification.ShowBalloonTip(10000)
-Start-Sleep -Seconds 12
-$notification.Dispose()
-'''
-                            result = subprocess.run(['powershell', '-Command', ps_script], 
-                                                   capture_output=True, text=True, shell=True, timeout=30)
-                            notification_shown = True
-                            print(f"✅ Windows balloon notification executed: {content}")
-                            if result.stdout:
-                                print(f"📝 Balloon stdout: {result.stdout}")
-                            if result.stderr:
-                                print(f"⚠️ Balloon stderr: {result.stderr}")
-                        else:
-                            print("❌ Not on Windows, skipping balloon notification")
-                    except Exception as e:
-                        print(f"❌ Windows balloon notification failed with error: {e}")
-                
-                # Method 4: Simple cmd msgbox as fallback
-                if not notification_shown:
-                    print("🔄 Attempting CMD msg notification...")
-                    try:
-                        import subprocess
-                        import os
-                        if os.name == 'nt':  # Windows
-                            # Use msg command for simple popup
-                            escaped_content = content.replace('"', '""')
-                            result = subprocess.run([
-                                'msg', '*', f'⏰ RUHAAN REMINDER: {escaped_content}'
-                            ], capture_output=True, text=True, shell=True, timeout=30)
-                            notification_shown = True
-                            print(f"✅ CMD msg notification executed: {content}")
-                            if result.stdout:
-                                print(f"📝 MSG stdout: {result.stdout}")
-                            if result.stderr:
-                                print(f"⚠️ MSG stderr: {result.stderr}")
-                        else:
-                            print("❌ Not on Windows, skipping CMD msg")
-                    except Exception as e:
-                        print(f"❌ CMD msg failed with error: {e}")
-                
-                # Method 5: Force console notification with sound (always show)
-                print(f"\n🔔🔔🔔 REMINDER ALERT 🔔🔔🔔")
-                print(f"⏰ REMINDER: {content}")
-                print(f"⏰ Time: {datetime.now().strftime('%H:%M:%S')}")
-                print(f"🔔🔔🔔 REMINDER ALERT 🔔🔔🔔\n")
-                
-                # Summary of notification attempts
-                print(f"📊 Notification summary:")
-                print(f"   - At least one GUI method was attempted: {notification_shown}")
-                print(f"   - Console alert: Always shown")
-                print(f"   - Sound alert: Attempting...")
-                
-                # Try to make a beep sound
-                try:
-                    import winsound
-                    for i in range(3):  # 3 beeps
-                        winsound.Beep(1000, 300)  # 1000 Hz for 300ms
-                        time.sleep(0.2)
-                    print("🔊 Sound alert played!")
-                except ImportError:
-                    print("🔇 winsound not available (not Windows)")
-                except Exception as e:
-                    try:
-                        print('\a' * 5)  # Multiple ASCII bell characters
-                        print("🔊 ASCII bell played!")
-                    except Exception as bell_e:
-                        print(f"🔇 No sound available - winsound: {e}, bell: {bell_e}")
-                
-                # Mark as triggered
-                reminder_data["triggered"] = True
-                print(f"✅ Reminder marked as triggered: {content}")
-                print(f"🕐 Reminder completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            except Exception as e:
-                print(f"❌ Error triggering reminder: {e}")
-                print(f"🔔 EMERGENCY ALERT: {content} - {datetime.now().strftime('%H:%M:%S')}")
-                import traceback
-                traceback.print_exc()
-        
-        # Start background thread for reminder
-        thread = threading.Thread(target=trigger_reminder, daemon=True)
-        thread.start()
+        job_id = arm_reminder(reminder_data)
         
         print(f"🚀 Background reminder scheduled for {delay_seconds} seconds ({reminder_time})")
         print(f"🕐 Current time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -487,7 +529,7 @@ $notification.Dispose()
             "reminder_text": content,
             "reminder_time": reminder_time,
             "will_popup": True,
-            "debug_info": f"Thread started, will trigger at {(datetime.now() + timedelta(seconds=delay_seconds)).strftime('%Y-%m-%d %H:%M:%S')}"
+            "debug_info": f"Reminder {reminder_data['id']} scheduled as job {job_id}, will trigger at {(datetime.now() + timedelta(seconds=delay_seconds)).strftime('%Y-%m-%d %H:%M:%S')}"
         }
     else:
         return {
@@ -500,11 +542,12 @@ $notification.Dispose()
 reminder = Tool(
     name="reminder",
     description="Set reminders with pop-up notifications (e.g., 'Remind me to call mom in 30 minutes', 'remind me to workout at 6pm').",
-    func=enhanced_reminder_tool
+    func=enhanced_reminder_tool,
+    user_scoped=True
 )
 
 # --- Tool: Enhanced Goal Breakdown ---
-def enhanced_goal_breakdown_tool(command: str) -> str:
+async def enhanced_goal_breakdown_tool(command: str) -> str:
     """Break down goals into detailed, technical, actionable tasks using Sarvam LLM intelligence"""
     
     # Clean the command to extract the actual goal
@@ -515,7 +558,7 @@ def enhanced_goal_breakdown_tool(command: str) -> str:
         goal = re.sub(r"goal:?\s*", "", goal, flags=re.IGNORECASE).strip()
     
     if not goal.strip():
-        return "Please provide a goal to break down. Example: 'Break down: Learn LLM training and fine-tuning'"
+        return GOAL_MISSING_REPLY
     
     # Create a concise but comprehensive prompt for Sarvam LLM
     breakdown_prompt = f"""Break down this goal into exactly 3 actionable steps: "{goal}"
@@ -552,75 +595,29 @@ Goal: {goal}"""
     
     try:
         # Use Sarvam LLM for intelligent goal breakdown
-        result_queue = queue.Queue()
-        
-        def run_sarvam_llm():
-            try:
-                # Create a new event loop for this thread
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                async def call_sarvam():
-                    messages = [
-                        {"role": "system", "content": "You are an expert learning and project advisor who breaks down goals into detailed, actionable steps."},
-                        {"role": "user", "content": breakdown_prompt}
-                    ]
-                    
-                    try:
-                        response = await sarvam_client.chat(
-                            messages=messages,
-                            model="sarvam-m",
-                            temperature=0.3,
-                            max_tokens=2000  # Increased for complete 3-step response
-                        )
-                        
-                        # Check if response has the expected structure
-                        if 'choices' in response and len(response['choices']) > 0:
-                            if 'message' in response['choices'][0] and 'content' in response['choices'][0]['message']:
-                                return response['choices'][0]['message']['content']
-                            else:
-                                print(f"Unexpected Sarvam response structure: {response}")
-                                return None
-                        else:
-                            print(f"No choices in Sarvam response: {response}")
-                            return None
-                            
-                    except Exception as api_error:
-                        print(f"Sarvam API call failed: {api_error}")
-                        return None
-                
-                # Run the Sarvam LLM call
-                result = loop.run_until_complete(call_sarvam())
-                if result:
-                    result_queue.put(("success", result))
-                else:
-                    result_queue.put(("error", "Sarvam API returned empty or invalid response"))
-                
-                loop.close()
-            except Exception as e:
-                print(f"Thread execution error: {e}")
-                result_queue.put(("error", str(e)))
+        messages = [
+            {"role": "system", "content": "You are an expert learning and project advisor who breaks down goals into detailed, actionable steps."},
+            {"role": "user", "content": breakdown_prompt}
+        ]
+        response = await sarvam_client.chat(
+            messages=messages,
+            model="sarvam-m",
+            temperature=0.3,
+            max_tokens=2000,  # Increased for complete 3-step response
+            timeout=GOAL_BREAKDOWN_TIMEOUT,
+            deadline=GOAL_BREAKDOWN_TIMEOUT
+        )
         
-        # Run in a separate thread to avoid event loop conflicts
-        thread = threading.Thread(target=run_sarvam_llm)
-        thread.start()
-        thread.join(timeout=30)  # 30 second timeout
+        # Check if response has the expected structure
+        choices = response.get('choices') or []
+        result = choices[0].get('message', {}).get('content') if choices else None
+        if not result:
+            print(f"Unexpected Sarvam response structure: {response}")
+            raise Exception("Sarvam API returned empty or invalid response")
         
-        if not result_queue.empty():
-            status, result = result_queue.get()
-            if status == "success":
-                print(f"✅ Sarvam LLM success! Result length: {len(result)} chars")
-                print(f"📋 Result preview: {result[:300]}...")
-                
-                # Return clean Sarvam LLM response without extra formatting
-                print(f"� Returning clean Sarvam response length: {len(result)} chars")
-                return result
-            else:
-                print(f"❌ Sarvam LLM error: {result}")
-                raise Exception(f"Sarvam LLM error: {result}")
-        else:
-            print("⏰ Sarvam LLM call timed out")
-            raise Exception("Sarvam LLM call timed out")
+        print(f"✅ Sarvam LLM success! Result length: {len(result)} chars")
+        print(f"📋 Result preview: {result[:300]}...")
+        return result
         
     except Exception as e:
         print(f"Error generating Sarvam LLM breakdown: {e}")
@@ -705,56 +702,13 @@ goal_breakdown = Tool(
 )
 
 # --- Tool: Enhanced Habit Logging with Analytics ---
-def habit_log_tool(command: str) -> str:
+def habit_log_tool(command: str, user_id: str = DEFAULT_USER_ID) -> str:
     """Advanced habit tracker with streaks, analytics, and insights"""
-    import json
-    import os
-    
-    # File path for persistent storage
-    HABITS_FILE = "data/habits.json"
-    
-    # Ensure data directory exists
-    os.makedirs("data", exist_ok=True)
-    
-    # Load habits from file if not already loaded
-    if not hasattr(habit_log_tool, "habits"):
-        try:
-            if os.path.exists(HABITS_FILE):
-                with open(HABITS_FILE, 'r') as f:
-                    data = json.load(f)
-                    # Convert sets back from lists
-                    for habit_name, habit_data in data.items():
-                        if 'dates' in habit_data and isinstance(habit_data['dates'], list):
-                            habit_data['dates'] = set(habit_data['dates'])
-                    habit_log_tool.habits = data
-            else:
-                habit_log_tool.habits = {}
-        except Exception as e:
-            print(f"Error loading habits: {e}")
-            habit_log_tool.habits = {}
-    
-    def save_habits():
-        """Save habits to JSON file"""
-        try:
-            # Convert sets to lists for JSON serialization
-            data_to_save = {}
-            for habit_name, habit_data in habit_log_tool.habits.items():
-                data_copy = habit_data.copy()
-                if 'dates' in data_copy and isinstance(data_copy['dates'], set):
-                    data_copy['dates'] = list(data_copy['dates'])
-                data_to_save[habit_name] = data_copy
-            
-            with open(HABITS_FILE, 'w') as f:
-                json.dump(data_to_save, f, indent=2)
-        except Exception as e:
-            print(f"Error saving habits: {e}")
-    
-    
     lower = command.lower().strip()
     today = date.today().isoformat()
     
     # Log a habit
-    if any(phrase in lower for phrase in ["log habit", "habit:", "track", "did"]):
+    if phrase_matcher.scan(lower).has("habit_log"):
         # Extract habit name
         habit_patterns = [
             r"log habit:?\s*(.+)",
@@ -774,87 +728,41 @@ def habit_log_tool(command: str) -> str:
         if not habit:
             habit = command.strip().lower()
         
-        # Initialize habit if new
-        if habit not in habit_log_tool.habits:
-            habit_log_tool.habits[habit] = {
-                "dates": set(), 
-                "streak": 0, 
-                "last_date": None,
-                "best_streak": 0,
-                "total_days": 0
-            }
-            save_habits()  # Save new habit
-        
-        h = habit_log_tool.habits[habit]
+        h, logged, new_record = habit_store.log(habit, today, user_id=user_id)
         
         # Check if already logged today
-        if h["last_date"] == today:
-            return f"✅ Habit '{habit}' already logged today!\n🔥 Current streak: {h['streak']} days\n🏆 Best streak: {h['best_streak']} days"
-        
-        # Update streak logic
-        if h["last_date"]:
-            last_date = date.fromisoformat(h["last_date"])
-            days_diff = (date.fromisoformat(today) - last_date).days
-            
-            if days_diff == 1:
-                # Consecutive day
-                h["streak"] += 1
-            else:
-                # Streak broken
-                h["streak"] = 1
-        else:
-            # First time logging
-            h["streak"] = 1
-        
-        # Update records
-        h["dates"].add(today)
-        h["last_date"] = today
-        h["total_days"] = len(h["dates"])
-        
-        # Update best streak
-        if h["streak"] > h["best_streak"]:
-            h["best_streak"] = h["streak"]
-            streak_msg = f"🎉 NEW RECORD! "
-        else:
-            streak_msg = ""
+        if not logged:
+            return f"✅ Habit '{habit}' already logged today!\n🔥 Current streak: {h.streak} days\n🏆 Best streak: {h.best_streak} days"
         
-        # Calculate completion rate (last 30 days)
-        thirty_days_ago = date.today() - timedelta(days=30)
-        recent_completions = sum(1 for date_str in h["dates"] 
-                               if date.fromisoformat(date_str) >= thirty_days_ago)
-        completion_rate = (recent_completions / 30) * 100
+        streak_msg = f"🎉 NEW RECORD! " if new_record else ""
         
-        # Save habits to file
-        save_habits()
+        # Completion rate (last 30 days) from the incremental counter
+        completion_rate = (h.completions_since(30) / 30) * 100
         
         return f"""✅ {streak_msg}Habit '{habit}' logged for today!
-🔥 Current streak: {h['streak']} days
-🏆 Best streak: {h['best_streak']} days
-📊 Total completed: {h['total_days']} days
+🔥 Current streak: {h.streak} days
+🏆 Best streak: {h.best_streak} days
+📊 Total completed: {h.total_days} days
 📈 30-day rate: {completion_rate:.1f}%"""
     
     # Show habit stats
     elif "stats" in lower or "analytics" in lower or "progress" in lower:
-        if not habit_log_tool.habits:
-            return "📊 No habits tracked yet. Start with 'Log habit: exercise'"
+        habits = habit_store.all(user_id)
+        if not habits:
+            return NO_HABIT_STATS_REPLY
         
         stats = []
-        for habit_name, data in habit_log_tool.habits.items():
-            # Calculate 7-day and 30-day completion rates
-            seven_days_ago = date.today() - timedelta(days=7)
-            thirty_days_ago = date.today() - timedelta(days=30)
-            
-            week_completions = sum(1 for date_str in data["dates"] 
-                                 if date.fromisoformat(date_str) >= seven_days_ago)
-            month_completions = sum(1 for date_str in data["dates"] 
-                                  if date.fromisoformat(date_str) >= thirty_days_ago)
+        for habit_name, data in habits:
+            # 7-day and 30-day completion counts
+            week_completions = data.completions_since(7)
+            month_completions = data.completions_since(30)
             
             week_rate = (week_completions / 7) * 100
             month_rate = (month_completions / 30) * 100
             
             stats.append(f"""📈 {habit_name.title()}:
-   🔥 Current: {data['streak']} days
-   🏆 Best: {data['best_streak']} days
+   🔥 Current: {data.streak} days
+   🏆 Best: {data.best_streak} days
    📅 7-day: {week_rate:.0f}% ({week_completions}/7)
    📊 30-day: {month_rate:.0f}% ({month_completions}/30)""")
         
@@ -862,13 +770,14 @@ def habit_log_tool(command: str) -> str:
     
     # List all habits
     elif "list" in lower and "habit" in lower:
-        if not habit_log_tool.habits:
-            return "📋 No habits tracked yet. Start with 'Log habit: [habit name]'"
+        habits = habit_store.all(user_id)
+        if not habits:
+            return NO_HABITS_REPLY
         
         habit_list = []
-        for habit_name, data in habit_log_tool.habits.items():
-            status = "✅ Done today" if data["last_date"] == today else "⏸️ Pending"
-            habit_list.append(f"• {habit_name.title()} - {status} (Streak: {data['streak']})")
+        for habit_name, data in habits:
+            status = "✅ Done today" if data.last_date == today else "⏸️ Pending"
+            habit_list.append(f"• {habit_name.title()} - {status} (Streak: {data.streak})")
         
         return f"📋 Your Habits ({len(habit_list)}):\n" + "\n".join(habit_list)
     
@@ -877,14 +786,12 @@ def habit_log_tool(command: str) -> str:
         habit_match = re.search(r"reset habit:?\s*(.+)", command, re.IGNORECASE)
         if habit_match:
             habit_name = habit_match.group(1).strip().lower()
-            if habit_name in habit_log_tool.habits:
-                del habit_log_tool.habits[habit_name]
-                save_habits()  # Save after deletion
+            if habit_store.reset(habit_name, user_id):
                 return f"🗑️ Reset habit: {habit_name.title()}"
             else:
                 return f"❌ Habit '{habit_name}' not found"
         else:
-            return "Specify habit to reset: 'Reset habit: exercise'"
+            return RESET_HABIT_HELP_REPLY
     
     # Default fallback
     else:
@@ -899,18 +806,42 @@ Try: 'Log habit: {command.strip()}' to track it!"""
 habit_log = Tool(
     name="habit_log",
     description="Advanced habit tracker with streaks and analytics (e.g., 'Log habit: exercise', 'List habits', 'Habit stats', 'Reset habit: meditation').",
-    func=habit_log_tool
+    func=habit_log_tool,
+    user_scoped=True
 )
 
+def notify_timer_done(duration_text: str):
+    try:
+        import plyer
+        plyer.notification.notify(
+            title="⏰ Timer Complete!",
+            message=f"{duration_text} timer finished",
+            timeout=10
+        )
+    except ImportError:
+        print(f"🔔 TIMER COMPLETE: {duration_text} timer finished!")
+
+
+def notify_focus_done():
+    try:
+        import plyer
+        plyer.notification.notify(
+            title="🎯 Focus Session Complete!",
+            message="Great work! Time for a 10-minute break.",
+            timeout=10
+        )
+    except ImportError:
+        print("🎯 FOCUS SESSION COMPLETE! Time for a break.")
+
+
 # --- Tool: Enhanced Quick Productivity Tasks ---
-def quick_task_tool(command: str) -> str:
+def quick_task_tool(command: str, user_id: str = DEFAULT_USER_ID) -> str:
     """Enhanced productivity tasks with timers, task management, and focus sessions"""
     lower = command.lower().strip()
     
     # Timer functionality
     if "timer" in lower or "start a" in lower:
         # Extract duration
-        import re
         duration_patterns = [
             r"(\d+)\s*(?:minute|min)s?",
             r"(\d+)\s*(?:hour|hr)s?",
@@ -944,102 +875,62 @@ def quick_task_tool(command: str) -> str:
                 duration_seconds = 5 * 60  # Default 5 minutes
                 duration_text = "5 minutes"
         
-        # Start timer in background
-        def timer_task():
-            import time
-            time.sleep(duration_seconds)
-            try:
-                import plyer
-                plyer.notification.notify(
-                    title="⏰ Timer Complete!",
-                    message=f"{duration_text} timer finished",
-                    timeout=10
-                )
-            except ImportError:
-                print(f"🔔 TIMER COMPLETE: {duration_text} timer finished!")
-        
-        import threading
-        timer_thread = threading.Thread(target=timer_task, daemon=True)
-        timer_thread.start()
+        # Notify when the timer is due
+        scheduler.schedule(partial(notify_timer_done, duration_text), delay_seconds=duration_seconds,
+                           kind="timer", description=f"{duration_text} timer")
         
         return f"⏰ Started {duration_text} timer. You'll get a notification when it's done!"
     
     # Task list management
     elif "list" in lower and "task" in lower:
-        if not hasattr(quick_task_tool, "tasks"):
-            quick_task_tool.tasks = []
-        
-        if quick_task_tool.tasks:
-            task_list = "\n".join([f"{i+1}. {task}" for i, task in enumerate(quick_task_tool.tasks)])
+        tasks = task_store.list(user_id)
+        if tasks:
+            task_list = "\n".join([f"{i+1}. {task}" for i, task in enumerate(tasks)])
             return f"📋 Your tasks:\n{task_list}"
         else:
-            return "📋 No tasks in your list. Add some with 'add task: [description]'"
+            return NO_TASKS_REPLY
     
     # Add task
     elif "add task" in lower or "new task" in lower:
-        if not hasattr(quick_task_tool, "tasks"):
-            quick_task_tool.tasks = []
-        
         # Extract task description
         task_match = re.search(r"(?:add task|new task):?\s*(.+)", command, re.IGNORECASE)
         if task_match:
             task_desc = task_match.group(1).strip()
-            quick_task_tool.tasks.append(task_desc)
-            return f"✅ Added task: {task_desc} (Total: {len(quick_task_tool.tasks)})"
+            total = task_store.add(task_desc, user_id)
+            return f"✅ Added task: {task_desc} (Total: {total})"
         else:
-            return "Please specify the task. Example: 'Add task: Review project proposal'"
+            return ADD_TASK_HELP_REPLY
     
     # Complete task
     elif "complete task" in lower or "done task" in lower or "finish task" in lower:
-        if not hasattr(quick_task_tool, "tasks") or not quick_task_tool.tasks:
-            return "📋 No tasks to complete!"
+        if not task_store.count(user_id):
+            return NO_TASKS_TO_COMPLETE_REPLY
         
-        # Try to extract task number
+        # Try to extract task number, otherwise complete the first task
         num_match = re.search(r"(?:task\s*)?(\d+)", lower)
-        if num_match:
-            task_num = int(num_match.group(1)) - 1
-            if 0 <= task_num < len(quick_task_tool.tasks):
-                completed_task = quick_task_tool.tasks.pop(task_num)
-                return f"✅ Completed: {completed_task}\nRemaining tasks: {len(quick_task_tool.tasks)}"
-            else:
-                return f"❌ Task number {task_num + 1} not found. You have {len(quick_task_tool.tasks)} tasks."
-        else:
-            # Complete the first task
-            completed_task = quick_task_tool.tasks.pop(0)
-            return f"✅ Completed: {completed_task}\nRemaining tasks: {len(quick_task_tool.tasks)}"
+        task_num = int(num_match.group(1)) if num_match else 1
+        completed_task = task_store.complete(task_num, user_id)
+        if completed_task is None:
+            return f"❌ Task number {task_num} not found. You have {task_store.count(user_id)} tasks."
+        return f"✅ Completed: {completed_task}\nRemaining tasks: {task_store.count(user_id)}"
     
     # Focus session
     elif "focus" in lower or "deep work" in lower:
         # Start a focus session with break reminders
         duration = 50  # Default 50 minutes
         
-        def focus_session():
-            import time
-            time.sleep(duration * 60)
-            try:
-                import plyer
-                plyer.notification.notify(
-                    title="🎯 Focus Session Complete!",
-                    message="Great work! Time for a 10-minute break.",
-                    timeout=10
-                )
-            except ImportError:
-                print("🎯 FOCUS SESSION COMPLETE! Time for a break.")
-        
-        import threading
-        focus_thread = threading.Thread(target=focus_session, daemon=True)
-        focus_thread.start()
+        scheduler.schedule(notify_focus_done, delay_seconds=duration * 60,
+                           kind="focus", description=f"{duration}-minute deep work session")
         
         return f"🎯 Started {duration}-minute deep work session. Stay focused! Break notification coming up."
     
     # Clear all tasks
     elif "clear tasks" in lower or "reset tasks" in lower:
-        if hasattr(quick_task_tool, "tasks"):
-            count = len(quick_task_tool.tasks)
-            quick_task_tool.tasks = []
+        count = task_store.clear(user_id)
+        if count:
             return f"🗑️ Cleared {count} tasks from your list"
         else:
-            return "📋 Task list is already empty"
+            return TASKS_ALREADY_EMPTY_REPLY
     
     # Default: generic task execution
     else:
@@ -1048,101 +939,128 @@ def quick_task_tool(command: str) -> str:
 quick_task = Tool(
     name="quick_task",
     description="Enhanced productivity: timers, task management, focus sessions (e.g., 'Start 25 minute timer', 'Add task: Review email', 'List tasks', 'Start focus session').",
-    func=quick_task_tool
+    func=quick_task_tool,
+    user_scoped=True
 )
 
-# --- Command-based tool routing ---
-async def get_response(command):
+# --- Tool: List Reminders ---
+LIST_REMINDER_COMMANDS = frozenset(["get reminders", "show reminders", "list reminders"])
+
+def list_reminders_tool(command: str, user_id: str = DEFAULT_USER_ID) -> str:
+    """List reminders that haven't fired yet"""
+    active_reminders = reminder_store.list(user_id, status="pending")
+    if not active_reminders and not reminder_store.count(user_id):
+        return NO_REMINDERS_REPLY
+    if not active_reminders:
+        return NO_ACTIVE_REMINDERS_REPLY
+    reminder_list = "\n".join([f"- {r['content']}" + (f" ({r['time']})" if r['time'] else "") for r in active_reminders])
+    return f"Active reminders:\n{reminder_list}"
+
+list_reminders = Tool(
+    name="list_reminders",
+    description="Show active reminders (e.g., 'show reminders', 'list reminders').",
+    func=list_reminders_tool,
+    user_scoped=True
+)
+
+# --- Command routing table ---
+# Matchers take the lower-cased command and its phrase_matcher scan.
+def _is_browser_command(lower: str, matches) -> bool:
+    # Enhanced detection for voice commands that start with "chrome"/"google" or contain search terms
+    return (matches.has("browser_commands") or
+            (lower.startswith("chrome") and ("search" in lower or "for" in lower)) or
+            (lower.startswith("google") and ("search" in lower or "for" in lower)) or
+            ("google" in lower and "search" in lower))
+
+def _is_list_reminders_command(lower: str, matches) -> bool:
+    return lower in LIST_REMINDER_COMMANDS
+
+def _is_reminder_command(lower: str, matches) -> bool:
+    return lower.startswith("remind me") or lower.startswith("set a reminder") or "reminder" in lower
+
+def _is_goal_command(lower: str, matches) -> bool:
+    return "break down" in lower or "goal" in lower
+
+def _is_habit_command(lower: str, matches) -> bool:
+    return lower.startswith("habit:") or "habit" in lower or "track" in lower
+
+def _is_task_command(lower: str, matches) -> bool:
+    return (lower.startswith("start a") or lower.startswith("list my tasks") or lower.startswith("quick task") or
+            "timer" in lower or "task" in lower or "focus" in lower)
+
+
+class Route:
+    """One row of the routing table: when `matcher` accepts a command it goes to `tool`"""
+    def __init__(self, command_type: str, tool: Tool, matcher):
+        self.command_type = command_type
+        self.tool = tool
+        self.matcher = matcher
+
+
+# First match wins. Browser commands are checked first so "search" phrases
+# aren't taken by the other tools, and the exact list-reminders commands are
+# checked before the reminder tool would save them as a new reminder.
+COMMAND_ROUTES = [
+    Route("browser", browser, _is_browser_command),
+    Route("reminder", list_reminders, _is_list_reminders_command),
+    Route("reminder", reminder, _is_reminder_command),
+    Route("goals", goal_breakdown, _is_goal_command),
+    Route("habits", habit_log, _is_habit_command),
+    Route("tasks", quick_task, _is_task_command),
+]
+CHAT_COMMAND_TYPE = "chat"
+
+
+def route_command(command: str):
+    """Return the Route for a command, or None when it should go to the chat model"""
     lower = command.lower().strip()
-    command_type = None
+    matches = phrase_matcher.scan(lower)
+    for route in COMMAND_ROUTES:
+        if route.matcher(lower, matches):
+            return route
+    return None
+
+
+def is_command(text: str) -> bool:
+    """Check if the input text is a command that can be handled by our tools"""
+    return route_command(text) is not None
+
+
+# --- Command-based tool routing ---
+async def get_response(command, route=None, user_id: str = DEFAULT_USER_ID):
+    """
+    Run a command through the routing table. Callers that already routed the
+    command (for analytics) pass the Route so the table is evaluated only once.
+    user_id scopes the reminder/habit/task tools to the caller's data.
+    """
+    if route is None:
+        route = route_command(command)
+    command_type = route.command_type if route else CHAT_COMMAND_TYPE
     response = None
-    
-    # Browser/web commands - prioritize these
-    # Enhanced detection for voice commands that start with "chrome" or contain search terms
-    if (any(phrase in lower for phrase in ["open chrome", "open browser", "chrome and search", "chrome search", "youtube", "google search", "search google", "search on google", "open website", "open url", "best youtube channel", "tell me the best youtube channel"]) or
-        # Check if command starts with "chrome" (for voice commands like "chrome and search for...")
-        (lower.startswith("chrome") and ("search" in lower or "for" in lower)) or
-        # Check for "google" + "search" patterns
-        ("google" in lower and "search" in lower)):
-        command_type = "browser"
-        response = browser.func(command)
-    elif lower.startswith("remind me") or lower.startswith("set a reminder") or "reminder" in lower:
-        command_type = "reminder"
-        result = reminder.func(command)
+
+    if route:
+        result = await route.tool.run(command, user_id)
         # Convert dict result to string if needed
         if isinstance(result, dict):
             response = result.get("message", str(result))
         else:
             response = result
-    elif lower.startswith("break down") or "break down" in lower or "goal" in lower:
-        command_type = "goals"
-        response = goal_breakdown.func(command)
-    elif lower.startswith("log habit") or lower.startswith("habit:") or "habit" in lower or "track" in lower:
-        command_type = "habits"
-        response = habit_log.func(command)
-    elif lower.startswith("start a") or lower.startswith("list my tasks") or lower.startswith("quick task") or "timer" in lower or "task" in lower or "focus" in lower or "add task" in lower or "complete task" in lower:
-        command_type = "tasks"
-        response = quick_task.func(command)
-    elif lower == "get reminders" or lower == "show reminders" or lower == "list reminders":
-        command_type = "reminder"
-        reminders = getattr(enhanced_reminder_tool, "reminders", [])
-        if reminders:
-            active_reminders = [r for r in reminders if not r.get("triggered", False)]
-            if active_reminders:
-                reminder_list = "\n".join([f"- {r['content']}" + (f" ({r['time']})" if r['time'] else "") for r in active_reminders])
-                response = f"Active reminders:\n{reminder_list}"
-            else:
-                response = "No active reminders."
-        else:
-            response = "No reminders set."
-    elif "habit" in lower or "log habit" in lower or "track" in lower or "habit stats" in lower or "list habits" in lower:
-        command_type = "habits"
-        response = habit_log.func(command)
     else:
         # Use Sarvam LLM for complex queries
-        command_type = "chat"
         try:
-            # Use Sarvam LLM to handle general queries
-            result_queue = queue.Queue()
-            
-            def run_sarvam_chat():
-                try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    
-                    async def call_sarvam():
-                        messages = [
-                            {"role": "system", "content": "You are Ruhaan, a helpful AI assistant. Provide concise, helpful responses. If the user asks about specific tools or features, guide them to use the appropriate commands like 'remind me to...', 'note: ...', 'break down: ...', 'log habit: ...', or 'open chrome'."},
-                            {"role": "user", "content": command}
-                        ]
-                        
-                        response = await sarvam_client.chat(
-                            messages=messages,
-                            model="sarvam-m",
-                            temperature=0.7,
-                            max_tokens=500
-                        )
-                        
-                        return response['choices'][0]['message']['content']
-                    
-                    result = loop.run_until_complete(call_sarvam())
-                    result_queue.put(("success", result))
-                    loop.close()
-                except Exception as e:
-                    result_queue.put(("error", str(e)))
-            
-            thread = threading.Thread(target=run_sarvam_chat)
-            thread.start()
-            thread.join(timeout=15)
-            
-            if not result_queue.empty():
-                status, result = result_queue.get()
-                if status == "success":
-                    response = result
-                else:
-                    raise Exception(f"Sarvam error: {result}")
-            else:
-                raise Exception("Sarvam call timed out")
+            messages = [
+                {"role": "system", "content": "You are Ruhaan, a helpful AI assistant. Provide concise, helpful responses. If the user asks about specific tools or features, guide them to use the appropriate commands like 'remind me to...', 'note: ...', 'break down: ...', 'log habit: ...', or 'open chrome'."},
+                {"role": "user", "content": command}
+            ]
+            result = await sarvam_client.chat(
+                messages=messages,
+                model="sarvam-m",
+                temperature=0.7,
+                max_tokens=500,
+                timeout=CHAT_FALLBACK_TIMEOUT,
+                deadline=CHAT_FALLBACK_TIMEOUT
+            )
+            response = result['choices'][0]['message']['content']
                 
         except Exception as e:
             print(f"Sarvam LLM Error: {e}")
@@ -1159,7 +1077,7 @@ async def get_response(command):
 # --- FastAPI endpoints ---
 
 @router.post("/execute")
-async def execute_command(request: CommandRequest):
+async def execute_command(request: CommandRequest, user_id: str = Depends(request_user_id)):
     try:
         command = getattr(request, 'command', None)
         if not command:
@@ -1167,27 +1085,8 @@ async def execute_command(request: CommandRequest):
         
         print(f"🔍 Processing command: {command}")
         
-        # Determine command type for analytics
-        command_type = "unknown"
-        lower_command = command.lower().strip()
-        
-        if "remind" in lower_command:
-            command_type = "reminder"
-        elif "note:" in lower_command:
-            command_type = "note"
-        elif "break down:" in lower_command:
-            command_type = "goal_breakdown"
-        elif "log habit:" in lower_command:
-            command_type = "habit_log"
-        elif "open" in lower_command:
-            command_type = "browser"
-        elif "task:" in lower_command:
-            command_type = "quick_task"
-        
-        # Track command execution start
-        await track_command_analytics(command, command_type, True)
-        
-        response = await get_response(command)
+        # get_response records the command with its routed type for analytics
+        response = await get_response(command, route_command(command), user_id)
         print(f"📤 Response length: {len(str(response))} chars")
         print(f"📤 Response preview: {str(response)[:200]}...")
         
@@ -1206,7 +1105,7 @@ async def execute_command(request: CommandRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- Create list of all tools for API ---
-all_tools = [browser, reminder, goal_breakdown, habit_log, quick_task]
+all_tools = [browser, reminder, list_reminders, goal_breakdown, habit_log, quick_task]
 
 @router.get("/tools")
 async def list_tools():
@@ -1217,22 +1116,31 @@ async def list_tools():
     }
 
 @router.get("/reminders")
-async def get_reminders():
-    reminders = getattr(enhanced_reminder_tool, "reminders", [])
-    return {"reminders": reminders}
+async def get_reminders(status: str = None, after_id: int = 0, limit: int = REMINDER_PAGE_SIZE,
+                        user_id: str = Depends(request_user_id)):
+    """Page through the caller's reminders by id; pass next_after_id back as after_id for the next page"""
+    if status is not None and status not in REMINDER_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(REMINDER_STATUSES)}")
+    reminders = reminder_store.list(user_id, status=status, after_id=after_id, limit=limit)
+    next_after_id = reminders[-1]["id"] if len(reminders) == min(max(limit, 1), REMINDER_MAX_PAGE_SIZE) else None
+    return {"reminders": reminders, "next_after_id": next_after_id}
+
+@router.delete("/reminders/{reminder_id}")
+async def cancel_reminder(reminder_id: int, user_id: str = Depends(request_user_id)):
+    if not reminder_store.cancel(reminder_id, user_id):
+        if reminder_store.get(reminder_id, user_id) is None:
+            raise HTTPException(status_code=404, detail="Reminder not found")
+        raise HTTPException(status_code=409, detail="Reminder already triggered or cancelled")
+    job_id = reminder_jobs.pop(reminder_id, None)
+    if job_id is not None:
+        scheduler.cancel(job_id)
+    return {"reminder": reminder_store.get(reminder_id)}
 
 @router.post("/ruhaan")
-async def run_agent(query: Query):
+async def run_agent(query: Query, user_id: str = Depends(request_user_id)):
     try:
-        # Determine command type for analytics
-        command_type = "chat"
-        if is_command(query.prompt):
-            command_type = "command"
-        
-        # Track agent query
-        await track_command_analytics(query.prompt, command_type, True)
-        
-        reply = await get_response(query.prompt)
+        # get_response records the query with its routed type for analytics
+        reply = await get_response(query.prompt, route_command(query.prompt), user_id)
         # Ensure reply is serializable
         if isinstance(reply, str):
             return {"reply": reply}
@@ -1,4 +1,8 @@
+import asyncio
+import json
+
 import httpx
+from src.Backend import http_client, resilience
 
 class Sarvam:
     def __init__(self, api_key: str, base_url: str = "https://api.sarvam.ai/v1"):
@@ -6,53 +10,95 @@ class Sarvam:
         self.base_url = base_url
         self.headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
 
-    async def chat(self, messages, model="sarvam-m", temperature=0.3, max_tokens=2000):
+    async def chat(self, messages, model="sarvam-m", temperature=0.3, max_tokens=2000, stream=False, timeout=30.0,
+                   attempts=1, deadline=None):
+        """
+        Chat completion. With stream=True this returns an async iterator over
+        the content deltas as they arrive instead of the full response dict.
+        Calls go through the shared circuit breaker; `attempts` and `deadline`
+        (total seconds) control retries, see src/Backend/resilience.py.
+        """
         url = f"{self.base_url}/chat/completions"
         payload = {
             "model": model,
             "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens
+            "temperature": temperature
         }
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        if stream:
+            payload["stream"] = True
+            return resilience.stream_with_retries(
+                lambda: self._chat_stream(url, payload, timeout),
+                attempts=attempts, first_chunk_timeout=timeout, deadline=deadline
+            )
+        
+        async def attempt(attempt_timeout):
+            response = await http_client.post(url, headers=self.headers, json=payload, timeout=attempt_timeout)
+            
+            print(f"Sarvam response status: {response.status_code}")
+            print(f"Sarvam response headers: {dict(response.headers)}")
+            
+            if response.status_code != 200:
+                print(f"Sarvam API error: {response.status_code} - {response.text}")
+            resilience.raise_for_upstream_status(response)
+            return response.json()
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                print(f"Calling Sarvam API: {url}")
-                print(f"Payload: {payload}")
-                
-                response = await client.post(url, headers=self.headers, json=payload)
-                
-                print(f"Sarvam response status: {response.status_code}")
-                print(f"Sarvam response headers: {dict(response.headers)}")
+            print(f"Calling Sarvam API: {url}")
+            print(f"Payload: {payload}")
+            
+            result = await resilience.call_with_retries(attempt, attempts=attempts, attempt_timeout=timeout, deadline=deadline)
+            print(f"Sarvam response: {result}")
+            return result
                 
-                if response.status_code != 200:
-                    error_text = await response.atext() if hasattr(response, 'atext') else response.text
-                    print(f"Sarvam API error: {response.status_code} - {error_text}")
-                    raise Exception(f"Sarvam API returned {response.status_code}: {error_text}")
-                
-                result = response.json()
-                print(f"Sarvam response: {result}")
-                return result
-                
-        except httpx.TimeoutException:
+        except resilience.CircuitOpenError:
+            raise
+        except (httpx.TimeoutException, asyncio.TimeoutError):
             raise Exception("Sarvam API request timed out")
         except httpx.RequestError as e:
             raise Exception(f"Sarvam API request failed: {str(e)}")
         except Exception as e:
             raise Exception(f"Sarvam API error: {str(e)}")
 
+    async def _chat_stream(self, url, payload, timeout):
+        """
+        Yield content deltas from an OpenAI-style server-sent event stream.
+        Errors are left unwrapped so resilience.stream_with_retries can tell
+        which ones are worth retrying.
+        """
+        print(f"Calling Sarvam API (stream): {url}")
+        async with http_client.stream("POST", url, headers=self.headers, json=payload, timeout=timeout) as response:
+            if response.status_code != 200:
+                await response.aread()
+                print(f"Sarvam API error: {response.status_code} - {response.text}")
+                resilience.raise_for_upstream_status(response)
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    print(f"Skipping malformed stream chunk: {data[:100]}")
+                    continue
+                choices = chunk.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
     async def tts(self, text, voice="default"):
         url = f"{self.base_url}/speech/tts"
         payload = {"text": text, "voice": voice}
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            return response.json()
+        response = await http_client.post(url, headers=self.headers, json=payload)
+        response.raise_for_status()
+        return response.json()
 
     async def stt(self, audio_url):
         url = f"{self.base_url}/speech/transcribe"
         payload = {"audio_url": audio_url}
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            return response.json()
+        response = await http_client.post(url, headers=self.headers, json=payload)
+        response.raise_for_status()
+        return response.json()
@@ -0,0 +1,205 @@
+"""Single heap-based scheduler for reminders, timers and focus sessions.
+
+Replaces the one-sleeping-thread-per-reminder approach. Due times live in a
+min-heap drained by one asyncio task, which sleeps until the earliest due
+time (or until something earlier is scheduled), so pending jobs cost a heap
+entry each instead of an OS thread.
+
+``schedule`` / ``cancel`` / ``reschedule`` are thread-safe because sync tools
+call them from the tool executor. Cancelled and rescheduled entries are
+dropped lazily when they reach the top of the heap. Sync callbacks run on the
+default executor (notifications may block), and coroutine callbacks run as
+tasks on the loop.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class ScheduledJob:
+    __slots__ = ("id", "due", "callback", "kind", "description", "version", "cancelled")
+
+    def __init__(self, job_id: int, due: float, callback: Callable, kind: str, description: str):
+        self.id = job_id
+        self.due = due
+        self.callback = callback
+        self.kind = kind
+        self.description = description
+        self.version = 0
+        self.cancelled = False
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "description": self.description,
+            "due": self.due,
+            "due_in_seconds": max(0, round(self.due - time.time(), 1))
+        }
+
+
+def _report_failure(job: ScheduledJob, future):
+    if not future.cancelled() and future.exception():
+        print(f"❌ Scheduled {job.kind} {job.id} failed: {future.exception()}")
+
+
+class Scheduler:
+    def __init__(self):
+        self._heap = []                 # (due, seq, job_id, version)
+        self._jobs: Dict[int, ScheduledJob] = {}
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.fired = 0
+        self.cancelled = 0
+
+    # --- lifecycle (FastAPI startup/shutdown hooks) ---
+
+    async def start(self):
+        if self._task and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        print(f"⏰ Scheduler started with {len(self._jobs)} pending jobs")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._loop = None
+
+    def _notify(self):
+        """Wake the scheduler task so it re-reads the earliest due time"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._wakeup.set()
+        else:
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    # --- public API ---
+
+    def schedule(self, callback: Callable, delay_seconds: float = None, at: float = None,
+                 kind: str = "job", description: str = "", job_id: int = None) -> int:
+        """Run callback after delay_seconds (or at a unix timestamp). Returns the job id."""
+        due = at if at is not None else time.time() + (delay_seconds or 0)
+        with self._lock:
+            if job_id is None:
+                job_id = next(self._ids)
+            job = ScheduledJob(job_id, due, callback, kind, description)
+            self._jobs[job_id] = job
+            heapq.heappush(self._heap, (due, next(self._seq), job_id, job.version))
+        self._notify()
+        return job_id
+
+    def cancel(self, job_id: int) -> bool:
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None:
+                return False
+            job.cancelled = True
+            self.cancelled += 1
+        self._notify()
+        return True
+
+    def reschedule(self, job_id: int, delay_seconds: float = None, at: float = None) -> bool:
+        due = at if at is not None else time.time() + (delay_seconds or 0)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return False
+            job.due = due
+            job.version += 1
+            heapq.heappush(self._heap, (due, next(self._seq), job_id, job.version))
+        self._notify()
+        return True
+
+    def pending(self, kind: str = None) -> List[dict]:
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if kind is None or j.kind == kind]
+        return [j.to_dict() for j in sorted(jobs, key=lambda j: j.due)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_kind = {}
+            for job in self._jobs.values():
+                by_kind[job.kind] = by_kind.get(job.kind, 0) + 1
+            return {
+                "running": bool(self._task and not self._task.done()),
+                "pending": len(self._jobs),
+                "pending_by_kind": by_kind,
+                "heap_entries": len(self._heap),
+                "fired": self.fired,
+                "cancelled": self.cancelled
+            }
+
+    # --- scheduler task ---
+
+    def _pop_due(self, now: float) -> List[ScheduledJob]:
+        due_jobs = []
+        with self._lock:
+            while self._heap:
+                due, _, job_id, version = self._heap[0]
+                job = self._jobs.get(job_id)
+                if job is None or job.version != version:
+                    heapq.heappop(self._heap)   # cancelled or rescheduled entry
+                    continue
+                if due > now:
+                    break
+                heapq.heappop(self._heap)
+                del self._jobs[job_id]
+                due_jobs.append(job)
+        return due_jobs
+
+    def _next_delay(self) -> Optional[float]:
+        with self._lock:
+            while self._heap:
+                due, _, job_id, version = self._heap[0]
+                job = self._jobs.get(job_id)
+                if job is None or job.version != version:
+                    heapq.heappop(self._heap)
+                    continue
+                return max(0.0, due - time.time())
+        return None
+
+    def _fire(self, job: ScheduledJob):
+        self.fired += 1
+        try:
+            if asyncio.iscoroutinefunction(job.callback):
+                asyncio.create_task(job.callback())
+            else:
+                future = self._loop.run_in_executor(None, job.callback)
+                future.add_done_callback(lambda f: _report_failure(job, f))
+        except Exception as e:
+            print(f"❌ Error firing scheduled {job.kind} {job.id}: {e}")
+
+    async def _run(self):
+        while True:
+            for job in self._pop_due(time.time()):
+                self._fire(job)
+            self._wakeup.clear()
+            delay = self._next_delay()
+            try:
+                # Sleep until the earliest job is due, or until schedule/cancel wakes us
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+scheduler = Scheduler()
@@ -0,0 +1,214 @@
+"""Incremental parser for the four-perspective structured response.
+
+The structured reply is one JSON object whose top-level values are the
+``psychological``, ``philosophical``, ``autobiographical`` and ``logical``
+sections. ``StructuredStreamParser`` consumes the model output chunk by chunk
+and returns each top-level value the moment its closing brace arrives, so a
+streaming client can render section 1 while section 4 is still being
+generated.
+
+Truncated output (e.g. the model hitting ``max_tokens``) is recovered
+deterministically by ``finish()``: an unterminated string value is closed
+where it stopped, otherwise the text is cut back to the last point where a
+value was complete, and the open objects/arrays are closed. This replaces the
+old brace-appending guesses in ``robust_json_parse``.
+"""
+import json
+from typing import Any, List, Optional, Tuple
+
+STRUCTURED_SECTIONS = ("psychological", "philosophical", "autobiographical", "logical")
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class StructuredStreamParser:
+    """Scans a JSON object as it streams in and reports completed top-level values"""
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._start = None          # index of the top-level '{'
+        self._done = False
+        # One entry per open container: [bracket, expecting_key]
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+        self._in_literal = False
+        self._key = None
+        self._value_start = None
+        # Last index (exclusive) where the text could be cut and closed into valid JSON
+        self._safe_end = None
+        self._safe_closers = ""
+        self.sections = {}
+
+    def _closers(self) -> str:
+        return "".join(_CLOSERS[entry[0]] for entry in reversed(self._stack))
+
+    def _mark_safe(self, end: int):
+        self._safe_end = end
+        self._safe_closers = self._closers()
+
+    def _value_done(self, end: int) -> Optional[Tuple[str, Any]]:
+        """A value ending at `end` (exclusive) completed; returns a top-level (key, value) if one closed"""
+        self._mark_safe(end)
+        if len(self._stack) != 1 or self._key is None or self._value_start is None:
+            return None
+        try:
+            value = json.loads(self._text[self._value_start:end])
+        except json.JSONDecodeError:
+            value = None
+        key, self._key, self._value_start = self._key, None, None
+        if value is None:
+            return None
+        self.sections[key] = value
+        return key, value
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Add more model output; returns the top-level (key, value) pairs completed by it"""
+        if self._done or not chunk:
+            return []
+        self._text += chunk
+        text = self._text
+        completed = []
+
+        i = self._pos
+        while i < len(text) and not self._done:
+            ch = text[i]
+
+            if self._start is None:
+                # Skip anything before the object (```json fences, stray prose)
+                if ch == "{":
+                    self._start = i
+                    self._stack.append(["{", True])
+                    self._mark_safe(i + 1)
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._string_is_key:
+                        if len(self._stack) == 1:
+                            try:
+                                self._key = json.loads(text[self._string_start:i + 1])
+                            except json.JSONDecodeError:
+                                self._key = None
+                    else:
+                        result = self._value_done(i + 1)
+                        if result:
+                            completed.append(result)
+                i += 1
+                continue
+
+            if self._in_literal and (ch in ",}]" or ch.isspace()):
+                self._in_literal = False
+                result = self._value_done(i)
+                if result:
+                    completed.append(result)
+
+            top = self._stack[-1]
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                self._string_is_key = top[0] == "{" and top[1]
+                if not self._string_is_key and len(self._stack) == 1:
+                    self._value_start = i
+            elif ch in "{[":
+                if len(self._stack) == 1:
+                    self._value_start = i
+                self._stack.append([ch, ch == "{"])
+                self._mark_safe(i + 1)
+            elif ch in "}]":
+                self._stack.pop()
+                if not self._stack:
+                    self._done = True
+                    self._mark_safe(i + 1)
+                else:
+                    result = self._value_done(i + 1)
+                    if result:
+                        completed.append(result)
+            elif ch == ":":
+                top[1] = False
+            elif ch == ",":
+                if top[0] == "{":
+                    top[1] = True
+            elif not ch.isspace() and not self._in_literal:
+                # Start of a number / true / false / null
+                self._in_literal = True
+                if len(self._stack) == 1:
+                    self._value_start = i
+            i += 1
+
+        self._pos = i
+        return completed
+
+    @property
+    def complete(self) -> bool:
+        return self._done
+
+    def finish(self) -> Optional[dict]:
+        """The whole object, closing it deterministically if the output was truncated"""
+        if self._start is None:
+            return None
+        text = self._text
+        if self._done:
+            candidates = [text[self._start:self._safe_end]]
+        else:
+            candidates = []
+            # Keep a partially written string value, closed where it stopped
+            if self._in_string and not self._string_is_key and not self._escape:
+                candidates.append(text[self._start:] + '"' + self._closers())
+            if self._in_literal:
+                candidates.append(text[self._start:] + self._closers())
+            candidates.append(text[self._start:self._safe_end] + self._safe_closers)
+
+        for candidate in candidates:
+            try:
+                result = json.loads(_strip_trailing_separators(candidate))
+            except json.JSONDecodeError:
+                continue
+            if isinstance(result, dict):
+                return result
+        return None
+
+
+def _strip_trailing_separators(text: str) -> str:
+    """Remove a ',' or dangling '"key":' left right before the closing brackets"""
+    body = text.rstrip("}]")
+    closers = text[len(body):]
+    stripped = body.rstrip()
+    if stripped.endswith(","):
+        stripped = stripped[:-1]
+    elif stripped.endswith(":"):
+        # Drop the key that never got a value
+        head = stripped[:-1].rstrip()
+        if head.endswith('"'):
+            quote = head.rfind('"', 0, len(head) - 1)
+            while quote > 0 and head[quote - 1] == "\\":
+                quote = head.rfind('"', 0, quote - 1)
+            stripped = head[:quote].rstrip().rstrip(",")
+    return stripped + closers
+
+
+def parse_structured(text: str) -> Optional[dict]:
+    """Parse a complete (or truncated) structured reply in one go"""
+    if not text:
+        return None
+    stripped = text.strip()
+    # Some replies come back JSON-encoded as a single string
+    if stripped.startswith('"') and stripped.endswith('"'):
+        try:
+            inner = json.loads(stripped)
+            if isinstance(inner, str):
+                text = inner
+        except json.JSONDecodeError:
+            pass
+    parser = StructuredStreamParser()
+    parser.feed(text)
+    return parser.finish()
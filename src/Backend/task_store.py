@@ -0,0 +1,96 @@
+"""Per-user task list for quick_task_tool.
+
+Tasks used to be a list on the ``quick_task_tool.tasks`` function attribute,
+shared by every user and lost on restart. They are now rows in the shared
+user-data SQLite database, numbered per user in the order they were added
+("complete task 2" means the user's second open task).
+"""
+import os
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+from src.Backend.user_data import USER_DATA_DB, DEFAULT_USER_ID, connect
+
+TASK_DB = os.getenv("TASK_DB", USER_DATA_DB)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    description TEXT NOT NULL,
+    created TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_user ON tasks (user_id, id);
+"""
+
+
+class TaskStore:
+    """SQLite-backed task lists, safe to use from the loop and executor threads"""
+
+    def __init__(self, db_path: str = TASK_DB):
+        self.db_path = db_path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._db is None:
+            db = connect(self.db_path)
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def add(self, description: str, user_id: str = DEFAULT_USER_ID) -> int:
+        """Add a task; returns how many open tasks the user now has"""
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT INTO tasks (user_id, description, created) VALUES (?, ?, ?)",
+                (user_id, description, datetime.now().isoformat())
+            )
+            return db.execute("SELECT COUNT(*) FROM tasks WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def list(self, user_id: str = DEFAULT_USER_ID) -> List[str]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT description FROM tasks WHERE user_id = ? ORDER BY id", (user_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, user_id: str = DEFAULT_USER_ID) -> int:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM tasks WHERE user_id = ?", (user_id,)
+            ).fetchone()[0]
+
+    def complete(self, number: int = 1, user_id: str = DEFAULT_USER_ID) -> Optional[str]:
+        """Remove the user's task at 1-based position `number`; None if there is no such task"""
+        if number < 1:
+            return None
+        with self._lock:
+            # One statement, so two workers can't complete the same task
+            row = self._connect().execute(
+                "DELETE FROM tasks WHERE id = ("
+                "SELECT id FROM tasks WHERE user_id = ? ORDER BY id LIMIT 1 OFFSET ?"
+                ") RETURNING description",
+                (user_id, number - 1)
+            ).fetchone()
+        return row[0] if row else None
+
+    def clear(self, user_id: str = DEFAULT_USER_ID) -> int:
+        with self._lock:
+            return self._connect().execute("DELETE FROM tasks WHERE user_id = ?", (user_id,)).rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            row = self._connect().execute("SELECT COUNT(*), COUNT(DISTINCT user_id) FROM tasks").fetchone()
+        return {"db": self.db_path, "tasks": row[0], "users": row[1]}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+task_store = TaskStore()
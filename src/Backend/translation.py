@@ -0,0 +1,333 @@
+"""Async translation service for Sarvam translate.
+
+Replaces the old blocking ``httpx.post`` call so Hindi replies no longer freeze
+the event loop. Several strings can be translated concurrently, and short
+strings are packed into a single upstream request where possible.
+Results are cached per (text, target language) in an in-memory LRU backed by
+an optional SQLite tier that survives restarts.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+from src.Backend import http_client, resilience
+
+load_dotenv()
+SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")
+SARVAM_TRANSLATE_URL = "https://api.sarvam.ai/v1/translate"
+TRANSLATE_TIMEOUT = float(os.getenv("TRANSLATE_TIMEOUT", "10"))
+# Total seconds a translation may take (attempts and backoff included); the
+# reply falls back to English after that
+TRANSLATE_DEADLINE = float(os.getenv("TRANSLATE_DEADLINE", "4"))
+TRANSLATE_ATTEMPTS = int(os.getenv("TRANSLATE_ATTEMPTS", "2"))
+
+# Sarvam translate takes one text per request, so batching packs several
+# strings into one text joined by a paragraph break and splits the result.
+# If the translation doesn't come back with the same number of parts we
+# fall back to translating each string on its own.
+TRANSLATE_BATCHING = os.getenv("TRANSLATE_BATCHING", "true").lower() in ("1", "true", "yes")
+TRANSLATE_BATCH_MAX_CHARS = int(os.getenv("TRANSLATE_BATCH_MAX_CHARS", "1000"))
+BATCH_SEPARATOR = "\n\n"
+
+# Translation cache - set TRANSLATION_CACHE_DB to "" to keep it memory-only
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "2048"))
+TRANSLATION_CACHE_DB = os.getenv("TRANSLATION_CACHE_DB", "data/translation_cache.db")
+TARGET_LANGUAGE = "hi-IN"
+
+
+class TranslationCache:
+    """LRU cache of translations keyed by (text, target language) with an optional on-disk tier"""
+
+    def __init__(self, max_size: int = TRANSLATION_CACHE_SIZE, db_path: Optional[str] = TRANSLATION_CACHE_DB):
+        self.max_size = max_size
+        self.db_path = db_path or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        if self._db is None and self.db_path:
+            try:
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS translations ("
+                    "text TEXT NOT NULL, language TEXT NOT NULL, translated TEXT NOT NULL, "
+                    "PRIMARY KEY (text, language))"
+                )
+                self._db.commit()
+            except Exception as e:
+                print(f"Translation cache disk tier disabled: {e}")
+                self.db_path = None
+                self._db = None
+        return self._db
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _memory_get(self, texts: List[str], language: str) -> List[Optional[str]]:
+        found = []
+        with self._lock:
+            for text in texts:
+                key = (text, language)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    found.append(self._entries[key])
+                else:
+                    found.append(None)
+        return found
+
+    def _disk_get(self, texts: List[str], language: str) -> List[Optional[str]]:
+        """Look up memory misses in the disk tier (blocking; counts the final misses)"""
+        found = [None] * len(texts)
+        with self._lock:
+            db = self._connect()
+            if db is not None:
+                try:
+                    for i, text in enumerate(texts):
+                        row = db.execute(
+                            "SELECT translated FROM translations WHERE text = ? AND language = ?", (text, language)
+                        ).fetchone()
+                        if row:
+                            self.disk_hits += 1
+                            self._remember((text, language), row[0])
+                            found[i] = row[0]
+                except Exception as e:
+                    print(f"Translation cache read error: {e}")
+            self.misses += sum(value is None for value in found)
+        return found
+
+    def _disk_put(self, pairs: List[tuple], language: str):
+        """Write translations to the disk tier in one transaction (blocking)"""
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return
+            try:
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO translations (text, language, translated) VALUES (?, ?, ?)",
+                        [(text, language, translated) for text, translated in pairs]
+                    )
+            except Exception as e:
+                print(f"Translation cache write error: {e}")
+
+    def _lookup(self, texts: List[str], language: str) -> List[Optional[str]]:
+        found = self._memory_get(texts, language)
+        missing = [i for i, value in enumerate(found) if value is None]
+        for i, value in zip(missing, self._disk_get([texts[i] for i in missing], language)):
+            found[i] = value
+        return found
+
+    def _store(self, pairs: List[tuple], language: str):
+        with self._lock:
+            for text, translated in pairs:
+                self._remember((text, language), translated)
+        self._disk_put(pairs, language)
+
+    def get(self, text: str, language: str = TARGET_LANGUAGE) -> Optional[str]:
+        return self._lookup([text], language)[0]
+
+    def put(self, text: str, translated: str, language: str = TARGET_LANGUAGE):
+        self._store([(text, translated)], language)
+
+    async def get_many(self, texts: List[str], language: str = TARGET_LANGUAGE) -> List[Optional[str]]:
+        """Cached translations (None where missing); only the disk tier runs off the event loop"""
+        found = self._memory_get(texts, language)
+        missing = [i for i, value in enumerate(found) if value is None]
+        if missing:
+            if self.db_path:
+                from_disk = await asyncio.to_thread(self._disk_get, [texts[i] for i in missing], language)
+            else:
+                from_disk = self._disk_get([texts[i] for i in missing], language)
+            for i, value in zip(missing, from_disk):
+                found[i] = value
+        return found
+
+    async def put_many(self, pairs: List[tuple], language: str = TARGET_LANGUAGE):
+        """Remember (text, translated) pairs; the disk tier gets one transaction off the event loop"""
+        if not pairs:
+            return
+        with self._lock:
+            for text, translated in pairs:
+                self._remember((text, language), translated)
+        if self.db_path:
+            await asyncio.to_thread(self._disk_put, pairs, language)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "disk_tier": self.db_path,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate_percentage": round(((self.hits + self.disk_hits) / lookups) * 100, 1) if lookups else 0
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+translation_cache = TranslationCache()
+
+
+def needs_translation(language_code) -> bool:
+    """Only Hindi is translated - English and Hinglish are returned as-is"""
+    return bool(language_code) and language_code.startswith('hi')
+
+
+async def _request_translation(text: str, target_language_code: str = "hi-IN") -> Optional[str]:
+    """
+    One upstream translation through the shared circuit breaker, retry budget
+    and TRANSLATE_DEADLINE. Returns None on any failure, and right away while
+    the circuit is open.
+    """
+    async def attempt(attempt_timeout):
+        resp = await http_client.post(
+            SARVAM_TRANSLATE_URL,
+            headers={"Authorization": f"Bearer {SARVAM_API_KEY}", "Content-Type": "application/json"},
+            json={
+                "text": text,
+                "target_language_code": target_language_code
+            },
+            timeout=attempt_timeout,
+        )
+        resilience.raise_for_upstream_status(resp)
+        return resp.json().get("translated_text", text)
+
+    try:
+        translated = await resilience.call_with_retries(
+            attempt, attempts=TRANSLATE_ATTEMPTS, attempt_timeout=TRANSLATE_TIMEOUT, deadline=TRANSLATE_DEADLINE
+        )
+    except resilience.CircuitOpenError:
+        print("Hindi translation skipped: circuit is open")
+        return None
+    except Exception as e:
+        print(f"Hindi translation error: {type(e).__name__}: {e}")
+        return None
+    print(f"Translated to Hindi: '{text}' → '{translated}'")
+    return translated
+
+
+async def _translate_remote(text: str, target_language_code: str = "hi-IN") -> str:
+    """Single upstream translate call. Returns the original text on any failure."""
+    translated = await _request_translation(text, target_language_code)
+    return text if translated is None else translated
+
+
+async def translate(text: str, language_code) -> str:
+    """
+    Translate text to the appropriate language for English and Hindi.
+    Hinglish is treated as English.
+    """
+    if not text or not needs_translation(language_code):
+        return text
+    return (await translate_many([text], language_code))[0]
+
+
+def _pack_batches(texts: List[str]) -> List[List[int]]:
+    """Group indexes of texts into batches that fit in one upstream request"""
+    batches = []
+    current, current_len = [], 0
+    for i, text in enumerate(texts):
+        # Multi-paragraph strings can't be split back reliably, send them alone
+        if BATCH_SEPARATOR in text or len(text) > TRANSLATE_BATCH_MAX_CHARS:
+            batches.append([i])
+            continue
+        added = len(text) + (len(BATCH_SEPARATOR) if current else 0)
+        if current and current_len + added > TRANSLATE_BATCH_MAX_CHARS:
+            batches.append(current)
+            current, current_len = [], 0
+            added = len(text)
+        current.append(i)
+        current_len += added
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _translate_batch(texts: List[str]) -> List[str]:
+    if len(texts) == 1:
+        return [await _translate_remote(texts[0])]
+    joined = BATCH_SEPARATOR.join(texts)
+    translated = await _request_translation(joined)
+    if translated is None:
+        # Upstream error, deadline passed or circuit open: one call per string
+        # would only multiply the failed requests
+        return list(texts)
+    parts = [p.strip() for p in translated.split(BATCH_SEPARATOR)]
+    if len(parts) == len(texts):
+        return parts
+    print(f"⚠️ Batched translation returned {len(parts)} parts for {len(texts)} strings, translating individually")
+    return list(await asyncio.gather(*(_translate_remote(t) for t in texts)))
+
+
+async def translate_many(texts: List[str], language_code) -> List[str]:
+    """
+    Translate several strings at once. Cached strings are answered locally,
+    the rest are batched and run concurrently, so a structured reply costs at
+    most one round trip instead of three sequential ones.
+    """
+    texts = list(texts)
+    if not needs_translation(language_code):
+        return texts
+
+    translated = list(texts)
+    wanted = [i for i, text in enumerate(texts) if text]
+    pending = []
+    for i, cached in zip(wanted, await translation_cache.get_many([texts[i] for i in wanted])):
+        if cached is not None:
+            translated[i] = cached
+        else:
+            pending.append(i)
+    if not pending:
+        return translated
+
+    if TRANSLATE_BATCHING:
+        groups = [[pending[i] for i in batch] for batch in _pack_batches([texts[i] for i in pending])]
+    else:
+        groups = [[i] for i in pending]
+
+    results = await asyncio.gather(*(_translate_batch([texts[i] for i in group]) for group in groups))
+
+    new_entries = {}
+    for group, group_result in zip(groups, results):
+        for i, value in zip(group, group_result):
+            translated[i] = value
+            # Failed calls return the source text - don't cache those
+            if value and value != texts[i]:
+                new_entries[texts[i]] = value
+    await translation_cache.put_many(list(new_entries.items()))
+    return translated
+
+
+async def warm_cache(texts: Iterable[str], language_code: str = TARGET_LANGUAGE):
+    """Pre-translate static response strings so the first Hindi user doesn't pay for them"""
+    if not SARVAM_API_KEY:
+        print("⚠️ SARVAM_API_KEY not set, skipping translation cache warm-up")
+        return translation_cache.stats()
+    unique = list(dict.fromkeys(t for t in texts if t))
+    try:
+        await translate_many(unique, language_code)
+    except Exception as e:
+        print(f"Translation cache warm-up error: {e}")
+    stats = translation_cache.stats()
+    print(f"🔥 Translation cache warmed with {len(unique)} static strings: {stats}")
+    return stats
@@ -0,0 +1,51 @@
+"""Shared SQLite database for per-user data (reminders, tasks, habits).
+
+Reminders, tasks and habits used to be process-global, so every user of a
+deployment shared one list and uvicorn workers each had their own copy. The
+stores now keep their rows in one SQLite file (``USER_DATA_DB``) in WAL
+mode, keyed and indexed by ``user_id``, so any worker can serve any user
+and readers never block the writer.
+
+The user id comes from the ``X-User-Id`` request header (the frontend keeps
+a random id in localStorage). Requests without one use ``DEFAULT_USER_ID``,
+which is also who data from the old single-user files is imported for.
+"""
+import os
+import sqlite3
+from typing import Optional
+
+from fastapi import Header
+
+USER_DATA_DB = os.getenv("USER_DATA_DB", "data/user_data.db")
+USER_DATA_BUSY_TIMEOUT_MS = int(os.getenv("USER_DATA_BUSY_TIMEOUT_MS", "5000"))
+DEFAULT_USER_ID = "default"
+USER_ID_MAX_LENGTH = 128
+
+
+def connect(db_path: str = USER_DATA_DB) -> sqlite3.Connection:
+    """Open a connection shared by the loop and executor threads (callers hold a lock)"""
+    if db_path != ":memory:":
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    # Autocommit mode; writes that must be atomic use explicit BEGIN IMMEDIATE
+    db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute(f"PRAGMA busy_timeout={USER_DATA_BUSY_TIMEOUT_MS}")
+    db.execute("CREATE TABLE IF NOT EXISTS user_data_migrations (name TEXT PRIMARY KEY)")
+    return db
+
+
+def claim_migration(db: sqlite3.Connection, name: str) -> bool:
+    """True the first time `name` is claimed in this database, across all workers"""
+    cursor = db.execute("INSERT OR IGNORE INTO user_data_migrations (name) VALUES (?)", (name,))
+    return cursor.rowcount > 0
+
+
+def normalize_user_id(user_id: Optional[str]) -> str:
+    user_id = (user_id or "").strip()[:USER_ID_MAX_LENGTH]
+    return user_id or DEFAULT_USER_ID
+
+
+def request_user_id(x_user_id: Optional[str] = Header(None)) -> str:
+    """FastAPI dependency: the caller's user id from the X-User-Id header"""
+    return normalize_user_id(x_user_id)
@@ -16,8 +16,9 @@ const AnalyticsDashboard = ({ onBack, onLogout }) => {
       setLoading(true);
       
       const [metricsResponse, summaryResponse] = await Promise.all([
-        fetch('https://ruhaan-336f0cf6b1b5.herokuapp.com/api/analytics/metrics'),
-        fetch('https://ruhaan-336f0cf6b1b5.herokuapp.com/api/analytics/summary')
+        // Revalidate with the ETag; the backend answers 304 until new events arrive
+        fetch('https://ruhaan-336f0cf6b1b5.herokuapp.com/api/analytics/metrics', { cache: 'no-cache' }),
+        fetch('https://ruhaan-336f0cf6b1b5.herokuapp.com/api/analytics/summary', { cache: 'no-cache' })
       ]);
 
       if (metricsResponse.ok && summaryResponse.ok) {
@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import './GoalBreakdown.css';
+import { getUserId } from './api';
 
 const GoalBreakdown = ({ onBack, analytics }) => {
   const [goal, setGoal] = useState('');
@@ -22,6 +23,7 @@ const GoalBreakdown = ({ onBack, analytics }) => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-User-Id': getUserId(),
         },
         body: JSON.stringify({
           command: `break down: ${goal}`
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import './HabitLogger.css';
+import { getUserId } from './api';
 
 const HabitLogger = ({ onBack, analytics }) => {
   const [habits, setHabits] = useState([]);
@@ -21,6 +22,7 @@ const HabitLogger = ({ onBack, analytics }) => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-User-Id': getUserId(),
         },
         body: JSON.stringify({
           command: `log habit: ${newHabit}`
@@ -69,6 +71,7 @@ const HabitLogger = ({ onBack, analytics }) => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-User-Id': getUserId(),
         },
         body: JSON.stringify({
           command: `log habit: ${habitName}`
@@ -102,6 +105,7 @@ const HabitLogger = ({ onBack, analytics }) => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-User-Id': getUserId(),
         },
         body: JSON.stringify({
           command: 'list habits'
@@ -1,6 +1,7 @@
 import { useState, useRef, useEffect } from "react";
 import axios from "axios";
 import { playTTS } from "./playTTS";
+import { getUserId } from "./api";
 
 // --- Change this URL to your deployed Railway backend URL ---
 const API_BASE_URL = "https://ruhaan-336f0cf6b1b5.herokuapp.com/"; // Fixed URL to match backend
@@ -36,13 +37,15 @@ const MicRecorder = ({ setMessages, isRecording, setIsRecording, analytics }) =>
           const audioBlob = new Blob(audioChunks.current, { type: 'audio/webm' });
           const formData = new FormData();
           formData.append('file', audioBlob, 'audio.webm');
+          const session_id = sessionStorage.getItem("ruhaan_session_id");
+          if (session_id) formData.append('session_id', session_id);
 
           // Send to WhisperAPI for transcription
           const response = await axios.post(
             `${API_BASE_URL}/api/speech/transcribe/`,
             formData,
             {
-              headers: { "Content-Type": "multipart/form-data" },
+              headers: { "Content-Type": "multipart/form-data", "X-User-Id": getUserId() },
             }
           );
 
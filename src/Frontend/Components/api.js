@@ -2,14 +2,26 @@ import axios from "axios";
 
 const API_BASE_URL = "https://ruhaan-336f0cf6b1b5.herokuapp.com"; // Production Heroku URL 
 
+// Stable per-browser id. The backend keeps reminders, habits and tasks per X-User-Id.
+export const getUserId = () => {
+  let userId = localStorage.getItem("ruhaan_user_id");
+  if (!userId) {
+    userId = crypto.randomUUID ? crypto.randomUUID() : `user_${Date.now()}_${Math.random().toString(36).slice(2)}`;
+    localStorage.setItem("ruhaan_user_id", userId);
+  }
+  return userId;
+};
+
 //Speech-to-Text 
 export const transcribeAudio = async (audioFile) => {
   const formData = new FormData();
   formData.append("file", audioFile);
+  const session_id = sessionStorage.getItem("ruhaan_session_id");
+  if (session_id) formData.append("session_id", session_id);
 
   try {
     const response = await axios.post(`${API_BASE_URL}/api/speech/transcribe/`, formData, {
-      headers: { "Content-Type": "multipart/form-data" },
+      headers: { "Content-Type": "multipart/form-data", "X-User-Id": getUserId() },
     });
     if (response.data.status === "success") {
       return response.data.data;
@@ -25,9 +37,12 @@ export const transcribeAudio = async (audioFile) => {
 export const processTextQuery = async (message, language_code) => {
   try {
     const payload = language_code ? { message, language_code } : { message };
+    // Same id the analytics tracker uses, so the backend can keep per-session chat memory
+    const session_id = sessionStorage.getItem("ruhaan_session_id");
+    if (session_id) payload.session_id = session_id;
     const response = await axios.post(`${API_BASE_URL}/api/chat`, 
       payload,  
-      { headers: { "Content-Type": "application/json" } }
+      { headers: { "Content-Type": "application/json", "X-User-Id": getUserId() } }
     );
     return response.data;
   } catch (error) {
@@ -36,6 +51,46 @@ export const processTextQuery = async (message, language_code) => {
   }
 };
 
+// Streaming variant of processTextQuery (Server-Sent Events from /api/chat/stream).
+// onDelta receives each chunk of chat reply text as it arrives, onSection each
+// structured perspective ({ name, content }) as soon as it is complete; resolves
+// with the same { status, data } shape processTextQuery returns.
+export const processTextQueryStream = async (message, language_code, onDelta, onSection) => {
+  const payload = language_code ? { message, language_code } : { message };
+  const session_id = sessionStorage.getItem("ruhaan_session_id");
+  if (session_id) payload.session_id = session_id;
+
+  const response = await fetch(`${API_BASE_URL}/api/chat/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", "Accept": "text/event-stream", "X-User-Id": getUserId() },
+    body: JSON.stringify(payload),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Failed to process message: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = (raw.match(/^event: (.*)$/m) || [])[1];
+      const data = JSON.parse((raw.match(/^data: (.*)$/m) || [])[1] || "null");
+      if (event === "delta" && onDelta) onDelta(data.text);
+      if (event === "section" && onSection) onSection(data);
+      if (event === "final") return { status: "success", data };
+      if (event === "error") throw new Error(`Failed to process message: ${data.detail}`);
+    }
+  }
+  throw new Error("Failed to process message: stream ended early");
+};
+
 //  Convert Text to Speech 
 export const textToSpeech = async (text) => {
   try {
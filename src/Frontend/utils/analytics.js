@@ -1,4 +1,9 @@
 // Enhanced Analytics utility for tracking Ruhaan metrics
+
+// Events are buffered and sent to /api/analytics/track/batch together
+const ANALYTICS_BATCH_SIZE = 20;
+const ANALYTICS_FLUSH_INTERVAL_MS = 5000;
+
 class RuhaanAnalytics {
   constructor() {
     this.userId = this.getUserId();
@@ -6,6 +11,15 @@ class RuhaanAnalytics {
     this.messageCount = 0;
     this.voiceUsageCount = 0;
     this.featuresUsed = new Set();
+    this.pendingEvents = [];
+    this.flushTimer = null;
+
+    // Send whatever is buffered before the page goes away
+    const flushOnHide = () => {
+      if (document.visibilityState === 'hidden') this.flushEvents({ unloading: true });
+    };
+    document.addEventListener('visibilitychange', flushOnHide);
+    window.addEventListener('pagehide', () => this.flushEvents({ unloading: true }));
   }
 
   // Session tracking
@@ -396,23 +410,53 @@ class RuhaanAnalytics {
   }
 
   logEvent(eventName, data) {
-    // Send to your backend analytics endpoint
-    fetch('/api/analytics/track', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
-        event: eventName,
-        data: data,
-        timestamp: Date.now(),
-        session_id: this.getSessionId()
-      })
-    }).catch(err => console.log('Analytics error:', err));
+    // Buffer for the backend analytics endpoint
+    this.pendingEvents.push({
+      event: eventName,
+      data: data,
+      timestamp: Date.now(),
+      session_id: this.getSessionId()
+    });
+    if (this.pendingEvents.length >= ANALYTICS_BATCH_SIZE) {
+      this.flushEvents();
+    } else if (!this.flushTimer) {
+      this.flushTimer = setTimeout(() => this.flushEvents(), ANALYTICS_FLUSH_INTERVAL_MS);
+    }
 
     // Store locally for offline analysis
     this.storeEventLocally(eventName, data);
   }
+
+  async flushEvents({ unloading = false } = {}) {
+    clearTimeout(this.flushTimer);
+    this.flushTimer = null;
+    if (this.pendingEvents.length === 0) return;
+
+    const events = this.pendingEvents;
+    this.pendingEvents = [];
+    const json = JSON.stringify(events);
+    const headers = { 'Content-Type': 'application/json' };
+    let body = json;
+
+    // Compress when the browser can; skip it while unloading, the page may be gone before it finishes
+    if (!unloading && typeof CompressionStream !== 'undefined') {
+      try {
+        const stream = new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'));
+        body = await new Response(stream).blob();
+        headers['Content-Encoding'] = 'gzip';
+      } catch (err) {
+        body = json;
+      }
+    }
+
+    // keepalive lets the request outlive the page
+    fetch('/api/analytics/track/batch', {
+      method: 'POST',
+      headers,
+      body,
+      keepalive: true
+    }).catch(err => console.log('Analytics error:', err));
+  }
   // Get DAU/MAU metrics (for backend analytics dashboard)
   static getActivityMetrics() {
     const events = JSON.parse(localStorage.getItem('ruhaan_analytics_events') || '[]');
@@ -0,0 +1,36 @@
+from src.Backend.analytics_cache import AnalyticsResponseCache
+
+
+def _workers(tmp_path, count=2):
+    log_path = tmp_path / "analytics.jsonl"
+    log_path.write_text('{"event": "session_start"}\n')
+    return [AnalyticsResponseCache(str(log_path), generation_path=str(tmp_path / "generation"))
+            for _ in range(count)]
+
+
+def test_workers_hand_out_the_same_etags(tmp_path):
+    first, second = _workers(tmp_path)
+    assert first.etag("/metrics?") == second.etag("/metrics?")
+    assert first.etag("/metrics?") != first.etag("/summary?")
+
+
+def test_clear_in_one_worker_invalidates_every_worker(tmp_path):
+    first, second = _workers(tmp_path)
+    before = second.etag("/metrics?")
+    second.put("/metrics?", before, {"total": 1})
+    assert second.get("/metrics?", second.etag("/metrics?")) == {"total": 1}
+
+    first.clear()
+    after = second.etag("/metrics?")
+    assert after != before
+    assert second.get("/metrics?", after) is None
+    assert first.etag("/metrics?") == after
+
+
+def test_generation_keeps_counting_across_workers(tmp_path):
+    first, second = _workers(tmp_path)
+    first.clear()
+    second.clear()
+    first.clear()
+    assert first.generation == 3
+    assert first.etag("/metrics?") == second.etag("/metrics?")
@@ -0,0 +1,165 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.Backend import analytics_log, analytics_maintenance
+from src.Backend.analytics_log import iter_log_events, list_segments
+from src.Backend.analytics_maintenance import ANALYTICS_RETENTION_DAYS, AnalyticsMaintenance
+from src.Backend.analytics_partitions import AnalyticsPartitions
+from src.Backend.analytics_rollups import AnalyticsRollups
+from src.Backend.analytics_writer import AnalyticsWriter
+
+SETTLE_SECONDS = 5
+NAMES = ("session_start", "message_sent", "feature_used", "command_executed", "session_end")
+
+
+class Log:
+    """Events with a sequence number, written the way AnalyticsWriter writes them"""
+
+    def __init__(self, path, now):
+        self.writer = AnalyticsWriter(path)
+        self.now = now
+        self.written = 0
+
+    def events(self, n):
+        batch = []
+        for _ in range(n):
+            i = self.written
+            timestamp = int((self.now - timedelta(days=3 + i % 3)).timestamp() * 1000)
+            batch.append({
+                "event": NAMES[i % len(NAMES)],
+                "session_id": f"s{i % 7}",
+                "data": {"seq": i, "user_id": f"u{i % 5}", "feature": "timer"},
+                "client_timestamp": timestamp,
+                "server_timestamp": timestamp
+            })
+            self.written += 1
+        return batch
+
+    def write(self, n):
+        self.writer._write(self.events(n))
+
+    def write_to(self, f, n):
+        # A batch that opened the log before it was renamed
+        f.write("".join(json.dumps(event) + "\n" for event in self.events(n)))
+        f.flush()
+
+
+def _settle(segment):
+    past = time.time() - SETTLE_SECONDS - 1
+    os.utime(segment.path, (past, past))
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(analytics_log, "ANALYTICS_SEGMENT_SETTLE_SECONDS", SETTLE_SECONDS)
+    monkeypatch.setattr(analytics_maintenance, "ANALYTICS_SEGMENT_SETTLE_SECONDS", SETTLE_SECONDS)
+    # finish_rotation is called by hand below
+    monkeypatch.setattr(analytics_maintenance.scheduler, "schedule", lambda *args, **kwargs: 0)
+    log_path = str(tmp_path / "analytics.jsonl")
+    archive = str(tmp_path / "archive")
+    rollups = AnalyticsRollups(str(tmp_path / "rollups.db"), log_path, archive)
+    partitions = AnalyticsPartitions(str(tmp_path / "partitions"), log_path, archive)
+    maintenance = AnalyticsMaintenance(str(tmp_path / "maintenance.db"), log_path, archive, rollups, partitions)
+    yield log_path, archive, rollups, partitions, maintenance
+    maintenance.close()
+    rollups.close()
+    partitions.close()
+
+
+def _partition_seqs(partitions):
+    seqs = []
+    for day in sorted(partitions.closed_days()):
+        seqs.extend(event["data"]["seq"] for event in partitions.iter_day(day))
+    return sorted(seqs)
+
+
+def test_rotation_mid_segment_reads_each_line_once(setup):
+    log_path, archive, rollups, partitions, maintenance = setup
+    now = datetime.now().replace(microsecond=0)
+    log = Log(log_path, now)
+
+    log.write(100)
+    late = open(log_path, "a")
+    first = maintenance.rotate(now - timedelta(minutes=2), force=True)
+    assert first
+    first_inode = list_segments(archive)[0].inode
+    assert rollups.position() == partitions.position() == (first_inode, os.path.getsize(first))
+
+    # Lines land in the rotated segment after the readers caught up: they are now partway through it
+    log.write_to(late, 20)
+    late.close()
+    assert rollups.position()[1] < os.path.getsize(first)
+    log.write(50)
+
+    # Second rotation while the readers are still inside the first segment
+    second = maintenance.rotate(now - timedelta(minutes=1), force=True)
+    assert second
+    segments = list_segments(archive)
+    assert [segment.path for segment in segments] == [first, second]
+    assert rollups.position() == partitions.position() == (first_inode, os.path.getsize(first))
+    # Nothing a reader still needs is compressed or deleted
+    assert maintenance.compress() == 0
+    # Open day partitions have no summary yet, so they aren't expired either
+    assert maintenance.expire(now + timedelta(days=ANALYTICS_RETENTION_DAYS + 10)) == {
+        "deleted_segments": 0, "expired_days": 0
+    }
+    assert not any(segment.compressed for segment in list_segments(archive))
+
+    log.write(30)
+    _settle(segments[0])
+    maintenance.finish_rotation()
+    # On to the second segment, which hasn't settled yet
+    assert rollups.position()[0] == partitions.position()[0] == segments[1].inode
+    _settle(segments[1])
+    maintenance.finish_rotation()
+    assert rollups.position()[0] == partitions.position()[0] == os.stat(log_path).st_ino
+
+    total = log.written
+    assert rollups.stats()["events"] == total
+    assert partitions.stats()["events"] == total
+    assert sorted(event["data"]["seq"] for event in iter_log_events(log_path, archive)) == list(range(total))
+
+    assert maintenance.compress() == 2
+    assert all(segment.compressed for segment in list_segments(archive))
+    assert sorted(event["data"]["seq"] for event in iter_log_events(log_path, archive)) == list(range(total))
+    assert rollups.rebuild() == total
+    assert rollups.stats()["events"] == total
+
+    partitions.run()
+    assert _partition_seqs(partitions) == list(range(total))
+    assert maintenance.summarize() == 3
+
+    later = now + timedelta(days=ANALYTICS_RETENTION_DAYS + 10)
+    assert maintenance.expire(later) == {"deleted_segments": 2, "expired_days": 3}
+    assert list_segments(archive) == []
+    assert partitions.closed_days() == {}
+    # Rollups are aggregates and the daily summaries outlive the raw events
+    assert rollups.stats()["events"] == total
+    history = maintenance.history(days=ANALYTICS_RETENTION_DAYS + 20, now=later)
+    assert sum(summary["total_events"] for summary in history.values()) == total
+
+
+def test_reader_behind_across_rotation_catches_up_once(setup):
+    log_path, archive, rollups, partitions, maintenance = setup
+    now = datetime.now().replace(microsecond=0)
+    log = Log(log_path, now)
+
+    log.write(40)
+    rollups.catch_up()
+    log.write(40)
+    # The partitions reader hasn't run at all; rotation catches both readers up first
+    maintenance.rotate(now, force=True)
+    log.write(40)
+    assert rollups.stats()["events"] == partitions.stats()["events"] == 80
+
+    _settle(list_segments(archive)[0])
+    maintenance.finish_rotation()
+    assert rollups.stats()["events"] == partitions.stats()["events"] == 120
+    # Caught up: running again reads nothing twice
+    maintenance.finish_rotation()
+    assert rollups.catch_up() == 0
+    assert rollups.stats()["events"] == partitions.stats()["events"] == 120
@@ -0,0 +1,183 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.Backend.analytics_numpy import VECTORIZED_METRICS, EventColumns, compute, daily_event_counts
+from src.Backend.analytics_partitions import event_day, write_columns
+from src.Backend.routes.analytics import (
+    calculate_command_analytics, calculate_conversation_metrics, calculate_engagement_metrics,
+    calculate_feature_usage, calculate_user_engagement
+)
+
+DAY_MS = 86_400_000
+START_MS = 1_700_000_000_000 - 1_700_000_000_000 % DAY_MS
+
+
+def _expected(events):
+    return {
+        "user_engagement": calculate_user_engagement(events),
+        "feature_usage": calculate_feature_usage(events),
+        "conversation_metrics": calculate_conversation_metrics(events),
+        "command_analytics": calculate_command_analytics(events),
+        "engagement_metrics": calculate_engagement_metrics(events)
+    }
+
+
+def _fixed_events(n, seed):
+    """
+    Messy events whose numbers are whole minutes, seconds or halves, so sums
+    are exact in any order and the two backends can be compared with ==
+    """
+    rng = random.Random(seed)
+    names = ["session_start", "session_end", "message_sent", "voice_used", "feature_used", "command_executed",
+             "time_spent_detailed", "page_visibility", "daily_active_user", "something_new"]
+    events = []
+    for _ in range(n):
+        name = rng.choice(names)
+        data = {"user_id": f"user_{rng.randrange(20)}"}
+        if name == "session_end":
+            data["engagement_score"] = rng.choice([None, rng.randrange(101), rng.randrange(200) / 2, "n/a", True])
+        elif name == "feature_used":
+            data["feature"] = rng.choice(["timer", "habits", "voice", "", None, 0])
+        elif name == "message_sent":
+            data["type"] = rng.choice(["text", "voice", "image", None])
+        elif name == "command_executed":
+            if rng.random() < 0.8:
+                data["command_type"] = rng.choice(["timer", "habit", "reminder", "unknown", None])
+            if rng.random() < 0.8:
+                data["success"] = rng.choice([True, False, None, 1, 0])
+        elif name == "time_spent_detailed":
+            if rng.random() < 0.8:
+                data["session_duration_seconds"] = rng.choice([rng.randrange(3600), rng.randrange(7200) / 2, None, "5"])
+            if rng.random() < 0.8:
+                data["interaction_time_seconds"] = rng.choice([rng.randrange(1800), None])
+        elif name == "page_visibility":
+            data["event_type"] = rng.choice(["hidden", "visible"])
+            if rng.random() < 0.8:
+                data["visible_duration_seconds"] = rng.choice([rng.randrange(600), None])
+        timestamp = START_MS + rng.randrange(30 * 24 * 60) * 60_000
+        event = {"event": name, "data": data, "client_timestamp": timestamp, "server_timestamp": timestamp}
+        if rng.random() < 0.1:
+            event["data"] = rng.choice([None, "oops", [1, 2]])
+        if rng.random() < 0.95:
+            event["session_id"] = rng.choice([f"s{rng.randrange(40)}", None, ""])
+        events.append(event)
+    return events
+
+
+def _expected_daily(events):
+    expected = {}
+    for event in events:
+        day = expected.setdefault(event_day(event), {})
+        day[event["event"]] = day.get(event["event"], 0) + 1
+    return expected
+
+
+@pytest.mark.parametrize("n, seed", [(1, 1), (50, 2), (500, 3), (5_000, 4)])
+def test_matches_calculate_functions(n, seed):
+    events = _fixed_events(n, seed)
+    columns = EventColumns.from_events(events)
+    assert compute(columns) == _expected(events)
+    assert daily_event_counts(columns) == _expected_daily(events)
+
+
+def test_partition_columns_match_event_columns(tmp_path):
+    events = _fixed_events(2_000, 5)
+    path = str(tmp_path / "partition.col")
+    write_columns(path, events)
+    columns = EventColumns.from_partition(path)
+    assert len(columns) == len(events)
+    assert compute(columns) == _expected(events)
+    assert daily_event_counts(columns) == _expected_daily(events)
+
+
+def test_no_events():
+    columns = EventColumns.from_events([])
+    assert compute(columns) == _expected([])
+    assert compute(columns)["engagement_metrics"] == {"error": "No engagement data available"}
+    assert compute(columns)["command_analytics"] == {"total_commands": 0, "command_types": {}, "success_rate": 0}
+    assert daily_event_counts(columns) == {}
+
+
+def test_missing_and_none_durations():
+    events = [
+        {"event": "time_spent_detailed", "data": {"session_duration_seconds": 600, "interaction_time_seconds": 300}},
+        {"event": "time_spent_detailed", "data": {"session_duration_seconds": None}},
+        {"event": "time_spent_detailed", "data": {}},
+        {"event": "session_end", "data": {"engagement_score": None}},
+        {"event": "session_end", "data": {}},
+        {"event": "page_visibility", "data": {"event_type": "hidden", "visible_duration_seconds": None}},
+        {"event": "page_visibility", "data": {"event_type": "hidden", "visible_duration_seconds": 7200}},
+    ]
+    result = compute(EventColumns.from_events(events))
+    assert result == _expected(events)
+    engagement = result["engagement_metrics"]
+    assert engagement["total_sessions"] == 2
+    assert engagement["avg_session_duration_minutes"] == 5.0
+    assert engagement["avg_interaction_time_minutes"] == 2.5
+    assert engagement["avg_engagement_score"] == 0
+    assert engagement["total_visible_time_hours"] == 2.0
+
+
+def test_data_that_is_not_a_dict():
+    events = [
+        {"event": "command_executed", "data": None},
+        {"event": "command_executed", "data": "timer"},
+        {"event": "feature_used", "data": ["timer"]},
+        {"event": "message_sent", "session_id": "s1"},
+        {"event": "session_end", "data": 42},
+    ]
+    result = compute(EventColumns.from_events(events))
+    assert result == _expected(events)
+    assert result["command_analytics"]["command_types"] == {"unknown": 2}
+    assert result["command_analytics"]["successful_commands"] == 2
+    assert result["feature_usage"]["total_feature_usage"] == 0
+    assert result["conversation_metrics"]["total_messages"] == 1
+
+
+def test_unknown_commands_and_events():
+    events = [
+        {"event": "command_executed", "data": {"command_type": "unknown", "success": False}},
+        {"event": "command_executed", "data": {}},
+        {"event": "command_executed", "data": {"command_type": "timer"}},
+        {"event": "command_executed", "data": {"command_type": None, "success": 0}},
+        {"event": "never_seen_before", "data": {"command_type": "timer"}},
+    ]
+    result = compute(EventColumns.from_events(events))
+    assert result == _expected(events)
+    commands = result["command_analytics"]
+    assert commands["command_types"] == {"unknown": 2, "timer": 1, None: 1}
+    assert commands["successful_commands"] == 2
+    assert commands["failed_commands"] == 2
+    assert commands["success_rate_percentage"] == 50.0
+    assert commands["command_distribution"]["unknown"] == {"count": 2, "percentage": 50.0}
+
+
+def test_session_durations():
+    minute = 60_000
+    events = [
+        {"event": "session_start", "session_id": "a", "client_timestamp": START_MS},
+        {"event": "message_sent", "session_id": "a", "data": {"type": "voice"}},
+        {"event": "voice_used", "session_id": "a"},
+        {"event": "session_end", "session_id": "a", "client_timestamp": START_MS + 10 * minute},
+        {"event": "session_start", "session_id": "b", "client_timestamp": START_MS},
+        {"event": "session_start", "session_id": "b", "client_timestamp": START_MS + 2 * minute},
+        {"event": "session_end", "session_id": "b", "client_timestamp": START_MS + 6 * minute},
+        {"event": "message_sent", "session_id": "c", "data": {"type": "text"}},
+        {"event": "message_sent", "data": {"type": "text"}},
+    ]
+    result = compute(EventColumns.from_events(events))
+    assert result == _expected(events)
+    assert result["user_engagement"] == {
+        "total_sessions": 3,
+        "avg_messages_per_session": 2 / 3,
+        "avg_voice_usage_per_session": 1 / 3,
+        "avg_session_duration_minutes": 7.0,
+        "voice_usage_percentage": 50.0
+    }
+
+
+def test_vectorized_metric_names():
+    assert tuple(compute(EventColumns.from_events([]))) == VECTORIZED_METRICS
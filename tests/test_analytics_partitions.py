@@ -0,0 +1,126 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.Backend import analytics_partitions
+from src.Backend.analytics_partitions import AnalyticsPartitions
+from src.Backend.analytics_writer import AnalyticsWriter
+
+DAY = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=3)
+
+
+class Log:
+    def __init__(self, path):
+        self.writer = AnalyticsWriter(path)
+        self.written = 0
+
+    def write(self, n):
+        timestamp = int(DAY.timestamp() * 1000)
+        batch = [{"event": "message_sent", "data": {"seq": self.written + i},
+                  "client_timestamp": timestamp, "server_timestamp": timestamp} for i in range(n)]
+        self.written += n
+        self.writer._write(batch)
+
+
+@pytest.fixture
+def setup(tmp_path):
+    log_path = str(tmp_path / "analytics.jsonl")
+    directory = str(tmp_path / "partitions")
+    instances = []
+
+    def open_partitions():
+        # A fresh instance is what a restarted worker sees
+        partitions = AnalyticsPartitions(directory, log_path, str(tmp_path / "archive"))
+        instances.append(partitions)
+        return partitions
+
+    yield Log(log_path), open_partitions
+    for partitions in instances:
+        partitions.close()
+
+
+def _seqs(partitions):
+    return sorted(event["data"]["seq"] for event in partitions.iter_day(DAY.strftime("%Y-%m-%d")))
+
+
+def _crash(exception=RuntimeError):
+    raise exception("simulated crash")
+
+
+def test_crash_before_commit_does_not_duplicate(setup, monkeypatch):
+    log, open_partitions = setup
+    partitions = open_partitions()
+    log.write(30)
+    partitions.partition()
+    assert partitions.compact() == 1
+    log.write(20)
+    partitions.partition()
+
+    write_columns = analytics_partitions.write_columns
+
+    def write_then_crash(path, events):
+        write_columns(path, events)
+        _crash()
+
+    monkeypatch.setattr(analytics_partitions, "write_columns", write_then_crash)
+    with pytest.raises(RuntimeError):
+        partitions.compact()
+    monkeypatch.setattr(analytics_partitions, "write_columns", write_columns)
+    assert _seqs(partitions) == list(range(50))
+
+    restarted = open_partitions()
+    assert _seqs(restarted) == list(range(50))
+    assert restarted.compact() == 1
+    assert _seqs(restarted) == list(range(50))
+    assert restarted.closed_days() == {DAY.strftime("%Y-%m-%d"): 50}
+
+
+def test_crash_after_commit_is_finished_by_the_next_run(setup, monkeypatch):
+    log, open_partitions = setup
+    partitions = open_partitions()
+    log.write(30)
+    partitions.partition()
+    assert partitions.compact() == 1
+    log.write(20)
+    partitions.partition()
+
+    finish_staged = AnalyticsPartitions._finish_staged
+
+    def crash_when_staged(self, db, day):
+        if db.execute("SELECT 1 FROM staged_partitions WHERE day = ?", (day,)).fetchone():
+            _crash()
+        finish_staged(self, db, day)
+
+    monkeypatch.setattr(AnalyticsPartitions, "_finish_staged", crash_when_staged)
+    with pytest.raises(RuntimeError):
+        partitions.compact()
+    monkeypatch.setattr(AnalyticsPartitions, "_finish_staged", finish_staged)
+    # Until the move finishes, the old columnar file and the open file still hold every line
+    assert _seqs(partitions) == list(range(50))
+
+    # Late lines for the day arrive before anyone finishes the staged compaction
+    log.write(10)
+    partitions.partition()
+    assert _seqs(partitions) == list(range(30)) + list(range(50, 60))
+    assert partitions.compact() == 1
+    assert _seqs(partitions) == list(range(60))
+    assert partitions.closed_days() == {DAY.strftime("%Y-%m-%d"): 60}
+    assert not [name for name in os.listdir(partitions.directory) if name.endswith((".new", ".jsonl"))]
+
+
+def test_restart_finishes_a_staged_compaction(setup, monkeypatch):
+    log, open_partitions = setup
+    partitions = open_partitions()
+    log.write(25)
+    partitions.partition()
+    monkeypatch.setattr(AnalyticsPartitions, "_finish_staged", lambda self, db, day: None)
+    assert partitions.compact() == 1
+    monkeypatch.undo()
+
+    restarted = open_partitions()
+    assert _seqs(restarted) == list(range(25))
+    restarted.partition()
+    assert _seqs(restarted) == list(range(25))
+    assert restarted.closed_days() == {DAY.strftime("%Y-%m-%d"): 25}
+    assert not [name for name in os.listdir(restarted.directory) if name.endswith((".new", ".jsonl"))]
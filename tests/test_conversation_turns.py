@@ -0,0 +1,40 @@
+import asyncio
+
+from src.Backend.conversation_memory import ConversationStore
+from src.Backend.routes import groqchat
+
+
+def test_append_exchange_records_both_turns():
+    store = ConversationStore()
+    store.append_exchange("s", "hi", "hello")
+    assert [t["role"] for t in store.window("s")] == ["user", "assistant"]
+
+
+def test_append_exchange_without_reply_records_nothing():
+    store = ConversationStore()
+    store.append_exchange("s", "hi", "")
+    store.append_exchange(None, "hi", "hello")
+    assert store.window("s") == []
+    assert store.stats()["sessions"] == 0
+
+
+def test_every_path_keeps_roles_alternating(monkeypatch):
+    store = ConversationStore()
+    monkeypatch.setattr(groqchat, "conversation_store", store)
+
+    async def failing_completion(*args, **kwargs):
+        raise RuntimeError("unavailable")
+
+    async def run(text):
+        return await groqchat.classify_intent_and_respond(text, "en-IN", "s")
+
+    monkeypatch.setattr(groqchat, "_sarvam_completion", failing_completion)
+    asyncio.run(run("hi"))                                  # canned greeting
+    asyncio.run(run("what is your name"))                   # canned name reply
+    asyncio.run(run("remind me to call mom at 5pm"))        # command
+    asyncio.run(run("I feel stuck in my relationship and I am confused about whether I should stay"))  # failed
+    asyncio.run(run("tell me about rivers in the north"))   # failed chit-chat
+
+    turns = store.window("s")
+    assert [t["role"] for t in turns] == ["user", "assistant"] * 3
+    assert turns[-1]["content"] == groqchat.COMMAND_REPLY
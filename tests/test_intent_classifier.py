@@ -0,0 +1,57 @@
+from src.Backend import intent_classifier
+from src.Backend.intent_classifier import HELD_OUT_EXAMPLES, TUNING_EXAMPLES, classify, evaluate
+
+
+def test_command_keyword_and_pattern_is_decisive():
+    result = classify("remind me to call mom at 5pm")
+    assert result.label == "command"
+    assert result.confidence == 1.0
+
+
+def test_long_advice_question_is_decisive():
+    result = classify("I am confused about whether I should switch careers or stay in my current job")
+    assert result.label == "structured"
+    assert result.confidence == 1.0
+
+
+def test_short_small_talk_is_chit_chat():
+    result = classify("hi")
+    assert result.label == "chit-chat"
+    assert 0 < result.confidence < 1
+
+
+def test_decisive_rules_ignore_threshold():
+    assert classify("remind me to call mom at 5pm", threshold=1.0).label == "command"
+
+
+def test_threshold_decides_soft_labels():
+    confidence = classify("hi").confidence
+    assert classify("hi", threshold=confidence).label == "chit-chat"
+    below = classify("hi", threshold=confidence + 0.01)
+    assert below.label is None
+    assert below.confidence == confidence
+
+
+def test_default_threshold_comes_from_settings(monkeypatch):
+    confidence = classify("hi").confidence
+    monkeypatch.setattr(intent_classifier, "INTENT_CONFIDENCE_THRESHOLD", confidence + 0.01)
+    assert classify("hi").label is None
+    monkeypatch.setattr(intent_classifier, "INTENT_CONFIDENCE_THRESHOLD", confidence)
+    assert classify("hi").label == "chit-chat"
+
+
+def test_no_signal_falls_back_to_llm():
+    result = classify("the quarterly figures arrived late because of the strike at the port")
+    assert result.label is None
+
+
+def test_held_out_set_is_separate_from_tuning_set():
+    tuning = {text.lower() for text, _ in TUNING_EXAMPLES}
+    assert not tuning & {text.lower() for text, _ in HELD_OUT_EXAMPLES}
+
+
+def test_evaluate_reports_on_held_out_examples():
+    report = evaluate(repeat=1)
+    assert report["examples"] == len(HELD_OUT_EXAMPLES)
+    assert report["decided_locally"] <= report["examples"]
+    assert len(report["mistakes"]) <= report["decided_locally"]
@@ -0,0 +1,35 @@
+import re
+
+import pytest
+
+from src.Backend.routes.groqchat import detect_explicit_language_request
+
+
+def _original(text):
+    """The detection before the patterns were precompiled"""
+    for lang, code in {'hindi': 'hi-IN', 'english': 'en-IN'}.items():
+        if re.search(rf"\\b(in|into|to|say|speak|reply|answer)\\s+(it\\s+)?(in|as)?\\s*{lang}\\b", text, re.IGNORECASE):
+            return code
+        if re.search(rf"\\b(tell|answer|say|speak).*{lang}\\b", text, re.IGNORECASE):
+            return code
+    return None
+
+
+@pytest.mark.parametrize("text", [
+    "tell me about english literature",
+    "say something about hindi cinema",
+    "please reply in hindi",
+    "answer in English",
+    "Speak Hindi",
+    r"\bsay hindi\b",
+    r"\bsay english\b and \bin hindi\b",
+    "hello",
+    "",
+])
+def test_matches_original_detection(text):
+    assert detect_explicit_language_request(text) == _original(text)
+
+
+def test_topic_mentions_do_not_force_a_language():
+    assert detect_explicit_language_request("tell me about english literature") is None
+    assert detect_explicit_language_request("say something about hindi cinema") is None
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from src.Backend.resilience import CircuitBreaker, RetryBudget, UpstreamError, call_with_retries, stream_with_retries
+
+
+def _half_open_breaker():
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=1, window_seconds=600, cooldown_seconds=60)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    # Cooldown elapsed: the next allow() admits one probe
+    breaker._opened_at -= breaker.cooldown_seconds
+    return breaker
+
+
+def _call(operation, breaker, **kwargs):
+    return asyncio.run(call_with_retries(operation, breaker=breaker, budget=RetryBudget(), **kwargs))
+
+
+def test_non_retryable_error_does_not_close_half_open_circuit():
+    breaker = _half_open_breaker()
+    calls_before = breaker.stats()["window_calls"]
+
+    async def rejected(timeout):
+        raise UpstreamError("Sarvam returned 401", retryable=False)
+
+    with pytest.raises(UpstreamError):
+        _call(rejected, breaker)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.stats()["window_calls"] == calls_before
+    # The probe slot was released, so the next call may probe
+    assert breaker.allow()
+
+
+def test_non_retryable_error_is_not_counted_as_success():
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=2, window_seconds=60, cooldown_seconds=60)
+
+    async def rejected(timeout):
+        raise UpstreamError("Sarvam returned 422", retryable=False)
+
+    with pytest.raises(UpstreamError):
+        _call(rejected, breaker)
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_expired_deadline_does_not_take_the_probe():
+    breaker = _half_open_breaker()
+
+    async def never_called(timeout):
+        raise AssertionError("called after the deadline")
+
+    with pytest.raises(asyncio.TimeoutError):
+        _call(never_called, breaker, deadline=-1)
+    assert breaker.allow()
+
+
+def test_stream_expired_deadline_does_not_take_the_probe():
+    breaker = _half_open_breaker()
+
+    async def consume():
+        async for _ in stream_with_retries(lambda: None, deadline=-1, breaker=breaker, budget=RetryBudget()):
+            pass
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(consume())
+    assert breaker.allow()
+
+
+def test_successful_probe_closes_circuit():
+    breaker = _half_open_breaker()
+
+    async def ok(timeout):
+        return "ok"
+
+    assert _call(ok, breaker) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_zero_deadline_is_already_expired():
+    breaker = CircuitBreaker("test")
+
+    async def never_called(timeout):
+        raise AssertionError("called after the deadline")
+
+    with pytest.raises(asyncio.TimeoutError):
+        _call(never_called, breaker, deadline=0)
+
+
+def test_stream_zero_deadline_is_already_expired():
+    breaker = CircuitBreaker("test")
+
+    def never_opened():
+        raise AssertionError("opened after the deadline")
+
+    async def consume():
+        async for _ in stream_with_retries(never_opened, deadline=0, breaker=breaker, budget=RetryBudget()):
+            pass
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(consume())
@@ -0,0 +1,15 @@
+import asyncio
+
+from src.Backend.routes import api_frontend
+from src.Backend.scheduler import scheduler
+
+
+def test_scheduler_stats_does_not_expose_job_descriptions():
+    job_id = scheduler.schedule(lambda: None, delay_seconds=3600, kind="reminder", description="call my therapist")
+    try:
+        stats = asyncio.run(api_frontend.scheduler_stats())
+    finally:
+        scheduler.cancel(job_id)
+    assert "jobs" not in stats
+    assert stats["pending_by_kind"]["reminder"] >= 1
+    assert "call my therapist" not in repr(stats)
@@ -0,0 +1,90 @@
+import asyncio
+from collections import deque
+
+import httpx
+import pytest
+
+from src.Backend import resilience, translation
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    """The shared Sarvam breaker, closed and empty, restored afterwards"""
+    breaker = resilience.sarvam_breaker
+    monkeypatch.setattr(breaker, "state", breaker.CLOSED)
+    monkeypatch.setattr(breaker, "_outcomes", deque())
+    monkeypatch.setattr(breaker, "_probe_in_flight", False)
+    monkeypatch.setattr(breaker, "_opened_at", 0.0)
+    monkeypatch.setattr(breaker, "times_opened", breaker.times_opened)
+    monkeypatch.setattr(breaker, "rejected", breaker.rejected)
+    return breaker
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Replaces the HTTP call; set .status / .translated, read .calls"""
+    class Upstream:
+        status = 200
+        calls = []
+
+        @staticmethod
+        def translated(text):
+            return text.upper()
+
+    upstream = Upstream()
+    upstream.calls = []
+
+    async def post(url, headers=None, json=None, timeout=None):
+        upstream.calls.append(json["text"])
+        request = httpx.Request("POST", url)
+        if upstream.status != 200:
+            return httpx.Response(upstream.status, text="error", request=request)
+        return httpx.Response(200, json={"translated_text": upstream.translated(json["text"])}, request=request)
+
+    monkeypatch.setattr(translation.http_client, "post", post)
+    monkeypatch.setattr(translation, "TRANSLATE_ATTEMPTS", 1)
+    return upstream
+
+
+def test_translation_goes_through_the_breaker(breaker, upstream):
+    assert asyncio.run(translation._request_translation("hello")) == "HELLO"
+    assert breaker.stats()["window_calls"] == 1
+
+    upstream.status = 503
+    for _ in range(breaker.min_calls):
+        assert asyncio.run(translation._request_translation("hello")) is None
+    assert breaker.state == breaker.OPEN
+
+    # While the circuit is open nothing goes upstream and the source text is used
+    calls = len(upstream.calls)
+    assert asyncio.run(translation._translate_remote("hello")) == "hello"
+    assert len(upstream.calls) == calls
+
+
+def test_client_errors_do_not_open_the_breaker(breaker, upstream):
+    upstream.status = 401
+    for _ in range(breaker.min_calls * 2):
+        assert asyncio.run(translation._request_translation("hello")) is None
+    assert breaker.state == breaker.CLOSED
+
+
+def test_failed_batch_is_not_split(breaker, upstream):
+    upstream.status = 500
+    texts = ["one", "two", "three"]
+    assert asyncio.run(translation._translate_batch(texts)) == texts
+    assert len(upstream.calls) == 1
+
+
+def test_batch_with_open_breaker_returns_source_texts(breaker, upstream):
+    breaker.record_failure()
+    breaker._open(0)
+    breaker._opened_at = float("inf")
+    texts = ["one", "two"]
+    assert asyncio.run(translation._translate_batch(texts)) == texts
+    assert upstream.calls == []
+
+
+def test_batch_with_wrong_part_count_is_translated_per_string(breaker, upstream):
+    upstream.translated = lambda text: text.replace(translation.BATCH_SEPARATOR, " ").upper()
+    assert asyncio.run(translation._translate_batch(["one", "two"])) == ["ONE", "TWO"]
+    assert len(upstream.calls) == 3